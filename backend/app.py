@@ -1,20 +1,55 @@
 from backend.utils.parser import get_text_from_url
 from backend.utils.db import (
-    get_db_connection, save_analysis_results, get_all_chats,
+    get_db_connection, save_analysis_results, get_all_chats, get_chat_summaries,
     get_chat_history, save_chat_message, rename_chat, delete_chat,
-    create_user, get_user_by_username, get_user_by_id, check_and_update_message_count,
-    get_policy_text
+    create_user, get_user_by_username, get_user_by_id, update_user_role, delete_user,
+    lease_message_quota, return_message_quota,
+    get_policy_text, get_owned_policy_text, get_policy_digest,
+    find_previous_version, get_policy_changes,
+    add_tracked_policy, count_tracked_policies, get_tracked_policies, delete_tracked_policy,
+    get_policy_content_hash, get_agent_result, save_agent_result,
+    get_comparison_policies, get_latest_agent_results,
+    search_policy_chunks
 )
-from backend.core.privacy_agents import PRIVACY_AGENTS
+from backend.core.privacy_agents import (
+    PRIVACY_AGENTS, build_agent_inputs, agent_input_source, render_agent_digest
+)
+from backend.core.cascade import run_agent, get_cascade_stats, agent_model_key
 from backend.core.qa_agent import create_qna_agent
 from backend.core.graph import build_analysis_graph
+from backend.core.policy_versioning import reanalyze_policy, is_similar_version, POLICY_VERSIONING_ENABLED
+from backend.core.policy_monitor import (
+    PolicyMonitor, MONITOR_ENABLED, MONITOR_MIN_INTERVAL_SECONDS
+)
+from backend.core.comparison import (
+    build_comparison, render_comparison_table, recommend,
+    COMPARISON_AGENT_TYPES, MAX_COMPARED_POLICIES
+)
+from backend.core.policy_search import (
+    search_policies, SEARCH_MAX_PAGE_SIZE, PUBLIC_CORPUS_USERNAME
+)
+from backend.core.reranker import RERANK_ENABLED, get_encoder as load_reranker
+from backend.core.legal_index import LEGAL_INDEX_ENABLED, get_legal_index
+from backend.core.embedding_cache import query_embedding_cache
+from backend.core.web_search import get_web_search
+from backend.core.llm_gateway import get_llm
+from backend.core.llm_cache import get_llm_cache
+from backend.core.policy_digest import DIGEST_VERSION
+from backend.utils import metrics
+from backend.utils.rate_limit import MessageRateLimiter, ROLE_DAILY_QUOTAS
+from backend.utils.user_cache import user_cache
+from backend.utils.policy_text_store import policy_text_cache, content_hash
+from backend.utils.tracing import start_span, end_span, SPAN_KIND_SERVER
 import os
-from flask import Flask, request, jsonify
+import json
+import hashlib
+from urllib.parse import urlparse
+from functools import wraps
+from flask import Flask, request, jsonify, g, make_response
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from dotenv import load_dotenv
 from werkzeug.security import check_password_hash
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import traceback
@@ -29,6 +64,32 @@ app.secret_key = os.environ.get(
     'SECRET_KEY', 'a_default_secret_key_for_development_12345')
 CORS(app, supports_credentials=True)
 
+# --- Request Tracing ---
+
+
+@app.before_request
+def start_request_span():
+    """Opens the root span that every stage of this request nests under."""
+    g.request_span, g.request_span_token = start_span(
+        f"http {request.method} {request.url_rule.rule if request.url_rule else request.path}",
+        SPAN_KIND_SERVER, **{"http.method": request.method, "http.target": request.path})
+
+
+@app.after_request
+def record_response_status(response):
+    request_span = getattr(g, "request_span", None)
+    if request_span:
+        request_span.set_attribute("http.status_code", response.status_code)
+    return response
+
+
+@app.teardown_request
+def end_request_span(error=None):
+    request_span = getattr(g, "request_span", None)
+    if request_span:
+        end_span(request_span, g.request_span_token, error=error)
+
+
 # --- Flask-Login Configuration ---
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -46,11 +107,15 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Loads a user from the database for the session."""
-    user_data = get_user_by_id(user_id)
-    if user_data:
-        return User(id=user_data['user_id'], username=user_data['username'], role=user_data['role'])
-    return None
+    """Loads a user for the session, from the user cache when possible."""
+    user_data = user_cache.get(user_id)
+    if user_data is None:
+        user_data = get_user_by_id(user_id)
+        if not user_data:
+            return None
+        user_cache.set(user_id, {key: user_data[key]
+                       for key in ('user_id', 'username', 'role')})
+    return User(id=user_data['user_id'], username=user_data['username'], role=user_data['role'])
 
 
 @login_manager.unauthorized_handler
@@ -59,8 +124,20 @@ def unauthorized():
     return jsonify({"error": "Login required"}), 401
 
 
+def admin_required(view):
+    """Restricts a route to logged-in admin users."""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.role != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        return view(*args, **kwargs)
+    return wrapped
+
+
 # --- Caching and Startup ---
 agent_cache = {}
+message_limiter = MessageRateLimiter(lease_message_quota, return_message_quota)
 
 
 def create_default_admin():
@@ -117,6 +194,64 @@ def session_status():
 # --- Core Application Routes ---
 
 
+def analyze_and_store(user_id, policy_text, previous_policy_id=None):
+    """
+    Analyzes a policy and saves it for the user
+
+    A revision of a policy the user already analyzed only re-analyzes changed
+    sections. Without an explicit previous_policy_id, a version is linked only
+    when the texts are similar and the incremental update names the same
+    company; the name is only re-read when the policy's opening changed.
+    Returns {"policy_id", ["previous_policy_id", "changes"]}, or None when the
+    model produced no analysis.
+    """
+    previous, revision = None, None
+    if POLICY_VERSIONING_ENABLED:
+        previous = find_previous_version(user_id, policy_text, previous_policy_id)
+        # A company name match alone is weak (a policy may just mention "Google
+        # Analytics"), so an implicit candidate must also be textually similar
+        if previous and not previous_policy_id and not is_similar_version(previous["policy_text"], policy_text):
+            previous = None
+    if previous:
+        revision = reanalyze_policy(
+            previous["analysis"], previous["policy_text"], policy_text)
+        if revision and not previous_policy_id and \
+                revision[0]["company_name"].casefold() != previous["analysis"]["company_name"].casefold():
+            revision = None
+        if not revision and not previous_policy_id:
+            # Only an explicitly named previous version stays linked after a full analysis
+            previous = None
+
+    if revision:
+        analysis, changes = revision
+    else:
+        analysis_app = build_analysis_graph()
+        final_state = analysis_app.invoke({"policy_text": policy_text})
+        analysis, changes = final_state.get("structured_analysis"), None
+
+    if not analysis:
+        return None
+
+    previous_policy_id = previous["policy_id"] if previous else None
+    policy_id = save_analysis_results(
+        policy_text, analysis, user_id,
+        previous_policy_id=previous_policy_id, change_summary=changes)
+    result = {"policy_id": policy_id}
+    if previous_policy_id:
+        result.update(previous_policy_id=previous_policy_id, changes=changes)
+    return result
+
+
+def _monitor_analyze(user_id, policy_text, previous_policy_id):
+    result = analyze_and_store(user_id, policy_text, previous_policy_id)
+    if not result:
+        raise ValueError("The model could not structure the fetched page")
+    return result["policy_id"]
+
+
+policy_monitor = PolicyMonitor(_monitor_analyze)
+
+
 @app.route('/api/analyze', methods=['POST'])
 @login_required
 def analyze():
@@ -138,18 +273,12 @@ def analyze():
         return jsonify({"error": f"Failed to process source: {e}"}), 400
 
     try:
-        analysis_app = build_analysis_graph()
-        final_state = analysis_app.invoke({"policy_text": policy_text})
-        analysis = final_state.get("structured_analysis")
-
-        if not analysis:
+        result = analyze_and_store(
+            current_user.id, policy_text, data.get('previous_policy_id'))
+        if not result:
             return jsonify({"error": "The AI model could not structure the output. The provided text may be too short or not a valid policy."}), 500
-
-        policy_id = save_analysis_results(
-            policy_text, analysis, current_user.id)
-        agent_cache[policy_id] = create_qna_agent(policy_id)
-
-        return jsonify({"policy_id": policy_id})
+        agent_cache[result["policy_id"]] = create_qna_agent(result["policy_id"])
+        return jsonify(result)
     except Exception as e:
         traceback.print_exc()
         error_message = str(e)
@@ -168,7 +297,8 @@ def analyze():
 @app.route('/api/chat', methods=['POST'])
 @login_required
 def chat():
-    can_send, message = check_and_update_message_count(current_user.id)
+    can_send, message = message_limiter.check(
+        current_user.id, current_user.role)
     if not can_send:
         return jsonify({"error": message}), 429
     data = request.json
@@ -198,21 +328,75 @@ def fetch_all_chats():
         return jsonify({"error": f"Failed to fetch chats: {e}"}), 500
 
 
+@app.route('/api/chats/summary', methods=['GET'])
+@login_required
+def fetch_chat_summaries():
+    """Sidebar page: ?limit=N&cursor=<next_cursor from the previous page>"""
+    try:
+        limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+        cursor = request.args.get('cursor')
+        return jsonify(get_chat_summaries(current_user.id, limit=limit, cursor=cursor))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch chats: {e}"}), 500
+
+
 @app.route('/api/chats/<int:policy_id>', methods=['GET'])
 @login_required
 def fetch_chat_history(policy_id):
+    """
+    Returns a chat's analysis and messages
+
+    Query params: 'before' / 'after' message_id cursors and 'limit' for keyset
+    pages, and include_policy_text=false to leave out the policy text (fetch it
+    from /api/chats/<id>/policy-text, which supports ETags).
+    """
     try:
-        chat_history = get_chat_history(policy_id, current_user.id)
+        before = request.args.get('before', type=int)
+        after = request.args.get('after', type=int)
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = max(1, min(limit, 200))
+        include_policy_text = request.args.get(
+            'include_policy_text', 'true').lower() not in ('0', 'false', 'no')
+        chat_history = get_chat_history(
+            policy_id, current_user.id, before=before, after=after, limit=limit)
         if chat_history:
-            # Add policy_text to the response so agents can use it
-            policy_text = get_policy_text(policy_id)
-            chat_history['policy_text'] = policy_text
+            if include_policy_text:
+                # Add policy_text to the response so agents can use it
+                chat_history['policy_text'] = get_policy_text(policy_id)
             return jsonify(chat_history)
         return jsonify({"error": "Chat not found or access denied"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to fetch chat history: {e}"}), 500
 
 
+@app.route('/api/chats/<int:policy_id>/changes', methods=['GET'])
+@login_required
+def fetch_policy_changes(policy_id):
+    """What changed since the previous version of this policy, if it was analyzed as a revision"""
+    changes = get_policy_changes(policy_id, current_user.id)
+    if changes is None:
+        return jsonify({"error": "Chat not found or access denied"}), 404
+    return jsonify(changes)
+
+
+@app.route('/api/chats/<int:policy_id>/policy-text', methods=['GET'])
+@login_required
+def fetch_policy_text(policy_id):
+    """Returns the policy text with an ETag so clients can revalidate instead of re-downloading."""
+    policy_text = get_owned_policy_text(policy_id, current_user.id)
+    if policy_text is None:
+        return jsonify({"error": "Chat not found or access denied"}), 404
+    response = make_response(jsonify({"policy_id": policy_id, "policy_text": policy_text}))
+    response.set_etag(hashlib.sha256(policy_text.encode('utf-8')).hexdigest())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
 @app.route('/api/chats/<int:policy_id>', methods=['PUT'])
 @login_required
 def update_chat_title(policy_id):
@@ -251,6 +435,16 @@ def list_privacy_agents():
     return jsonify(agents_info)
 
 
+def agent_params_hash(params: dict, source: str) -> str:
+    """Hash of what, besides the policy text, shaped a stored agent result"""
+    key_params = {"params": params, "input": source}
+    if source == "digest":
+        # Outputs built from an older digest extraction are not reused
+        key_params["digest_version"] = DIGEST_VERSION
+    return hashlib.sha256(json.dumps(
+        key_params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
 @app.route('/api/agents/<agent_type>/analyze', methods=['POST'])
 @login_required
 def run_privacy_agent(agent_type):
@@ -262,41 +456,54 @@ def run_privacy_agent(agent_type):
     policy_id = data.get('policy_id')
     policy_text = data.get('policy_text')
     additional_params = data.get('params', {})
-
-    # Get policy text from database if policy_id provided
-    if policy_id and not policy_text:
+    force_refresh = bool(data.get('force_refresh', False))
+
+    # For a stored policy, RAG agents on topic queries work from retrieved
+    # sections and digest agents from the precomputed digest; the rest get the
+    # full text. Text the caller sent is analyzed as given.
+    explicit_text = bool(policy_text)
+    source = agent_input_source(agent_type, policy_id)
+    if source == "digest" and explicit_text:
+        source = "text"
+    if source == "digest":
+        digest = get_policy_digest(policy_id)
+        digest_text = render_agent_digest(agent_type, digest) if digest else None
+        if digest_text:
+            policy_text = digest_text
+            metrics.increment("agents.digest_inputs")
+        else:
+            source = "text"
+    if policy_id and not policy_text and source == "text":
         policy_text = get_policy_text(policy_id)
 
-    if not policy_text:
+    if not policy_text and source != "retrieval":
         return jsonify({"error": "No policy text provided"}), 400
 
     try:
-        agent_creator = PRIVACY_AGENTS[agent_type]["creator"]
-
-        # Check if agent supports RAG (needs policy_id)
-        import inspect
-        sig = inspect.signature(agent_creator)
-        if 'policy_id' in sig.parameters and policy_id:
-            agent = agent_creator(policy_id=policy_id)
-        else:
-            agent = agent_creator()
-
-        # Prepare input based on agent requirements
-        if agent_type == "privacy_rights":
-            result = agent.invoke({
-                "policy_text": policy_text,
-                "jurisdiction": additional_params.get("jurisdiction", "General/International"),
-                "question": additional_params.get("question", "What are my privacy rights?")
-            })
-        elif agent_type in ["policy_simplifier", "privacy_functionality"]:
-            result = agent.invoke({
-                "policy_text": policy_text,
-                "question": additional_params.get("question", ""),
-                "concern": additional_params.get("concern", "")
-            })
+        # Results are stored per (text, agent, params, model, prompt version)
+        if policy_id and not (explicit_text and source == "text"):
+            text_hash = get_policy_content_hash(policy_id)
         else:
-            # For agents that just need policy_text
-            result = agent.invoke({"policy_text": policy_text})
+            text_hash = content_hash(policy_text)
+        params_hash = agent_params_hash(additional_params, source)
+        result_key = (text_hash, agent_type, params_hash, agent_model_key(agent_type),
+                      PRIVACY_AGENTS[agent_type]["prompt_version"])
+        result = None if force_refresh or not text_hash else get_agent_result(*result_key)
+        cached = result is not None
+        metrics.increment("agent_results.hits" if cached else "agent_results.misses")
+
+        if not cached:
+            inputs = build_agent_inputs(agent_type, policy_text, additional_params)
+            result = run_agent(agent_type, inputs, policy_id=policy_id)
+            schema = PRIVACY_AGENTS[agent_type].get("schema")
+            try:
+                if schema:
+                    result = schema.model_validate(result).model_dump()
+                if text_hash:
+                    save_agent_result(*result_key, result)
+            except Exception as e:
+                # Unvalidated output is still returned, just not stored
+                print(f"Agent result for {agent_type} not stored: {e}")
 
         # Save agent request and response to chat history if policy_id exists
         if policy_id:
@@ -307,7 +514,6 @@ def run_privacy_agent(agent_type):
 
             # Save agent's response
             # Convert result to string format for storage
-            import json
             if isinstance(result, dict):
                 result_str = json.dumps(result, indent=2)
             else:
@@ -315,7 +521,7 @@ def run_privacy_agent(agent_type):
 
             save_chat_message(policy_id, current_user.id, False, result_str)
 
-        return jsonify({"result": result, "agent": agent_type})
+        return jsonify({"result": result, "agent": agent_type, "cached": cached})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"Agent analysis failed: {str(e)}"}), 500
@@ -324,15 +530,24 @@ def run_privacy_agent(agent_type):
 @app.route('/api/compare-policies', methods=['POST'])
 @login_required
 def compare_policies():
-    """Compare multiple privacy policies"""
+    """
+    Compare multiple privacy policies
+
+    With {"policy_ids": [...]} the comparison is computed from the stored
+    analyses and agent results, and the model only writes the final
+    recommendation. {"policies": [raw texts]} is still accepted for
+    unsaved policies.
+    """
     data = request.json
+    if data.get('policy_ids') is not None:
+        return compare_stored_policies(data.get('policy_ids'))
     policy_texts = data.get('policies', [])
 
     if len(policy_texts) < 2:
         return jsonify({"error": "At least 2 policies required for comparison"}), 400
 
     try:
-        llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
+        llm = get_llm("quality")
         from langchain_core.prompts import ChatPromptTemplate
         from langchain_core.output_parsers import StrOutputParser
 
@@ -364,7 +579,178 @@ Provide a clear comparison table and overall recommendation for which is most pr
         return jsonify({"error": f"Comparison failed: {str(e)}"}), 500
 
 
+def compare_stored_policies(policy_ids):
+    try:
+        policy_ids = list(dict.fromkeys(int(pid) for pid in policy_ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "policy_ids must be a list of integers"}), 400
+    if len(policy_ids) < 2:
+        return jsonify({"error": "At least 2 policies required for comparison"}), 400
+    if len(policy_ids) > MAX_COMPARED_POLICIES:
+        return jsonify({"error": f"At most {MAX_COMPARED_POLICIES} policies can be compared"}), 400
+
+    try:
+        policies = get_comparison_policies(policy_ids, current_user.id)
+        if len(policies) != len(policy_ids):
+            return jsonify({"error": "Chat not found or access denied"}), 404
+
+        # Only default runs (no params) on the current model and prompt are
+        # comparable across policies
+        stored = get_latest_agent_results(
+            [p["content_hash"] for p in policies if p["content_hash"]],
+            {agent: (agent_params_hash({}, agent_input_source(agent, policies[0]["policy_id"])),
+                     agent_model_key(agent), PRIVACY_AGENTS[agent]["prompt_version"])
+             for agent in COMPARISON_AGENT_TYPES})
+        agent_results = {(p["policy_id"], agent): result
+                         for p in policies for (text_hash, agent), result in stored.items()
+                         if text_hash == p["content_hash"]}
+
+        comparison = build_comparison(policies, agent_results)
+        table = render_comparison_table(comparison)
+        recommendation = recommend(comparison, table)
+        return jsonify({
+            "comparison": f"{table}\n\n{recommendation}",
+            "table": comparison["rows"],
+            "common_pii": comparison["common_pii"],
+            "ranking": comparison["ranking"],
+            "recommendation": recommendation,
+        })
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Comparison failed: {str(e)}"}), 500
+
+
+# --- Search Routes ---
+
+
+@app.route('/api/search', methods=['GET'])
+@login_required
+def search():
+    """
+    Semantic search across policies, grouped by policy
+
+    Query params: q, scope ('mine', 'public' or 'all'), limit and offset
+    (a page of policies; the response's next_offset fetches the next one,
+    and truncated marks results cut short by SEARCH_MAX_CHUNKS).
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    scope = request.args.get('scope', 'mine')
+    if scope not in ('mine', 'public', 'all'):
+        return jsonify({"error": "scope must be 'mine', 'public' or 'all'"}), 400
+    limit = max(1, min(request.args.get('limit', 10, type=int), SEARCH_MAX_PAGE_SIZE))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    owner_ids = [current_user.id] if scope in ('mine', 'all') else []
+    if scope in ('public', 'all') and PUBLIC_CORPUS_USERNAME:
+        corpus_user = get_user_by_username(PUBLIC_CORPUS_USERNAME)
+        if corpus_user and corpus_user['user_id'] not in owner_ids:
+            owner_ids.append(corpus_user['user_id'])
+    if not owner_ids:
+        return jsonify({"results": [], "next_offset": None, "truncated": False})
+    try:
+        return jsonify(search_policies(query, owner_ids, search_policy_chunks, limit=limit, offset=offset))
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Search failed: {str(e)}"}), 500
+
+
+# --- Policy Monitor Routes ---
+
+MONITOR_MAX_URLS_PER_USER = int(os.getenv("MONITOR_MAX_URLS_PER_USER", 500))
+
+
+@app.route('/api/monitor', methods=['GET'])
+@login_required
+def list_tracked_policies():
+    return jsonify(get_tracked_policies(current_user.id))
+
+
+@app.route('/api/monitor', methods=['POST'])
+@login_required
+def track_policy():
+    """Track a policy URL: {"url": ..., "interval_hours": 24}"""
+    data = request.json or {}
+    url = (data.get('url') or '').strip()
+    if urlparse(url).scheme not in ('http', 'https') or not urlparse(url).netloc:
+        return jsonify({"error": "A valid http(s) URL is required"}), 400
+    try:
+        interval = int(float(data.get('interval_hours', 24)) * 3600)
+    except (TypeError, ValueError):
+        return jsonify({"error": "interval_hours must be a number"}), 400
+    if count_tracked_policies(current_user.id) >= MONITOR_MAX_URLS_PER_USER:
+        return jsonify({"error": f"You can track at most {MONITOR_MAX_URLS_PER_USER} URLs"}), 400
+    tracked = add_tracked_policy(
+        current_user.id, url, max(interval, MONITOR_MIN_INTERVAL_SECONDS))
+    return jsonify(tracked), 201
+
+
+@app.route('/api/monitor/<int:tracked_id>', methods=['DELETE'])
+@login_required
+def untrack_policy(tracked_id):
+    if delete_tracked_policy(tracked_id, current_user.id):
+        return jsonify({"message": "URL is no longer tracked"})
+    return jsonify({"error": "Tracked URL not found or access denied"}), 404
+
+
+# --- Admin Routes ---
+
+
+@app.route('/api/admin/metrics', methods=['GET'])
+@admin_required
+def admin_metrics():
+    """Returns counters, cache statistics and p50/p95/p99 latency per stage."""
+    llm_cache = get_llm_cache()
+    return jsonify({
+        "counters": metrics.get_counters(),
+        "llm_cache": llm_cache.stats() if llm_cache else {"enabled": False},
+        "cascade": get_cascade_stats(),
+        "user_cache": user_cache.stats(),
+        "policy_text_cache": policy_text_cache.stats(),
+        "query_embedding_cache": query_embedding_cache.stats() if query_embedding_cache else {"enabled": False},
+        "web_search": get_web_search().stats(),
+        "latency_ms": metrics.get_latency_percentiles(),
+    })
+
+
+@app.route('/api/admin/users/<int:user_id>/role', methods=['PUT'])
+@admin_required
+def admin_set_user_role(user_id):
+    """Changes a user's role; their cached session data and leased chat quota are dropped."""
+    role = (request.json or {}).get('role')
+    if role not in ROLE_DAILY_QUOTAS:
+        return jsonify({"error": f"'role' must be one of: {', '.join(ROLE_DAILY_QUOTAS)}"}), 400
+    if user_id == current_user.id and role != 'admin':
+        return jsonify({"error": "You can't remove your own admin role"}), 400
+    if not update_user_role(user_id, role):
+        return jsonify({"error": "User not found"}), 404
+    message_limiter.forget(user_id)
+    return jsonify({"message": "Role updated", "user_id": user_id, "role": role})
+
+
+@app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
+@admin_required
+def admin_delete_user(user_id):
+    """Deletes a user with their chats; their cached session data is dropped."""
+    if user_id == current_user.id:
+        return jsonify({"error": "You can't delete your own account here"}), 400
+    if not delete_user(user_id):
+        return jsonify({"error": "User not found"}), 404
+    message_limiter.forget(user_id)
+    return jsonify({"message": "User deleted", "user_id": user_id})
+
+
 # --- Main Execution ---
 if __name__ == '__main__':
     create_default_admin()
+    if LEGAL_INDEX_ENABLED:
+        get_legal_index()
+    if RERANK_ENABLED:
+        # Starts loading the cross-encoder in the background
+        load_reranker()
+    # The reloader runs this block in a watcher and a serving process; only
+    # the serving one polls. Deployments run run_policy_monitor.py instead.
+    if MONITOR_ENABLED and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        policy_monitor.start()
     app.run(host='0.0.0.0', port=5001, debug=True)
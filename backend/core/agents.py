@@ -1,15 +1,16 @@
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers.json import JsonOutputParser
 from pydantic.v1 import BaseModel
 
 from .pydantic_models import PrivacyAnalysis
+from .json_repair import RepairingJsonOutputParser
 
 def create_analysis_agent(llm):
     """
     Creates an agent that analyzes a privacy policy and extracts structured data.
     """
-    parser = JsonOutputParser(pydantic_object=PrivacyAnalysis)
+    parser = RepairingJsonOutputParser(pydantic_object=PrivacyAnalysis)
 
     prompt = ChatPromptTemplate.from_messages([
         ("system", """
@@ -35,3 +36,50 @@ def create_analysis_agent(llm):
         | llm
         | parser
     )
+
+
+def create_update_agent(llm):
+    """
+    Creates an agent that revises a previous analysis given only the sections
+    of a policy that changed between versions.
+    """
+    parser = RepairingJsonOutputParser(pydantic_object=PrivacyAnalysis)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """
+            You are a specialized legal AI assistant. A company has revised its privacy policy.
+            You are given the structured analysis of the previous version, the sections that were
+            added or modified in the new version, and the headings of sections that were removed.
+
+            Update the analysis so it describes the new version:
+            - Keep every statement from the previous analysis that the changes do not affect.
+            - Add, revise or drop PII types, sharing practices and retention statements as the changed sections require.
+            - Re-assess the risk score (1 very low to 10 very high) and rewrite the final summary, mentioning what changed.
+            - Keep the company name unless the changes show it is different.
+
+            {format_instructions}
+        """),
+        ("human", """Previous analysis:
+{previous_analysis}
+
+Added or modified sections:
+{changed_sections}
+
+Removed sections: {removed_sections}""")
+    ]).partial(format_instructions=parser.get_format_instructions())
+
+    return prompt | llm | parser
+
+
+def create_company_name_agent(llm):
+    """
+    Creates an agent that names the company a privacy policy belongs to,
+    from the opening of the policy text.
+    """
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You identify the company or service a privacy policy belongs to. "
+                   "Respond with *only* the name. If the text does not say, respond with an empty line."),
+        ("human", "{policy_opening}")
+    ])
+
+    return prompt | llm | StrOutputParser()
@@ -0,0 +1,141 @@
+"""
+Model Cascade for Structured Privacy Agents
+Runs JSON-producing agents on the fast 8B model first and escalates to the
+70B model only when the output fails schema or consistency checks
+"""
+import os
+
+from pydantic import ValidationError
+
+from backend.core.privacy_agents import (
+    PRIVACY_AGENTS, GDPRCompliance, ChildPrivacyAssessment,
+    build_privacy_agent
+)
+from backend.core.llm_gateway import MODELS
+from backend.utils import metrics
+
+CASCADE_ENABLED = os.getenv(
+    "MODEL_CASCADE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+RISK_LEVELS = {"low", "medium", "high", "critical"}
+
+
+class CascadeRejection(ValueError):
+    """Raised when a fast-model result is not good enough to return."""
+
+
+def _check_scores(data: dict):
+    """Every *_score field must be an integer from 1 to 10."""
+    for field, value in data.items():
+        if field.endswith("_score") and not 1 <= value <= 10:
+            raise CascadeRejection(f"{field}={value} is outside 1-10")
+
+
+def _check_risk_levels(data: dict):
+    for field in ("risk_level", "tracking_risk_level"):
+        if field in data and str(data[field]).strip().lower() not in RISK_LEVELS:
+            raise CascadeRejection(f"{field}={data[field]!r} is not a known level")
+
+
+def _check_not_empty(data: dict):
+    """A result where every list and text field is empty is not an analysis."""
+    values = [v for v in data.values() if isinstance(v, (list, str))]
+    if values and not any(v for v in values):
+        raise CascadeRejection("all list and text fields are empty")
+
+
+def _check_gdpr(data: dict):
+    if data["is_compliant"] and data["compliance_score"] <= 4:
+        raise CascadeRejection(
+            "marked compliant with a low compliance score")
+    if not data["is_compliant"] and data["compliance_score"] >= 9:
+        raise CascadeRejection(
+            "marked non-compliant with a high compliance score")
+
+
+def _check_coppa(data: dict):
+    if data["coppa_compliant"] and not data["parental_consent"].strip():
+        raise CascadeRejection(
+            "marked COPPA compliant without a parental consent mechanism")
+
+
+CONSISTENCY_CHECKS = {
+    GDPRCompliance: [_check_gdpr],
+    ChildPrivacyAssessment: [_check_coppa],
+}
+COMMON_CHECKS = [_check_scores, _check_risk_levels, _check_not_empty]
+
+
+def validate_agent_output(schema, result) -> dict:
+    """
+    Validate an agent result against its Pydantic schema and consistency rules
+
+    Returns:
+        The validated result as a plain dict
+
+    Raises:
+        CascadeRejection: If the result should be escalated
+    """
+    if not isinstance(result, dict):
+        raise CascadeRejection(
+            f"expected a JSON object, got {type(result).__name__}")
+    try:
+        data = schema(**result).model_dump()
+    except ValidationError as e:
+        raise CascadeRejection(f"schema validation failed: {e}") from e
+    for check in COMMON_CHECKS + CONSISTENCY_CHECKS.get(schema, []):
+        check(data)
+    return data
+
+
+def run_agent(agent_type: str, inputs: dict, policy_id: int = None):
+    """
+    Run a registered privacy agent, cascading from the fast to the quality model
+
+    Agents without a registered schema (free-text agents) always run on the
+    model their creator chooses. The fast agent's parser only repairs JSON
+    syntax, so missing fields fail validation here and escalate rather than
+    being filled with placeholders.
+    """
+    schema = PRIVACY_AGENTS[agent_type].get("schema")
+    if not schema or not CASCADE_ENABLED:
+        return build_privacy_agent(agent_type, policy_id).invoke(inputs)
+
+    metrics.increment(f"cascade.{agent_type}.runs")
+    try:
+        fast_agent = build_privacy_agent(
+            agent_type, policy_id, model_type="fast")
+        result = validate_agent_output(schema, fast_agent.invoke(inputs))
+        metrics.increment(f"cascade.{agent_type}.fast_accepted")
+        return result
+    except Exception as e:
+        print(f"Cascade: escalating {agent_type} to quality model ({e})")
+        metrics.increment(f"cascade.{agent_type}.escalated")
+
+    quality_agent = build_privacy_agent(
+        agent_type, policy_id, model_type="quality")
+    return quality_agent.invoke(inputs)
+
+
+def agent_model_key(agent_type: str) -> str:
+    """The model(s) a run of this agent may use, as stored with its results"""
+    if PRIVACY_AGENTS[agent_type].get("schema") and CASCADE_ENABLED:
+        return f"{MODELS['fast']}>{MODELS['quality']}"
+    return MODELS["quality"]
+
+
+def get_cascade_stats() -> dict:
+    """Per-agent run counts and escalation rates."""
+    stats = {}
+    for agent_type, info in PRIVACY_AGENTS.items():
+        if not info.get("schema"):
+            continue
+        runs = metrics.get_counter(f"cascade.{agent_type}.runs")
+        escalated = metrics.get_counter(f"cascade.{agent_type}.escalated")
+        stats[agent_type] = {
+            "runs": runs,
+            "fast_accepted": metrics.get_counter(f"cascade.{agent_type}.fast_accepted"),
+            "escalated": escalated,
+            "escalation_rate": metrics.ratio(escalated, runs),
+        }
+    return stats
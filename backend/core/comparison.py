@@ -0,0 +1,149 @@
+"""
+Policy Comparison Engine
+Builds a comparison of stored policies from their structured analyses and
+any stored agent results, without sending policy text to the model. The
+table, shared and distinctive PII and the ranking are computed
+deterministically; the LLM only writes a short recommendation over the
+compact table, so the prompt grows by one table row per policy.
+"""
+import re
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from backend.core import llm_gateway
+from backend.utils.tracing import span
+
+MAX_COMPARED_POLICIES = 50
+SUMMARY_CHARS = 160
+
+SELLS_DATA_PATTERN = re.compile(r"\bsells?\b|\bsold\b|\bsale of\b", re.IGNORECASE)
+ADVERTISING_PATTERN = re.compile(r"\badvertis|\bmarketing partners?\b|\btargeted ads?\b", re.IGNORECASE)
+RETENTION_PERIOD_PATTERN = re.compile(
+    r"\b\d+\s*(?:day|week|month|year)s?\b|\b(?:one|two|three|six|twelve)\s+(?:day|week|month|year)s?\b",
+    re.IGNORECASE)
+
+# Columns taken from stored agent results: (agent_type, field, column)
+AGENT_COLUMNS = (
+    ("gdpr_compliance", "compliance_score", "gdpr_score"),
+    ("data_minimization", "minimization_score", "minimization_score"),
+    ("breach_risk", "risk_level", "breach_risk"),
+    ("tracker_detector", "tracking_risk_level", "tracking_risk"),
+    ("kids_privacy", "coppa_compliant", "coppa_compliant"),
+)
+COMPARISON_AGENT_TYPES = tuple(dict.fromkeys(agent for agent, _, _ in AGENT_COLUMNS))
+
+RECOMMENDATION_PROMPT = ChatPromptTemplate.from_template(
+    """You are a privacy advisor. Below is a comparison of {count} privacy policies, computed from
+their stored analyses. Lower risk is better; "-" means not assessed.
+
+{table}
+
+PII collected by every policy: {common_pii}
+
+In at most 150 words, recommend the most privacy-friendly option and name the one or two factors
+that decide it. Mention any policy that should be avoided and why. Do not restate the table."""
+)
+
+
+def _normalize_pii(item: str) -> str:
+    return " ".join(item.lower().split())
+
+
+def _shorten(text: str, limit: int = SUMMARY_CHARS) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def _tracker_count(result: dict) -> int:
+    return sum(len(result.get(field) or []) for field in
+               ("advertising_trackers", "analytics_trackers", "social_media_trackers", "unknown_trackers"))
+
+
+def build_comparison(policies: list, agent_results: dict = None) -> dict:
+    """
+    Computes the comparison deterministically
+
+    Args:
+        policies: dicts with policy_id, title, pii_collected,
+            data_sharing_practices, retention_summary and risk_score
+        agent_results: {(policy_id, agent_type): result dict}
+
+    Returns:
+        {"rows", "common_pii", "ranking"}; rows are in ranking order
+    """
+    agent_results = agent_results or {}
+    pii_sets = {p["policy_id"]: {_normalize_pii(i) for i in p.get("pii_collected") or []} for p in policies}
+    common = set.intersection(*pii_sets.values()) if pii_sets else set()
+
+    rows = []
+    for policy in policies:
+        policy_id = policy["policy_id"]
+        pii = pii_sets[policy_id]
+        others = set().union(*(s for pid, s in pii_sets.items() if pid != policy_id))
+        sharing = policy.get("data_sharing_practices") or ""
+        retention = policy.get("retention_summary") or ""
+        row = {
+            "policy_id": policy_id,
+            "title": policy.get("title"),
+            "risk_score": policy.get("risk_score"),
+            "pii_count": len(pii),
+            "distinctive_pii": sorted(pii - others),
+            "sells_data": bool(SELLS_DATA_PATTERN.search(sharing)),
+            "shares_for_advertising": bool(ADVERTISING_PATTERN.search(sharing)),
+            "retention_period_stated": bool(RETENTION_PERIOD_PATTERN.search(retention)),
+            "sharing": _shorten(sharing),
+            "retention": _shorten(retention),
+        }
+        for agent_type, field, column in AGENT_COLUMNS:
+            result = agent_results.get((policy_id, agent_type))
+            row[column] = result.get(field) if isinstance(result, dict) else None
+        tracker_result = agent_results.get((policy_id, "tracker_detector"))
+        row["tracker_count"] = _tracker_count(tracker_result) if isinstance(tracker_result, dict) else None
+        rows.append(row)
+
+    # Lower risk first, then less data collected, then fewer red flags
+    rows.sort(key=lambda r: (r["risk_score"] if r["risk_score"] is not None else 11, r["pii_count"],
+                             r["sells_data"] + r["shares_for_advertising"], r["policy_id"]))
+    return {
+        "rows": rows,
+        "common_pii": sorted(common),
+        "ranking": [r["policy_id"] for r in rows],
+    }
+
+
+def render_comparison_table(comparison: dict) -> str:
+    """Compact markdown table used both in the response and as the LLM prompt"""
+    def cell(value):
+        if value is None:
+            return "-"
+        if isinstance(value, bool):
+            return "yes" if value else "no"
+        if isinstance(value, list):
+            return ", ".join(value) or "-"
+        return str(value).replace("|", "/")
+
+    columns = [("title", "Policy"), ("risk_score", "Risk"), ("pii_count", "PII"),
+               ("distinctive_pii", "PII only here"), ("sells_data", "Sells data"),
+               ("shares_for_advertising", "Ad sharing"), ("retention_period_stated", "Retention period"),
+               ("gdpr_score", "GDPR"), ("minimization_score", "Minimization"),
+               ("breach_risk", "Breach risk"), ("tracking_risk", "Tracking risk"), ("tracker_count", "Trackers"),
+               ("coppa_compliant", "COPPA")]
+    # Agent columns nobody has results for are left out
+    columns = [(key, label) for key, label in columns
+               if any(row.get(key) is not None for row in comparison["rows"])]
+    lines = ["| " + " | ".join(label for _, label in columns) + " |",
+             "|" + "---|" * len(columns)]
+    lines += ["| " + " | ".join(cell(row.get(key)) for key, _ in columns) + " |" for row in comparison["rows"]]
+    return "\n".join(lines)
+
+
+def recommend(comparison: dict, table: str) -> str:
+    """Short LLM recommendation over the computed table"""
+    chain = RECOMMENDATION_PROMPT | llm_gateway.get_llm("quality") | StrOutputParser()
+    with span("comparison.recommendation", **{"policies": len(comparison["rows"])}):
+        return chain.invoke({
+            "count": len(comparison["rows"]),
+            "table": table,
+            "common_pii": ", ".join(comparison["common_pii"]) or "none",
+        })
@@ -0,0 +1,113 @@
+"""
+Query Embedding Cache
+Bounded LRU of query embeddings keyed by (model, hash of the whitespace-
+normalized text), used by the shared embedding service so repeated
+retrieval queries (the agents' fixed queries, common chat questions) skip
+the model. Optionally backed by a SQLite file so entries survive restarts.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+from backend.utils import metrics
+
+QUERY_EMBEDDING_CACHE_ENABLED = os.getenv("QUERY_EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", 4096))
+# Unset keeps the cache in memory only
+QUERY_EMBEDDING_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH")
+# The file may hold more entries than memory; the oldest are trimmed beyond this
+QUERY_EMBEDDING_CACHE_MAX_PERSISTED = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_PERSISTED", 50000))
+
+
+def cache_key(model: str, text: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """LRU of cache_key -> embedding, with an optional SQLite second level."""
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_MAX_ENTRIES, path=QUERY_EMBEDDING_CACHE_PATH,
+                 max_persisted: int = QUERY_EMBEDDING_CACHE_MAX_PERSISTED):
+        self.max_entries = max_entries
+        self.max_persisted = max_persisted
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._conn = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    key TEXT PRIMARY KEY,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_query_embeddings_created ON query_embeddings (created_at)")
+            self._conn.commit()
+            self._persisted = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = cache_key(model, text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT embedding FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+                if row:
+                    embedding = array("f", row[0]).tolist()
+                    self._remember(key, embedding)
+        if embedding is None:
+            metrics.increment("query_embedding_cache.misses")
+            return None
+        metrics.increment("query_embedding_cache.hits")
+        return list(embedding)
+
+    def set(self, model: str, text: str, embedding: List[float]):
+        key = cache_key(model, text)
+        with self._lock:
+            self._remember(key, list(embedding))
+            if self._conn is None:
+                return
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO query_embeddings (key, embedding, created_at) VALUES (?, ?, ?)",
+                (key, array("f", embedding).tobytes(), time.time()))
+            self._persisted += cursor.rowcount
+            if self._persisted > self.max_persisted:
+                # Trim to 90% so trimming doesn't run on every insert
+                excess = self._persisted - int(self.max_persisted * 0.9)
+                self._conn.execute("""
+                    DELETE FROM query_embeddings WHERE key IN (
+                        SELECT key FROM query_embeddings ORDER BY created_at LIMIT ?)
+                """, (excess,))
+                self._persisted -= excess
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        hits = metrics.get_counter("query_embedding_cache.hits")
+        misses = metrics.get_counter("query_embedding_cache.misses")
+        with self._lock:
+            entries = len(self._entries)
+            persisted = self._persisted if self._conn is not None else None
+        return {"enabled": True, "entries": entries, "persisted_entries": persisted, "hits": hits,
+                "misses": misses, "hit_ratio": metrics.ratio(hits, hits + misses)}
+
+
+query_embedding_cache = QueryEmbeddingCache() if QUERY_EMBEDDING_CACHE_ENABLED else None
@@ -0,0 +1,96 @@
+"""
+Shared Embedding Service
+One process-wide FastEmbed model used by every vector store and retriever,
+instrumented with tracing spans. The model, an alternative (e.g. int8
+quantized) ONNX file and the max sequence length are configurable;
+benchmarks/retrieval_quality.py measures the recall and speed of each choice.
+"""
+import os
+import threading
+
+from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from backend.core.embedding_cache import query_embedding_cache
+from backend.utils.tracing import span
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+# ONNX file inside the EMBEDDING_MODEL Hugging Face repo, e.g. onnx/model_quantized.onnx;
+# the model is then registered with FastEmbed as a custom CLS-pooled model
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE")
+# Identifies the vectors the configured model produces
+EMBEDDING_MODEL_ID = f"{EMBEDDING_MODEL}:{EMBEDDING_ONNX_FILE}" if EMBEDDING_ONNX_FILE else EMBEDDING_MODEL
+# Tokens per text; shorter is faster, longer sees more of each 1000-character chunk
+EMBEDDING_MAX_LENGTH = int(os.getenv("EMBEDDING_MAX_LENGTH", 512))
+# Changing the model or dimensions requires re-embedding stored vectors
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", 384))
+
+
+class TracedEmbeddings(Embeddings):
+    """Embeddings wrapper that records a span for every embedding call and caches query embeddings."""
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_namespace: str = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        # Everything that changes the vectors, so persisted cache entries can't go stale
+        self.cache_namespace = cache_namespace or model_name
+
+    def embed_documents(self, texts):
+        with span("embedding", **{"embedding.model": self.model_name, "embedding.texts": len(texts)}):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        if query_embedding_cache is not None:
+            cached = query_embedding_cache.get(self.cache_namespace, text)
+            if cached is not None:
+                return cached
+        with span("embedding", **{"embedding.model": self.model_name, "embedding.texts": 1}):
+            embedding = self.embeddings.embed_query(text)
+        if query_embedding_cache is not None:
+            query_embedding_cache.set(self.cache_namespace, text, embedding)
+        return embedding
+
+
+_registered_models = set()
+_registered_models_lock = threading.Lock()
+
+
+def create_embeddings(model_name: str = EMBEDDING_MODEL, onnx_file: str = EMBEDDING_ONNX_FILE,
+                      max_length: int = EMBEDDING_MAX_LENGTH) -> Embeddings:
+    """Builds a FastEmbed model, registering onnx_file from the model's repo when given"""
+    if onnx_file:
+        from fastembed import TextEmbedding
+        from fastembed.common.model_description import ModelSource, PoolingType
+        # Built-in names can't be re-registered, so the variant gets its own
+        custom_name = f"{model_name}:{onnx_file}"
+        with _registered_models_lock:
+            if custom_name not in _registered_models:
+                TextEmbedding.add_custom_model(
+                    model=custom_name, pooling=PoolingType.CLS, normalization=True,
+                    sources=ModelSource(hf=model_name), dim=EMBEDDING_DIMENSIONS, model_file=onnx_file)
+                _registered_models.add(custom_name)
+        model_name = custom_name
+    return FastEmbedEmbeddings(model_name=model_name, max_length=max_length)
+
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def set_embeddings(embeddings: Embeddings = None):
+    """Replace the shared embedding model, e.g. with an offline stand-in (None resets)"""
+    global _embeddings
+    with _embeddings_lock:
+        _embeddings = TracedEmbeddings(
+            embeddings, type(embeddings).__name__) if embeddings else None
+
+
+def get_embeddings() -> Embeddings:
+    """Returns the shared embedding model, loading the ONNX weights once."""
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            # Use FastEmbed (local embeddings) instead of Google API to avoid quota limits
+            _embeddings = TracedEmbeddings(
+                create_embeddings(), EMBEDDING_MODEL_ID, f"{EMBEDDING_MODEL_ID}:{EMBEDDING_MAX_LENGTH}")
+        return _embeddings
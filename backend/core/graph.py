@@ -1,11 +1,11 @@
-import os
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, List
 
 from .agents import create_analysis_agent
+from . import llm_gateway
+from backend.utils.tracing import span
 from .pydantic_models import PrivacyAnalysis
 
 class AgentState(TypedDict):
@@ -30,12 +30,7 @@ def get_llm():
     Selects and initializes the appropriate language model based on environment variables.
     The default is Groq's Llama3 70b model for its speed and performance.
     """
-    llm = ChatGroq(
-        temperature=0, 
-        model_name="llama-3.3-70b-versatile",
-        api_key=os.environ.get("GROQ_API_KEY")
-    )
-    return llm
+    return llm_gateway.get_llm("quality")
 
 def run_analysis_agent(state):
     """
@@ -50,7 +45,8 @@ def run_analysis_agent(state):
     print("\n---RUNNING ANALYSIS AGENT---")
     llm = get_llm()
     analysis_agent = create_analysis_agent(llm)
-    structured_analysis = analysis_agent.invoke(state["policy_text"])
+    with span("analysis_agent", **{"policy.chars": len(state["policy_text"])}):
+        structured_analysis = analysis_agent.invoke(state["policy_text"])
     return {"structured_analysis": structured_analysis}
 
 def build_analysis_graph():
@@ -0,0 +1,89 @@
+"""
+Hybrid Retrieval
+Fuses dense vector hits with Postgres full-text hits by reciprocal rank
+fusion. Exact names and terms ("Google Analytics", "Article 17") that the
+small embedding model blurs are found lexically, so fewer chunks need to be
+retrieved for the same recall.
+"""
+import json
+import os
+from typing import List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.core.reranker import rerank, RERANK_ENABLED, RERANK_CANDIDATES
+from backend.core.vector_store import get_vector_store, uses_pgvector
+from backend.utils.db import lexical_search_chunks
+from backend.utils.tracing import span
+
+HYBRID_RETRIEVAL_ENABLED = os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() == "true"
+# Standard RRF damping constant; larger values flatten the rank weights
+RRF_K = 60
+
+
+def _document_key(doc: Document) -> str:
+    return doc.page_content + json.dumps(doc.metadata, sort_keys=True, default=str)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = RRF_K) -> List[Document]:
+    """Merges ranked lists; a document scores sum(1 / (k + rank)) over the lists it appears in"""
+    scores, documents = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _document_key(doc)
+            documents.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """Vector (similarity or MMR) plus lexical retrieval over one collection"""
+
+    collection_name: str
+    k: int = 5
+    fetch_k: int = 20
+    filter: Optional[dict] = None
+    search_type: str = "similarity"
+    lambda_mult: float = 0.5
+    use_reranker: bool = RERANK_ENABLED
+
+    def _vector_hits(self, query: str) -> List[Document]:
+        store = get_vector_store(self.collection_name)
+        if self.search_type == "mmr":
+            return store.max_marginal_relevance_search(
+                query, k=self.fetch_k, fetch_k=self.fetch_k * 2, lambda_mult=self.lambda_mult, filter=self.filter)
+        return store.similarity_search(query, k=self.fetch_k, filter=self.filter)
+
+    def _lexical_hits(self, query: str) -> List[Document]:
+        # Full-text search only exists on the pgvector tables
+        if not (HYBRID_RETRIEVAL_ENABLED and uses_pgvector()):
+            return []
+        try:
+            rows = lexical_search_chunks(self.collection_name, query, self.filter, self.fetch_k)
+        except Exception as e:
+            print(f"Lexical retrieval unavailable, using vector hits only: {e}")
+            return []
+        return [Document(page_content=document, metadata=metadata) for document, metadata in rows]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        with span("retrieval.hybrid", **{"collection": self.collection_name, "k": self.k}) as retrieval_span:
+            vector_hits = self._vector_hits(query)
+            lexical_hits = self._lexical_hits(query)
+            retrieval_span.set_attribute("vector_hits", len(vector_hits))
+            retrieval_span.set_attribute("lexical_hits", len(lexical_hits))
+            candidates = reciprocal_rank_fusion([vector_hits, lexical_hits]) if lexical_hits else vector_hits
+        if self.use_reranker:
+            return rerank(query, candidates[:max(self.k, RERANK_CANDIDATES)], self.k)
+        return candidates[:self.k]
+
+
+def get_hybrid_retriever(collection_name: str, k: int = 5, filter: dict = None, search_type: str = "similarity",
+                         fetch_k: int = None, lambda_mult: float = 0.5) -> HybridRetriever:
+    """
+    Retriever returning the top k fused hits from fetch_k candidates per
+    method, reranked by the cross-encoder when RERANK_ENABLED
+    """
+    return HybridRetriever(collection_name=collection_name, k=k, fetch_k=fetch_k or max(20, k * 4),
+                           filter=filter, search_type=search_type, lambda_mult=lambda_mult)
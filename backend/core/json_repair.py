@@ -0,0 +1,207 @@
+"""
+Structured Output Repair
+Recovers malformed JSON from agent responses with local heuristics first and
+a cheap fast-model repair call second, so the expensive analysis call that
+produced the output never has to be repeated
+"""
+import json
+import re
+import typing
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.output_parsers.json import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import ValidationError
+
+from backend.core.llm_gateway import get_llm
+from backend.utils import metrics
+
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+PYTHON_LITERALS = [(re.compile(r"\bTrue\b"), "true"),
+                   (re.compile(r"\bFalse\b"), "false"),
+                   (re.compile(r"\bNone\b"), "null")]
+
+REPAIR_PROMPT = ChatPromptTemplate.from_template(
+    """The following text was supposed to be a JSON object matching this JSON schema, but it is malformed or incomplete.
+
+JSON schema:
+{schema}
+
+Malformed output:
+{broken_output}
+
+Return ONLY the corrected JSON object. Keep every value that is present, fix the syntax, and fill any missing required field with a sensible value taken from the other fields. Do not add commentary or markdown fences.
+"""
+)
+
+
+def _close_brackets(text: str) -> str:
+    """Closes an unterminated string and any unbalanced braces or brackets."""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = TRAILING_COMMA_PATTERN.sub(r"\1", text.rstrip().rstrip(","))
+    return text + "".join(reversed(stack))
+
+
+def repair_json_text(text: str):
+    """
+    Try progressively more aggressive local fixes on a malformed JSON string
+
+    Returns:
+        The parsed JSON value
+
+    Raises:
+        ValueError: If no heuristic produced valid JSON
+    """
+    candidate = text.strip()
+    fenced = FENCE_PATTERN.search(candidate)
+    if fenced:
+        candidate = fenced.group(1).strip()
+    start = candidate.find("{")
+    if start != -1:
+        end = candidate.rfind("}")
+        candidate = candidate[start:end + 1] if end > start else candidate[start:]
+
+    steps = [
+        lambda s: s,
+        lambda s: s.replace("“", '"').replace("”", '"').replace("’", "'"),
+        lambda s: TRAILING_COMMA_PATTERN.sub(r"\1", s),
+        lambda s: _apply_python_literals(s),
+        _close_brackets,
+    ]
+    for step in steps:
+        candidate = step(candidate)
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    raise ValueError("Local JSON repair heuristics failed")
+
+
+def _apply_python_literals(text: str) -> str:
+    for pattern, replacement in PYTHON_LITERALS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _is_list_annotation(annotation) -> bool:
+    return typing.get_origin(annotation) in (list, typing.List)
+
+
+def coerce_to_schema(data: dict, schema) -> dict:
+    """
+    Fill gaps in a partially valid result so it can pass schema validation
+
+    Missing list fields become [], missing text fields become "Not specified",
+    lone strings in list fields are wrapped and numeric strings such as "7/10"
+    are reduced to their leading integer. Missing numeric and boolean fields
+    are left alone because there is no honest default for them.
+    """
+    coerced = dict(data)
+    for name, field in schema.model_fields.items():
+        value = coerced.get(name)
+        if _is_list_annotation(field.annotation):
+            if value is None:
+                coerced[name] = []
+            elif isinstance(value, str):
+                coerced[name] = [value]
+        elif field.annotation is str:
+            if value is None:
+                coerced[name] = "Not specified"
+            elif not isinstance(value, str):
+                coerced[name] = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+        elif field.annotation is int and isinstance(value, str):
+            match = re.search(r"-?\d+", value)
+            if match:
+                coerced[name] = int(match.group())
+    return coerced
+
+
+class RepairingJsonOutputParser(JsonOutputParser):
+    """
+    JsonOutputParser that repairs instead of failing
+
+    Order of attempts: strict parse, local heuristics, schema coercion, then a
+    single fast-model repair call that only sees the broken output.
+
+    With coerce=False only the JSON syntax is repaired: the object is returned
+    as parsed, without schema validation, coercion or the repair call, so the
+    model cascade can reject an incomplete fast-model answer and escalate it
+    instead of accepting placeholder values.
+    """
+
+    coerce: bool = True
+
+    def _validate(self, data):
+        if self.pydantic_object is None:
+            return data
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+        if not self.coerce:
+            return data
+        try:
+            self.pydantic_object(**data)
+            return data
+        except ValidationError:
+            coerced = coerce_to_schema(data, self.pydantic_object)
+            self.pydantic_object(**coerced)
+            metrics.increment("json_repair.schema_coercions")
+            return coerced
+
+    def _llm_repair(self, broken_output: str):
+        schema = json.dumps(self.pydantic_object.model_json_schema()) \
+            if self.pydantic_object else "Any valid JSON object"
+        chain = REPAIR_PROMPT | get_llm("fast") | StrOutputParser()
+        fixed = chain.invoke(
+            {"schema": schema, "broken_output": broken_output})
+        return self._validate(repair_json_text(fixed))
+
+    def parse_result(self, result, *, partial: bool = False):
+        if partial:
+            return super().parse_result(result, partial=True)
+
+        text = result[0].text
+        try:
+            return self._validate(super().parse_result(result))
+        except (OutputParserException, ValueError):
+            pass
+
+        metrics.increment("json_repair.attempts")
+        try:
+            repaired = self._validate(repair_json_text(text))
+            metrics.increment("json_repair.local_repairs")
+            return repaired
+        except (ValueError, ValidationError):
+            if not self.coerce:
+                metrics.increment("json_repair.failures")
+                raise OutputParserException(
+                    f"Invalid json output: {text}", llm_output=text)
+
+        metrics.increment("json_repair.llm_retries")
+        try:
+            repaired = self._llm_repair(text)
+            metrics.increment("json_repair.llm_repairs")
+            return repaired
+        except Exception as e:
+            metrics.increment("json_repair.failures")
+            raise OutputParserException(
+                f"Invalid json output: {text}", llm_output=text) from e
@@ -0,0 +1,227 @@
+"""
+File-Backed Legal Index
+Compact on-disk index of the legal knowledge base: a float16 matrix of
+normalized chunk embeddings plus a JSON file of chunk texts and metadata.
+Workers memory-map the matrix (so processes share its pages) and search it
+with one vectorized dot product, without a database round trip. Each build
+is written to its own version directory and published by replacing a
+pointer file, which workers watch to remap after a rebuild.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+from backend.core.embeddings import get_embeddings, EMBEDDING_MODEL_ID
+from backend.core.reranker import rerank, RERANK_ENABLED, RERANK_CANDIDATES
+from backend.utils.tracing import span
+
+LEGAL_INDEX_ENABLED = os.getenv("LEGAL_INDEX_ENABLED", "false").lower() == "true"
+LEGAL_INDEX_DIR = Path(os.getenv("LEGAL_INDEX_DIR", Path(__file__).parent.parent / "legal_docs" / ".index"))
+MATRIX_FILE = "embeddings.f16"
+CHUNKS_FILE = "chunks.json"
+# Names the version directory holding the current build
+POINTER_FILE = "CURRENT"
+
+
+def _current_dir(directory: Path) -> Path:
+    """The version directory the pointer names, or directory itself for an index built before versioning"""
+    try:
+        return directory / (directory / POINTER_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return directory
+
+
+def _index_stamp(directory: Path):
+    """Changes whenever a build is published; None when there is no index"""
+    for name in (POINTER_FILE, CHUNKS_FILE):
+        try:
+            stat = os.stat(directory / name)
+        except FileNotFoundError:
+            continue
+        return stat.st_ino, stat.st_mtime_ns
+    return None
+
+
+class LegalIndex:
+    """A loaded index; the matrix stays memory-mapped read-only"""
+
+    def __init__(self, directory: Path = LEGAL_INDEX_DIR):
+        directory = _current_dir(directory)
+        with open(directory / CHUNKS_FILE, encoding="utf-8") as f:
+            header = json.load(f)
+        self.model = header["model"]
+        self.chunks = header["chunks"]
+        expected = len(self.chunks) * header["dimensions"] * 2
+        if os.path.getsize(directory / MATRIX_FILE) != expected:
+            raise ValueError("embedding matrix does not match the chunk list")
+        self.matrix = np.memmap(directory / MATRIX_FILE, dtype=np.float16, mode="r",
+                                shape=(len(self.chunks), header["dimensions"]))
+        # Row numbers per metadata value, for prefiltering
+        self._rows_by_value = {}
+        for row, chunk in enumerate(self.chunks):
+            for key, value in chunk["metadata"].items():
+                self._rows_by_value.setdefault((key, str(value)), []).append(row)
+
+    def _candidate_rows(self, filter: dict = None):
+        if not filter:
+            return None
+        rows = None
+        for key, value in filter.items():
+            matching = set(self._rows_by_value.get((key, str(value)), ()))
+            rows = matching if rows is None else rows & matching
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def search(self, query_embedding, k: int = 5, filter: dict = None, search_type: str = "similarity",
+               fetch_k: int = 20, lambda_mult: float = 0.5) -> List[Document]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        rows = self._candidate_rows(filter)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        if not len(matrix):
+            return []
+        # float16 rows are widened per block by numpy; scores are float32
+        scores = matrix @ query
+        top = min(fetch_k if search_type == "mmr" else k, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        if search_type == "mmr":
+            picked = maximal_marginal_relevance(
+                query, matrix[best].astype(np.float32), lambda_mult=lambda_mult, k=min(k, len(best)))
+            best = best[picked]
+        selected = best if rows is None else rows[best]
+        return [Document(page_content=self.chunks[i]["text"], metadata=self.chunks[i]["metadata"])
+                for i in selected]
+
+
+def write_legal_index(chunks: list, directory: Path = LEGAL_INDEX_DIR) -> dict:
+    """
+    Writes the index for chunks [{"id", "text", "metadata"}]
+
+    Embeddings of chunk ids already in the current index are reused, so only
+    new chunks are embedded. Both files go into a new version directory that
+    is published by atomically replacing the pointer file, so a reader never
+    pairs one build's matrix with another's chunk list. Running workers notice
+    the new pointer on their next search and remap; the previous version is
+    kept for readers that resolved the old pointer just before the switch.
+
+    Returns:
+        {"chunks", "embedded"}
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = {}
+    try:
+        existing = LegalIndex(directory)
+        if existing.model == EMBEDDING_MODEL_ID:
+            previous = {chunk["id"]: existing.matrix[row] for row, chunk in enumerate(existing.chunks)}
+    except (OSError, ValueError, KeyError):
+        pass
+
+    missing = [chunk for chunk in chunks if chunk["id"] not in previous]
+    if missing:
+        with span("legal_index.embed", **{"chunks": len(missing)}):
+            vectors = np.asarray(get_embeddings().embed_documents([c["text"] for c in missing]), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        previous.update({chunk["id"]: vector for chunk, vector in zip(missing, vectors)})
+
+    dimensions = len(next(iter(previous.values()))) if previous else 0
+    matrix = np.array([previous[chunk["id"]] for chunk in chunks], dtype=np.float16).reshape(len(chunks), dimensions)
+    previous_version = _current_dir(directory).name
+    version = f"v{time.time_ns()}"
+    (directory / version).mkdir()
+    matrix.tofile(directory / version / MATRIX_FILE)
+    with open(directory / version / CHUNKS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"model": EMBEDDING_MODEL_ID, "dimensions": dimensions, "chunks": chunks}, f)
+    pointer_tmp = directory / (POINTER_FILE + ".tmp")
+    pointer_tmp.write_text(version, encoding="utf-8")
+    os.replace(pointer_tmp, directory / POINTER_FILE)
+
+    # Mapped files stay readable after deletion, so only unreferenced builds
+    # and the files of the unversioned layout are removed
+    for path in directory.iterdir():
+        if path.is_dir() and path.name.startswith("v") and path.name not in (version, previous_version):
+            shutil.rmtree(path, ignore_errors=True)
+    for name in (MATRIX_FILE, CHUNKS_FILE):
+        (directory / name).unlink(missing_ok=True)
+    reset_legal_index()
+    return {"chunks": len(chunks), "embedded": len(missing)}
+
+
+def legal_index_chunk_ids(directory: Path = LEGAL_INDEX_DIR):
+    """Chunk ids in the index on disk, or None if there is no usable index"""
+    try:
+        with open(_current_dir(directory) / CHUNKS_FILE, encoding="utf-8") as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if header.get("model") != EMBEDDING_MODEL_ID:
+        return None
+    return [chunk["id"] for chunk in header["chunks"]]
+
+
+_index = None
+_index_loaded_stamp = None
+_index_lock = threading.Lock()
+
+
+def get_legal_index() -> Optional[LegalIndex]:
+    """
+    The process-wide mapped index; None if it hasn't been built
+
+    Loaded on first use and remapped when another process publishes a rebuild.
+    """
+    global _index, _index_loaded_stamp
+    with _index_lock:
+        stamp = _index_stamp(LEGAL_INDEX_DIR)
+        if _index is None or stamp != _index_loaded_stamp:
+            try:
+                index = LegalIndex(LEGAL_INDEX_DIR)
+            except (OSError, ValueError, KeyError) as e:
+                if _index is not None:
+                    # Keep serving the mapped build rather than nothing
+                    return _index
+                print(f"Legal index unavailable ({e}); run init_legal_kb.py with LEGAL_INDEX_ENABLED=true")
+                return None
+            _index, _index_loaded_stamp = index, stamp
+            print(f"Legal index mapped: {len(_index.chunks)} chunks from {LEGAL_INDEX_DIR}")
+        return _index
+
+
+def reset_legal_index():
+    """Drops the mapping so the next search maps the rebuilt files"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+class LegalIndexRetriever(BaseRetriever):
+    """Retriever over the file-backed legal index"""
+
+    k: int = 5
+    fetch_k: int = 20
+    filter: Optional[dict] = None
+    search_type: str = "similarity"
+    lambda_mult: float = 0.5
+    use_reranker: bool = RERANK_ENABLED
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        index = get_legal_index()
+        if index is None:
+            return []
+        count = max(self.k, RERANK_CANDIDATES) if self.use_reranker else self.k
+        with span("retrieval.legal_index", **{"k": count}):
+            documents = index.search(get_embeddings().embed_query(query), k=count, filter=self.filter,
+                                     search_type=self.search_type, fetch_k=max(self.fetch_k, count),
+                                     lambda_mult=self.lambda_mult)
+        if self.use_reranker:
+            return rerank(query, documents, self.k)
+        return documents
@@ -2,109 +2,188 @@
 Legal Knowledge Base for Privacy Regulations
 Loads and indexes legal reference documents for accurate compliance assessments
 """
-import os
+import hashlib
+import json
+import uuid
 from pathlib import Path
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
-from langchain_community.vectorstores.pgvector import PGVector
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from backend.core.vector_store import get_vector_store, uses_pgvector, LEGAL_COLLECTION
+from backend.core.hybrid_retrieval import get_hybrid_retriever
+from backend.core.legal_index import (
+    LegalIndexRetriever, LEGAL_INDEX_ENABLED, legal_index_chunk_ids, write_legal_index, get_legal_index
+)
+from backend.utils.db import (
+    get_legal_manifest, save_legal_manifest, delete_legal_manifest, delete_legal_chunks
+)
+
 
 def get_legal_vector_store():
     """Get vector store for legal reference documents"""
-    embeddings = FastEmbedEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    connection_string = PGVector.connection_string_from_db_params(
-        driver="psycopg2",
-        host=os.getenv("DB_HOST"),
-        port=int(os.getenv("DB_PORT", 5432)),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD")
-    )
-    return PGVector(
-        connection_string=connection_string,
-        embedding_function=embeddings,
-        collection_name="legal_knowledge_base",
-        pre_delete_collection=False
-    )
+    return get_vector_store(LEGAL_COLLECTION)
 
 
-def ingest_legal_documents():
-    """
-    Ingest legal reference documents into vector database
-    Call this once to populate the legal knowledge base
-    """
-    legal_docs_dir = Path(__file__).parent.parent / "legal_docs"
+# Metadata for a regulation file comes from an optional <name>.json next to it
+LEGAL_DOCS_DIR = Path(__file__).parent.parent / "legal_docs"
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c9a52-3a8e-4c1e-9b8f-2d7f0c4e5a11")
+# Bump when the splitter settings change so every file is re-chunked
+CHUNKING_VERSION = 1
 
-    if not legal_docs_dir.exists():
-        print(f"Legal docs directory not found: {legal_docs_dir}")
-        return
-
-    # Define document metadata
-    legal_files = {
-        "gdpr_requirements.txt": {
-            "regulation": "GDPR",
-            "jurisdiction": "EU",
-            "full_name": "General Data Protection Regulation",
-            "type": "regulation"
-        },
-        "coppa_requirements.txt": {
-            "regulation": "COPPA",
-            "jurisdiction": "USA",
-            "full_name": "Children's Online Privacy Protection Act",
-            "type": "law"
-        },
-        "ccpa_requirements.txt": {
-            "regulation": "CCPA",
-            "jurisdiction": "California, USA",
-            "full_name": "California Consumer Privacy Act",
-            "type": "law"
-        }
-    }
-
-    text_splitter = RecursiveCharacterTextSplitter(
+# Manifest used when the vector store is not pgvector (e.g. in-memory benchmarks)
+_memory_manifest = {}
+
+
+def _legal_text_splitter():
+    return RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=150,
         separators=["\n\n=====", "\n\n", "\n", " ", ""]
     )
 
-    all_documents = []
 
-    for filename, metadata in legal_files.items():
-        file_path = legal_docs_dir / filename
+def _file_metadata(path: Path) -> dict:
+    """Metadata for a regulation file: <name>.json if present, else derived from the file name"""
+    regulation = path.stem.replace("_requirements", "").upper()
+    metadata = {"regulation": regulation, "jurisdiction": "Unknown",
+                "full_name": regulation, "type": "regulation"}
+    sidecar = path.with_suffix(".json")
+    if sidecar.exists():
+        metadata.update(json.loads(sidecar.read_text(encoding="utf-8")))
+    return {**metadata, "source_file": path.name}
 
-        if not file_path.exists():
-            print(f"Warning: {filename} not found")
-            continue
 
-        # Read file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+def _chunk_id(metadata_hash: str, chunk: str) -> str:
+    chunk_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{metadata_hash}:{chunk_hash}"))
 
-        # Split into chunks
-        chunks = text_splitter.split_text(content)
 
-        # Create documents with metadata
-        for chunk in chunks:
-            doc = Document(
-                page_content=chunk,
-                metadata={
-                    **metadata,
-                    "source_file": filename
-                }
-            )
-            all_documents.append(doc)
+def _load_manifest() -> dict:
+    return get_legal_manifest() if uses_pgvector() else dict(_memory_manifest)
 
-        print(f"Loaded {filename}: {len(chunks)} chunks")
 
-    # Add to vector store
-    if all_documents:
-        vector_store = get_legal_vector_store()
-        vector_store.add_documents(all_documents)
-        print(
-            f"\nTotal: Ingested {len(all_documents)} legal document chunks into knowledge base")
+def _save_manifest(source_file: str, file_hash: str, chunk_ids: list):
+    if uses_pgvector():
+        save_legal_manifest(source_file, file_hash, chunk_ids)
     else:
-        print("No documents found to ingest")
+        _memory_manifest[source_file] = {"file_hash": file_hash, "chunk_ids": chunk_ids}
+
+
+def _delete_manifest(source_file: str):
+    if uses_pgvector():
+        delete_legal_manifest(source_file)
+    else:
+        _memory_manifest.pop(source_file, None)
+
+
+def _file_hashes(file_path: Path):
+    """(content, metadata, metadata hash, file hash) of a regulation file"""
+    content = file_path.read_text(encoding="utf-8")
+    metadata = _file_metadata(file_path)
+    metadata_hash = hashlib.sha256(json.dumps(
+        [metadata, CHUNKING_VERSION], sort_keys=True).encode("utf-8")).hexdigest()
+    file_hash = hashlib.sha256(f"{metadata_hash}:{content}".encode("utf-8")).hexdigest()
+    return content, metadata, metadata_hash, file_hash
+
+
+def _file_chunks(content: str, metadata_hash: str):
+    chunks = list(dict.fromkeys(_legal_text_splitter().split_text(content)))
+    return chunks, [_chunk_id(metadata_hash, chunk) for chunk in chunks]
+
+
+def _build_legal_index(files: list) -> dict:
+    """Rebuilds the file-backed index when the set of chunks changed"""
+    chunks = []
+    for file_path in files:
+        content, metadata, metadata_hash, _ = _file_hashes(file_path)
+        texts, chunk_ids = _file_chunks(content, metadata_hash)
+        chunks += [{"id": chunk_id, "text": text, "metadata": metadata}
+                   for chunk_id, text in zip(chunk_ids, texts)]
+    old_ids = legal_index_chunk_ids()
+    stats = {"files_skipped": 0, "files_updated": 0, "files_removed": 0, "chunks_added": 0, "chunks_deleted": 0}
+    if old_ids == [chunk["id"] for chunk in chunks]:
+        stats["files_skipped"] = len(files)
+        return stats
+    written = write_legal_index(chunks)
+    current = {chunk["id"] for chunk in chunks}
+    stats.update(files_updated=len(files), chunks_added=written["embedded"],
+                 chunks_deleted=len(set(old_ids or ()) - current))
+    print(f"Wrote legal index: {written['chunks']} chunks, {written['embedded']} embedded")
+    return stats
+
+
+def ingest_legal_documents(legal_docs_dir: Path = LEGAL_DOCS_DIR) -> dict:
+    """
+    Syncs the legal knowledge base with the *.txt files in legal_docs_dir
+
+    Files whose content and metadata hash matches the manifest are skipped.
+    Changed files get their new chunks added and their vanished chunks
+    deleted (chunk ids are derived from the source file, metadata and chunk
+    text), and chunks of removed files are deleted. Safe to re-run, also
+    after an interrupted run: chunk ids are deleted before they are added.
+    With LEGAL_INDEX_ENABLED the file-backed index is built instead and no
+    database is used.
+
+    Returns:
+        {"files_skipped", "files_updated", "files_removed", "chunks_added", "chunks_deleted"}
+    """
+    legal_docs_dir = Path(legal_docs_dir)
+    if not legal_docs_dir.exists():
+        print(f"Legal docs directory not found: {legal_docs_dir}")
+        return {}
+    files = sorted(legal_docs_dir.glob("*.txt"))
+    if LEGAL_INDEX_ENABLED:
+        return _build_legal_index(files)
+
+    manifest = _load_manifest()
+    stats = {"files_skipped": 0, "files_updated": 0, "files_removed": 0,
+             "chunks_added": 0, "chunks_deleted": 0}
+    vector_store = None
+
+    for file_path in files:
+        content, metadata, metadata_hash, file_hash = _file_hashes(file_path)
+        entry = manifest.get(file_path.name)
+        if entry and entry["file_hash"] == file_hash:
+            stats["files_skipped"] += 1
+            continue
+
+        chunks, chunk_ids = _file_chunks(content, metadata_hash)
+        old_ids = set(entry["chunk_ids"]) if entry else set()
+        vector_store = vector_store or get_legal_vector_store()
+
+        if entry is None and uses_pgvector():
+            # Chunks from before the manifest existed were appended with random ids
+            stats["chunks_deleted"] += delete_legal_chunks(file_path.name)
+        current = set(chunk_ids)
+        stale = [chunk_id for chunk_id in old_ids if chunk_id not in current]
+        if stale:
+            vector_store.delete(ids=stale)
+            stats["chunks_deleted"] += len(stale)
+        new = [(chunk_id, chunk) for chunk_id, chunk in zip(chunk_ids, chunks) if chunk_id not in old_ids]
+        if new:
+            # A run that crashed before saving the manifest may have added some
+            # of these already; the pgvector insert doesn't dedupe by id
+            vector_store.delete(ids=[chunk_id for chunk_id, _ in new])
+            vector_store.add_documents(
+                [Document(page_content=chunk, metadata=metadata) for _, chunk in new],
+                ids=[chunk_id for chunk_id, _ in new])
+            stats["chunks_added"] += len(new)
+
+        _save_manifest(file_path.name, file_hash, chunk_ids)
+        stats["files_updated"] += 1
+        print(f"Synced {file_path.name}: {len(new)} chunks added, {len(stale)} removed")
+
+    present = {file_path.name for file_path in files}
+    for source_file, entry in manifest.items():
+        if source_file not in present:
+            vector_store = vector_store or get_legal_vector_store()
+            vector_store.delete(ids=entry["chunk_ids"])
+            _delete_manifest(source_file)
+            stats["files_removed"] += 1
+            stats["chunks_deleted"] += len(entry["chunk_ids"])
+            print(f"Removed {source_file}: {len(entry['chunk_ids'])} chunks")
+
+    return stats
 
 
 def get_legal_retriever(regulation_filter=None, k=5):
@@ -118,20 +197,21 @@ def get_legal_retriever(regulation_filter=None, k=5):
     Returns:
         Configured retriever for legal knowledge base
     """
-    vector_store = get_legal_vector_store()
-
-    search_kwargs = {'k': k}
-
-    if regulation_filter:
-        search_kwargs['filter'] = {'regulation': regulation_filter}
-
-    return vector_store.as_retriever(
+    if LEGAL_INDEX_ENABLED:
+        return LegalIndexRetriever(
+            k=k,
+            filter={'regulation': regulation_filter} if regulation_filter else None,
+            search_type="mmr",
+            fetch_k=k * 3,
+            lambda_mult=0.7
+        )
+    return get_hybrid_retriever(
+        LEGAL_COLLECTION,
+        k=k,
+        filter={'regulation': regulation_filter} if regulation_filter else None,
         search_type="mmr",  # Maximum Marginal Relevance for diverse results
-        search_kwargs={
-            **search_kwargs,
-            'fetch_k': k * 3,  # Consider more candidates
-            'lambda_mult': 0.7  # Favor relevance over diversity for legal text
-        }
+        fetch_k=k * 3,  # Consider more candidates
+        lambda_mult=0.7  # Favor relevance over diversity for legal text
     )
 
 
@@ -182,6 +262,9 @@ def format_legal_context(docs):
 # Check if legal KB is initialized
 def is_legal_kb_initialized():
     """Check if legal knowledge base has been populated"""
+    if LEGAL_INDEX_ENABLED:
+        index = get_legal_index()
+        return bool(index and index.chunks)
     try:
         vector_store = get_legal_vector_store()
         # Try a simple query to see if data exists
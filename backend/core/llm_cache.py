@@ -0,0 +1,158 @@
+"""
+Deterministic LLM Response Cache
+Exact-match LangChain cache for the temperature-0 Groq chains, stored in a
+local SQLite file with least-recently-used eviction once a size budget is hit
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from backend.utils import metrics
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent.parent / \
+    ".cache" / "llm_cache.sqlite3"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache keyed by (model configuration hash, rendered prompt hash)
+
+    Only safe for deterministic (temperature=0) models, which is every model
+    the LLM gateway hands out.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                llm_hash TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed_at REAL NOT NULL,
+                PRIMARY KEY (llm_hash, prompt_hash)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_responses_last_accessed ON llm_responses (last_accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()[0]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = (_sha256(llm_string), _sha256(prompt))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_responses WHERE llm_hash = ? AND prompt_hash = ?", key).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE llm_responses SET last_accessed_at = ? WHERE llm_hash = ? AND prompt_hash = ?",
+                    (time.time(), *key))
+                self._conn.commit()
+        if not row:
+            metrics.increment("llm_cache.misses")
+            return None
+        try:
+            generations = [loads(item) for item in json.loads(row[0])]
+        except Exception as e:
+            print(f"Discarding unreadable LLM cache entry: {e}")
+            metrics.increment("llm_cache.misses")
+            return None
+        metrics.increment("llm_cache.hits")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        response = json.dumps([dumps(gen) for gen in return_val])
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        key = (_sha256(llm_string), _sha256(prompt))
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size_bytes FROM llm_responses WHERE llm_hash = ? AND prompt_hash = ?", key).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (llm_hash, prompt_hash, response, size_bytes, created_at, last_accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, response, size, now, now))
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+        metrics.increment("llm_cache.writes")
+
+    def _evict(self):
+        """Drops least recently used entries until the cache is at 90% of its budget."""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT llm_hash, prompt_hash, size_bytes FROM llm_responses ORDER BY last_accessed_at ASC").fetchall()
+        evicted = []
+        for llm_hash, prompt_hash, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((llm_hash, prompt_hash))
+            self._total_bytes -= size
+        self._conn.executemany(
+            "DELETE FROM llm_responses WHERE llm_hash = ? AND prompt_hash = ?", evicted)
+        metrics.increment("llm_cache.evictions", len(evicted))
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            size_bytes = self._total_bytes
+        hits = metrics.get_counter("llm_cache.hits")
+        misses = metrics.get_counter("llm_cache.misses")
+        return {
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": metrics.ratio(hits, hits + misses),
+            "evictions": metrics.get_counter("llm_cache.evictions"),
+        }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """
+    Returns the process-wide response cache, or None when disabled
+    (LLM_CACHE_ENABLED=false).
+    """
+    global _llm_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = SQLiteLLMCache(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            )
+        return _llm_cache
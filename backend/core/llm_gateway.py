@@ -0,0 +1,341 @@
+"""
+Shared LLM Gateway
+Keeps one pooled Groq client per model behind a shared HTTP session, with
+token-bucket rate limiting, jittered retries and coalescing of identical
+in-flight requests. get_llm() hands out a LangChain chat model backed by it
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+import groq
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from langchain_groq import ChatGroq
+from pydantic import Field
+
+from backend.core.llm_cache import get_llm_cache
+
+
+MODELS = {
+    "fast": "llama-3.1-8b-instant",
+    "quality": "llama-3.3-70b-versatile",
+}
+
+# Per-minute limits published by Groq for each model (requests, tokens).
+# Override globally with GROQ_REQUESTS_PER_MINUTE / GROQ_TOKENS_PER_MINUTE.
+MODEL_RATE_LIMITS = {
+    "llama-3.1-8b-instant": {"requests_per_minute": 30, "tokens_per_minute": 6000},
+    "llama-3.3-70b-versatile": {"requests_per_minute": 30, "tokens_per_minute": 12000},
+}
+DEFAULT_RATE_LIMITS = {"requests_per_minute": 30, "tokens_per_minute": 6000}
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 1.0))
+RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 30.0))
+# Completion tokens assumed when a request does not set max_tokens
+COMPLETION_TOKEN_ESTIMATE = 1024
+# How long a coalesced caller waits for the identical in-flight request
+COALESCE_WAIT_SECONDS = float(os.getenv("LLM_COALESCE_WAIT_SECONDS", 300))
+
+RETRYABLE_ERRORS = (
+    groq.RateLimitError,
+    groq.APIConnectionError,
+    groq.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.refill_rate = self.capacity / 60.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1.0):
+        """Blocks until `amount` tokens are available, then takes them."""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.refill_rate
+            time.sleep(min(wait, 5.0))
+
+    def clamp(self, remaining: float):
+        """Aligns the bucket with the provider's reported remaining budget."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, float(remaining))
+
+    def drain(self):
+        """Empties the bucket so every caller backs off after a 429."""
+        with self.lock:
+            self._refill()
+            self.tokens = 0.0
+
+
+def _estimate_request_tokens(body: dict) -> int:
+    """Rough prompt + completion token estimate for a chat completion body."""
+    prompt_chars = sum(len(str(m.get("content") or ""))
+                       for m in body.get("messages", []))
+    completion = body.get("max_tokens") or COMPLETION_TOKEN_ESTIMATE
+    return prompt_chars // 4 + completion
+
+
+def _prompt_key(model_name: str, messages: list, stop=None, **kwargs) -> str:
+    """
+    Stable hash of a model, prompt and call options, used to coalesce requests
+
+    Bound kwargs (tools, response format, max_tokens, ...) and stop sequences
+    are part of the key, so calls that only share a prompt are not merged.
+    """
+    payload = json.dumps([model_name, [[m.type, m.content, getattr(m, "tool_calls", None),
+                                        getattr(m, "tool_call_id", None)] for m in messages],
+                          stop, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMGateway:
+    """Owns the pooled ChatGroq clients and the shared HTTP session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._request_buckets = {}
+        self._token_buckets = {}
+        self._inflight = {}
+        self._http_client = None
+        # Optional replacement used by offline benchmarks: factory(model_name)
+        self._client_factory = None
+
+    # --- Rate limiting ---
+
+    def _limits_for(self, model_name: str) -> dict:
+        limits = dict(MODEL_RATE_LIMITS.get(model_name, DEFAULT_RATE_LIMITS))
+        if os.getenv("GROQ_REQUESTS_PER_MINUTE"):
+            limits["requests_per_minute"] = int(
+                os.environ["GROQ_REQUESTS_PER_MINUTE"])
+        if os.getenv("GROQ_TOKENS_PER_MINUTE"):
+            limits["tokens_per_minute"] = int(
+                os.environ["GROQ_TOKENS_PER_MINUTE"])
+        return limits
+
+    def _buckets_for(self, model_name: str):
+        with self._lock:
+            if model_name not in self._request_buckets:
+                limits = self._limits_for(model_name)
+                self._request_buckets[model_name] = TokenBucket(
+                    limits["requests_per_minute"])
+                self._token_buckets[model_name] = TokenBucket(
+                    limits["tokens_per_minute"])
+            return self._request_buckets[model_name], self._token_buckets[model_name]
+
+    def _on_request(self, request: httpx.Request):
+        """httpx hook: waits for rate-limit budget before each API call."""
+        try:
+            body = json.loads(request.content or b"{}")
+        except ValueError:
+            return
+        model_name = body.get("model")
+        if not model_name:
+            return
+        request_bucket, token_bucket = self._buckets_for(model_name)
+        request_bucket.acquire(1)
+        token_bucket.acquire(_estimate_request_tokens(body))
+
+    def _on_response(self, response: httpx.Response):
+        """httpx hook: syncs the buckets with Groq's rate-limit headers."""
+        try:
+            body = json.loads(response.request.content or b"{}")
+        except ValueError:
+            return
+        model_name = body.get("model")
+        if not model_name:
+            return
+        request_bucket, token_bucket = self._buckets_for(model_name)
+        headers = response.headers
+        if response.status_code == 429:
+            request_bucket.drain()
+            token_bucket.drain()
+            return
+        try:
+            if "x-ratelimit-remaining-requests" in headers:
+                request_bucket.clamp(
+                    float(headers["x-ratelimit-remaining-requests"]))
+            if "x-ratelimit-remaining-tokens" in headers:
+                token_bucket.clamp(
+                    float(headers["x-ratelimit-remaining-tokens"]))
+        except ValueError:
+            pass
+
+    # --- Clients ---
+
+    def _get_http_client(self) -> httpx.Client:
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT", 60)), connect=10.0),
+                limits=httpx.Limits(max_connections=20,
+                                    max_keepalive_connections=10),
+                event_hooks={"request": [self._on_request],
+                             "response": [self._on_response]},
+            )
+        return self._http_client
+
+    def set_client_factory(self, factory):
+        """Replaces how pooled clients are built (pass None to restore Groq)."""
+        with self._lock:
+            self._client_factory = factory
+            self._clients.clear()
+
+    def get_client(self, model_name: str) -> ChatGroq:
+        """Returns the pooled ChatGroq client for a model, creating it once."""
+        with self._lock:
+            client = self._clients.get(model_name)
+            if client is None and self._client_factory is not None:
+                client = self._client_factory(model_name)
+                self._clients[model_name] = client
+            elif client is None:
+                client = ChatGroq(
+                    model=model_name,
+                    temperature=0,
+                    api_key=os.environ.get("GROQ_API_KEY"),
+                    # Retries are handled here so they can share the backoff state
+                    max_retries=0,
+                    http_client=self._get_http_client(),
+                )
+                self._clients[model_name] = client
+            return client
+
+    # --- Invocation ---
+
+    def _generate_with_retries(self, model_name: str, messages: list, stop=None, run_manager=None, **kwargs):
+        client = self.get_client(model_name)
+        attempt = 0
+        while True:
+            try:
+                # Callbacks and the response cache are handled by the
+                # GatewayChatModel around this call, so the client's _generate
+                # is called directly
+                return client._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= MAX_RETRIES:
+                    raise
+                delay = random.uniform(
+                    0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                response = getattr(e, "response", None)
+                retry_after = response.headers.get(
+                    "retry-after") if response is not None else None
+                if retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                attempt += 1
+                print(
+                    f"LLM call to {model_name} failed ({type(e).__name__}), retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def generate(self, model_name: str, messages: list, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        """
+        Calls a model, sharing the result with identical concurrent requests
+
+        Args:
+            model_name: Groq model id
+            messages: Chat messages
+            stop, kwargs: Call options; requests only coalesce when these match
+
+        Returns:
+            The model's ChatResult
+
+        Raises:
+            TimeoutError: If an identical in-flight request does not finish
+                within LLM_COALESCE_WAIT_SECONDS
+        """
+        key = _prompt_key(model_name, messages, stop, **kwargs)
+        with self._lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_leader:
+            return future.result(timeout=COALESCE_WAIT_SECONDS)
+
+        try:
+            result = self._generate_with_retries(
+                model_name, messages, stop, run_manager, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+class GatewayChatModel(BaseChatModel):
+    """Chat model that routes every call through the shared gateway."""
+
+    gateway: Any = Field(exclude=True)
+    model_name: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "gateway"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "temperature": 0}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self.gateway.generate(self.model_name, messages, stop, run_manager, **kwargs)
+
+    def bind_tools(self, tools, **kwargs):
+        """Binds tools in the pooled client's format; calls still go through the gateway"""
+        binding = self.gateway.get_client(self.model_name).bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)
+
+
+_gateway = LLMGateway()
+
+
+def get_gateway() -> LLMGateway:
+    """Returns the process-wide LLM gateway."""
+    return _gateway
+
+
+def get_llm(model_type: str = "fast") -> GatewayChatModel:
+    """
+    Get a gateway-backed chat model
+
+    Args:
+        model_type: "fast" (llama-3.1-8b-instant) or "quality" (llama-3.3-70b-versatile),
+            or a raw Groq model id
+
+    Returns:
+        Chat model that shares clients, rate limits and retries
+    """
+    model_name = MODELS.get(model_type, model_type)
+    # Exact-match response cache; hits never reach the gateway or the HTTP layer
+    return GatewayChatModel(gateway=_gateway, model_name=model_name, cache=get_llm_cache())
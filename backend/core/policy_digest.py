@@ -0,0 +1,156 @@
+"""
+Policy Digest
+Deterministic, structured digest of a privacy policy, built once at ingestion:
+sections with their opening sentence, plus the sentences about data
+collection, sharing, retention, user rights and contacts. Every item keeps
+its character offsets in the original text. Agents that opt in through the
+registry's "digest" fields get a compact rendering instead of the raw policy.
+"""
+import re
+
+# Bump when extraction changes so stored digests are rebuilt on next use
+DIGEST_VERSION = 1
+DIGEST_FIELDS = ("sections", "collection", "sharing", "retention", "rights", "contacts")
+
+MAX_ITEMS_PER_FIELD = 12
+MAX_SENTENCE_CHARS = 300
+
+HEADING_PATTERN = re.compile(
+    r"^(?:(?:section\s+)?(?:\d+(?:\.\d+)*|[ivx]+|[a-z])[.)]?\s+)?[A-Z][^.!?]{2,80}:?$", re.IGNORECASE)
+SENTENCE_PATTERN = re.compile(r".+?(?:[.!?]+(?=\s|$)|$)")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+URL_PATTERN = re.compile(r"https?://[^\s)>\]]+|www\.[^\s)>\]]+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+
+CATEGORY_PATTERNS = {
+    "collection": re.compile(
+        r"\bwe (?:may )?collect|\bcollects?\b|information you provide|automatically (?:collect|log)"
+        r"|\bcookies?\b|\bgeolocation|\blocation data", re.IGNORECASE),
+    "sharing": re.compile(
+        r"\bshar(?:e|es|ed|ing)\b|\bdisclos|\bsell\b|\bsold\b|third[- ]part|\baffiliates?\b"
+        r"|advertising partners|service providers|\btransfer", re.IGNORECASE),
+    "retention": re.compile(
+        r"\bretain|\bretention|\bkeep (?:your|personal|the)|\bstored? for\b|\bdelete[sd]? (?:after|within)"
+        r"|\bas long as\b", re.IGNORECASE),
+    "rights": re.compile(
+        r"\bright(?:s)? (?:to|of|regarding)\b|\bopt[- ]?out\b|\bunsubscribe|\bportab|\berasure|\brectif"
+        r"|\bwithdraw\b|\bdo not sell\b|\b(?:access|correct|delete) (?:your|the|or)\b|\bobject to\b",
+        re.IGNORECASE),
+    "contacts": re.compile(
+        r"\bcontact (?:us|our)\b|\bdata protection officer\b|\bDPO\b|\bemail us\b|\bwrite to us\b"
+        r"|\bmailing address\b", re.IGNORECASE),
+}
+# A sentence is filed under the first (most specific) category it matches
+PRIORITY = ("contacts", "rights", "retention", "sharing", "collection")
+
+
+def _is_heading(line: str, next_line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > 90 or stripped.startswith(("-", "*", "•")):
+        return False
+    if not HEADING_PATTERN.match(stripped):
+        return False
+    if re.match(r"^(?:section\s+)?\d", stripped, re.IGNORECASE):
+        return True
+    # Otherwise a short title-like line on its own, e.g. "Cookies" or "Your Choices"
+    words = stripped.split()
+    return (not next_line.strip() and ":" not in stripped and len(words) <= 8
+            and sum(w[0].isupper() for w in words) * 2 > len(words))
+
+
+def _lines(text: str):
+    """Yields (line, start offset)"""
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        yield line.rstrip("\r\n"), offset
+        offset += len(line)
+
+
+def _sentences(text: str):
+    """Yields (sentence, start, end) with whitespace and bullet markers trimmed"""
+    for line, line_start in _lines(text):
+        for match in SENTENCE_PATTERN.finditer(line):
+            raw = match.group()
+            sentence = raw.strip().lstrip("-*• ").strip()
+            if len(sentence) < 12:
+                continue
+            start = line_start + match.start() + raw.index(sentence)
+            yield sentence, start, start + len(sentence)
+
+
+def _item(text: str, start: int, end: int) -> dict:
+    if len(text) > MAX_SENTENCE_CHARS:
+        text = text[:MAX_SENTENCE_CHARS].rsplit(" ", 1)[0] + "..."
+    return {"text": text, "start": start, "end": end}
+
+
+def extract_sections(text: str) -> list:
+    lines = list(_lines(text))
+    headings = []
+    for i, (line, start) in enumerate(lines):
+        next_line = lines[i + 1][0] if i + 1 < len(lines) else ""
+        if _is_heading(line, next_line):
+            headings.append((line.strip().rstrip(":"), start + len(line) - len(line.lstrip())))
+    sections = []
+    for i, (heading, start) in enumerate(headings):
+        end = headings[i + 1][1] if i + 1 < len(headings) else len(text)
+        body = text[start + len(heading):end]
+        first = next(_sentences(body), None)
+        sections.append({
+            "heading": heading,
+            "start": start,
+            "end": end,
+            "summary": _item(first[0], 0, 0)["text"] if first else "",
+        })
+    return sections
+
+
+def build_digest(policy_text: str) -> dict:
+    """Extracts the digest; same input always yields the same output"""
+    digest = {field: [] for field in DIGEST_FIELDS}
+    digest["sections"] = extract_sections(policy_text)
+    heading_spans = [(s["start"], s["start"] + len(s["heading"])) for s in digest["sections"]]
+
+    seen = {field: set() for field in DIGEST_FIELDS}
+    for sentence, start, end in _sentences(policy_text):
+        if any(h_start <= start < h_end for h_start, h_end in heading_spans):
+            continue
+        field = next((f for f in PRIORITY if CATEGORY_PATTERNS[f].search(sentence)), None)
+        if field and len(digest[field]) < MAX_ITEMS_PER_FIELD and sentence not in seen[field]:
+            seen[field].add(sentence)
+            digest[field].append(_item(sentence, start, end))
+
+    # Contact details are kept even when no sentence mentions "contact us"
+    for pattern in (EMAIL_PATTERN, URL_PATTERN, PHONE_PATTERN):
+        for match in pattern.finditer(policy_text):
+            value = match.group().rstrip(".,;")
+            if value in seen["contacts"] or len(digest["contacts"]) >= MAX_ITEMS_PER_FIELD:
+                continue
+            seen["contacts"].add(value)
+            digest["contacts"].append(_item(value, match.start(), match.start() + len(value)))
+
+    digest["version"] = DIGEST_VERSION
+    digest["source_chars"] = len(policy_text)
+    return digest
+
+
+def render_digest(digest: dict, fields=DIGEST_FIELDS) -> str:
+    """Compact prompt rendering; [start-end] are character offsets into the full policy"""
+    parts = [f"Policy digest ({digest.get('source_chars', 0)} characters in full; "
+             "[start-end] are character offsets into the original)"]
+    titles = {
+        "sections": "Sections", "collection": "Data collected", "sharing": "Sharing and disclosure",
+        "retention": "Retention", "rights": "User rights and choices", "contacts": "Contacts",
+    }
+    for field in fields:
+        items = digest.get(field) or []
+        if not items:
+            continue
+        parts.append(f"\n## {titles.get(field, field)}")
+        for item in items:
+            if field == "sections":
+                summary = f": {item['summary']}" if item["summary"] else ""
+                parts.append(f"- [{item['start']}-{item['end']}] {item['heading']}{summary}")
+            else:
+                parts.append(f"- [{item['start']}-{item['end']}] {item['text']}")
+    return "\n".join(parts)
@@ -0,0 +1,180 @@
+"""
+Policy Change Monitor
+Periodically re-fetches tracked policy URLs and re-analyzes them only when
+they changed materially. An unchanged content hash ends the check; otherwise
+the page's SimHash is compared with that of the last analyzed version and
+re-analysis runs once similarity drops below MONITOR_SIMILARITY_THRESHOLD,
+or sooner when an added or removed sentence concerns data collection,
+sharing or user rights (a 64-bit SimHash can miss a one-sentence edit).
+Checks run on a bounded worker pool with at most one request in flight per
+host and a minimum delay between requests to the same host.
+"""
+import os
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from backend.utils import metrics
+from backend.core.policy_versioning import changed_topics
+from backend.utils.db import claim_due_tracked_policies, record_tracked_check, get_policy_text
+from backend.utils.fingerprint import (
+    content_fingerprint, simhash, similarity, to_signed64, from_signed64
+)
+from backend.utils.parser import get_text_from_url
+from backend.utils.tracing import span
+
+MONITOR_ENABLED = os.getenv("MONITOR_ENABLED", "false").lower() == "true"
+MONITOR_POLL_SECONDS = float(os.getenv("MONITOR_POLL_SECONDS", 60))
+MONITOR_MAX_WORKERS = int(os.getenv("MONITOR_MAX_WORKERS", 4))
+MONITOR_BATCH_SIZE = int(os.getenv("MONITOR_BATCH_SIZE", 50))
+MONITOR_HOST_DELAY_SECONDS = float(os.getenv("MONITOR_HOST_DELAY_SECONDS", 10))
+MONITOR_SIMILARITY_THRESHOLD = float(os.getenv("MONITOR_SIMILARITY_THRESHOLD", 0.97))
+MONITOR_MIN_INTERVAL_SECONDS = int(os.getenv("MONITOR_MIN_INTERVAL_SECONDS", 3600))
+# A claimed check that has not been recorded within this time is picked up again
+MONITOR_LEASE_SECONDS = int(os.getenv("MONITOR_LEASE_SECONDS", 1800))
+MAX_RETRY_SECONDS = 6 * 3600
+# Edits to these topics are re-analyzed even when the page is otherwise near-identical
+MATERIAL_TOPICS = {"collection", "sharing", "rights"}
+
+
+class HostThrottle:
+    """Serializes requests per host and spaces them at least `delay` seconds apart."""
+
+    def __init__(self, delay: float = MONITOR_HOST_DELAY_SECONDS):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._host_locks = defaultdict(threading.Lock)
+        self._last_request = {}
+
+    def __call__(self, host: str):
+        with self._lock:
+            host_lock = self._host_locks[host]
+        return _HostSlot(self, host, host_lock)
+
+
+class _HostSlot:
+    def __init__(self, throttle, host, lock):
+        self.throttle, self.host, self.lock = throttle, host, lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        wait_for = self.throttle._last_request.get(self.host, 0) + self.throttle.delay - time.monotonic()
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+    def __exit__(self, *exc):
+        self.throttle._last_request[self.host] = time.monotonic()
+        self.lock.release()
+
+
+def _interleave_hosts(rows: list) -> list:
+    """Round-robin by host so one vendor's many URLs don't tie up every worker"""
+    by_host = defaultdict(deque)
+    for row in rows:
+        by_host[urlparse(row["url"]).netloc.lower()].append(row)
+    ordered = []
+    while by_host:
+        for host in list(by_host):
+            ordered.append(by_host[host].popleft())
+            if not by_host[host]:
+                del by_host[host]
+    return ordered
+
+
+class PolicyMonitor:
+    """
+    Checks due tracked URLs
+
+    Args:
+        analyze: callable(user_id, policy_text, previous_policy_id) -> policy_id
+            that runs (incremental) analysis and stores the result
+    """
+
+    def __init__(self, analyze, max_workers: int = MONITOR_MAX_WORKERS,
+                 threshold: float = MONITOR_SIMILARITY_THRESHOLD):
+        self.analyze = analyze
+        self.threshold = threshold
+        self.throttle = HostThrottle()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="policy-monitor")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self, tracked: dict) -> str:
+        """Checks one tracked URL and records the outcome; returns the status"""
+        host = urlparse(tracked["url"]).netloc.lower()
+        try:
+            with self.throttle(host), span("monitor.fetch", **{"http.url": tracked["url"]}):
+                # Anything fetched within the last interval is fresh enough
+                text = get_text_from_url(tracked["url"], max_age=min(
+                    tracked["check_interval_seconds"] / 2, MONITOR_MIN_INTERVAL_SECONDS))
+        except Exception as e:
+            failures = tracked["consecutive_failures"] + 1
+            retry = min(MAX_RETRY_SECONDS, 300 * 2 ** min(failures, 10))
+            record_tracked_check(tracked["tracked_id"], "error", error=str(e)[:500], retry_seconds=retry)
+            metrics.increment("monitor.errors")
+            return "error"
+
+        text_hash = content_fingerprint(text)
+        if text_hash == tracked["content_hash"] and tracked["policy_id"]:
+            record_tracked_check(tracked["tracked_id"], "unchanged")
+            metrics.increment("monitor.unchanged")
+            return "unchanged"
+
+        fingerprint = simhash(text)
+        analyzed = tracked["analyzed_simhash"]
+        if tracked["policy_id"] and analyzed is not None and \
+                similarity(fingerprint, from_signed64(analyzed)) >= self.threshold:
+            analyzed_text = get_policy_text(tracked["policy_id"])
+            if not (analyzed_text and changed_topics(analyzed_text, text) & MATERIAL_TOPICS):
+                # Cosmetic change; drift is measured against the analyzed version, so
+                # small edits still add up to a re-analysis eventually
+                record_tracked_check(tracked["tracked_id"], "changed", content_hash=text_hash)
+                metrics.increment("monitor.minor_changes")
+                return "changed"
+            metrics.increment("monitor.material_edits")
+
+        try:
+            policy_id = self.analyze(tracked["user_id"], text, tracked["policy_id"])
+        except Exception as e:
+            traceback.print_exc()
+            record_tracked_check(tracked["tracked_id"], "error", error=f"Analysis failed: {e}"[:500],
+                                 retry_seconds=MAX_RETRY_SECONDS)
+            metrics.increment("monitor.errors")
+            return "error"
+        record_tracked_check(tracked["tracked_id"], "reanalyzed", content_hash=text_hash,
+                             analyzed_simhash=to_signed64(fingerprint), policy_id=policy_id)
+        metrics.increment("monitor.reanalyzed")
+        return "reanalyzed"
+
+    def run_once(self) -> dict:
+        """Claims one batch of due URLs and checks them; returns status counts"""
+        rows = claim_due_tracked_policies(MONITOR_BATCH_SIZE, MONITOR_LEASE_SECONDS)
+        futures = [self.executor.submit(self.check, row) for row in _interleave_hosts(rows)]
+        wait(futures)
+        counts = defaultdict(int)
+        for future in futures:
+            counts[future.result()] += 1
+        if rows:
+            print(f"Policy monitor: checked {len(rows)} URLs {dict(counts)}")
+        return dict(counts)
+
+    def run(self):
+        """Checks due URLs every MONITOR_POLL_SECONDS in the calling thread until stop()"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Policy monitor: batch failed ({e})")
+            self._stop.wait(MONITOR_POLL_SECONDS)
+
+    def start(self):
+        """Runs the monitor on a background thread; safe with several processes"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="policy-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
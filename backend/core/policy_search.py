@@ -0,0 +1,59 @@
+"""
+Cross-Policy Search
+Semantic search over every policy a user can see. Chunk hits come from one
+vector query filtered to the visible owners' chunks, then are grouped by
+policy and ranked by each policy's best hit; pages are taken over the
+groups. At most SEARCH_MAX_CHUNKS chunks are fetched per page; when that
+cap cuts the results short the response says so.
+"""
+import os
+
+from backend.core.embeddings import get_embeddings
+from backend.utils.tracing import span
+
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_HITS_PER_POLICY = int(os.getenv("SEARCH_HITS_PER_POLICY", 3))
+# Upper bound on chunks fetched for one page, so deep pages stay cheap
+SEARCH_MAX_CHUNKS = int(os.getenv("SEARCH_MAX_CHUNKS", 1000))
+# Shared corpus: policies analyzed by this account are searchable by everyone
+PUBLIC_CORPUS_USERNAME = os.getenv("PUBLIC_CORPUS_USERNAME")
+
+
+def group_hits(hits: list, hits_per_policy: int = SEARCH_HITS_PER_POLICY) -> list:
+    """Groups chunk hits by policy, best policy first, keeping each policy's top hits"""
+    groups = {}
+    for hit in sorted(hits, key=lambda h: h["score"], reverse=True):
+        group = groups.setdefault(hit["policy_id"], {
+            "policy_id": hit["policy_id"], "title": hit["title"], "score": hit["score"], "hits": []})
+        if len(group["hits"]) < hits_per_policy:
+            group["hits"].append({"text": hit["text"], "score": round(hit["score"], 4)})
+    for group in groups.values():
+        group["score"] = round(group["score"], 4)
+    return list(groups.values())
+
+
+def search_policies(query: str, owner_ids: list, search_chunks, limit: int = 10, offset: int = 0) -> dict:
+    """
+    Searches the policies owned by owner_ids
+
+    Args:
+        search_chunks: callable(query_embedding, owner_ids, k) returning
+            chunk hits ({"policy_id", "title", "text", "score"}), best first
+        limit, offset: page of policies
+
+    Returns:
+        {"results": [{"policy_id", "title", "score", "hits"}], "next_offset",
+         "truncated"}; truncated is True when the SEARCH_MAX_CHUNKS cap was
+        reached, so policies beyond this page (or missing from it) may exist
+        even when next_offset is None
+    """
+    # Enough chunks that the requested page of policies is usually complete
+    k = min(SEARCH_MAX_CHUNKS, (offset + limit + 1) * SEARCH_HITS_PER_POLICY * 2)
+    with span("policy_search", **{"search.k": k, "search.owners": len(owner_ids)}):
+        embedding = get_embeddings().embed_query(query)
+        hits = search_chunks(embedding, owner_ids, k)
+    groups = group_hits(hits)
+    page = groups[offset:offset + limit]
+    has_more = len(groups) > offset + limit
+    truncated = k == SEARCH_MAX_CHUNKS and len(hits) >= k
+    return {"results": page, "next_offset": offset + limit if has_more else None, "truncated": truncated}
@@ -0,0 +1,250 @@
+"""
+Policy Versioning
+Section-level diff between two versions of a company's policy and an
+incremental re-analysis that only sends changed sections to the model.
+PrivacyAnalysis fields whose topics no changed section touches are carried
+over from the previous version unchanged; the company name is re-derived
+from the new text whenever its header or first section changed.
+"""
+import hashlib
+import json
+import os
+import re
+
+from backend.core import llm_gateway
+from backend.core.agents import create_company_name_agent, create_update_agent
+from backend.core.policy_digest import CATEGORY_PATTERNS, SENTENCE_PATTERN, extract_sections
+from backend.core.pydantic_models import PrivacyAnalysis
+from backend.utils import metrics
+from backend.utils.fingerprint import simhash, similarity
+from backend.utils.tracing import span
+
+POLICY_VERSIONING_ENABLED = os.getenv("POLICY_VERSIONING_ENABLED", "true").lower() == "true"
+# Re-run the full analysis instead when more than this share of the new text changed
+MAX_CHANGED_FRACTION = float(os.getenv("POLICY_DIFF_MAX_CHANGED_FRACTION", 0.6))
+# SimHash similarity a policy found by company name needs to count as a revision;
+# unrelated texts land around 0.5
+MIN_VERSION_SIMILARITY = float(os.getenv("POLICY_VERSION_MIN_SIMILARITY", 0.8))
+# The company name is read from the opening of the new text
+COMPANY_NAME_CONTEXT_CHARS = 3000
+
+PREAMBLE_HEADING = "(preamble)"
+LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*•◦]|\([a-z0-9]{1,3}\))\s+", re.IGNORECASE)
+# Digest categories whose changes can affect each extracted field; risk_score
+# and final_summary are refreshed whenever anything changed
+FIELD_TOPICS = {
+    "pii_collected": ("collection",),
+    "data_sharing_practices": ("sharing",),
+    "retention_summary": ("retention",),
+}
+ALWAYS_REFRESHED = ("risk_score", "final_summary")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _heading_key(heading: str) -> str:
+    # "3. How We Share Your Information" and "4. How we share your information" match
+    return _normalize(re.sub(r"^(?:section\s+)?(?:\d+(?:\.\d+)*|[ivx]+|[a-z])[.)]\s+", "",
+                             heading.strip(), flags=re.IGNORECASE))
+
+
+def split_sections(text: str) -> list:
+    """[{heading, key, start, end, text, hash}] covering the whole text"""
+    bounds = [(s["heading"], s["start"], s["end"]) for s in extract_sections(text)]
+    if not bounds:
+        bounds = [(PREAMBLE_HEADING, 0, len(text))]
+    elif bounds[0][1] > 0:
+        bounds.insert(0, (PREAMBLE_HEADING, 0, bounds[0][1]))
+    sections = []
+    for heading, start, end in bounds:
+        # Hash the body without its heading so renumbered sections still match
+        body = text[start:end] if heading == PREAMBLE_HEADING else text[start + len(heading):end]
+        sections.append({
+            "heading": heading,
+            "key": _heading_key(heading),
+            "start": start,
+            "end": end,
+            "text": text[start:end],
+            "hash": hashlib.sha256(_normalize(body).encode("utf-8")).hexdigest(),
+        })
+    return sections
+
+
+def diff_sections(old_text: str, new_text: str) -> dict:
+    """
+    Matches sections by heading (ignoring numbering), falling back to content
+
+    Returns:
+        {"added": [...], "removed": [...], "modified": [...], "unchanged": [...]}
+        with new-version sections, except "removed" which holds old ones
+    """
+    old_sections = split_sections(old_text)
+    new_sections = split_sections(new_text)
+    old_by_key = {s["key"]: s for s in old_sections}
+    old_hashes = {s["hash"] for s in old_sections}
+    matched_keys = set()
+    diff = {"added": [], "removed": [], "modified": [], "unchanged": []}
+    for section in new_sections:
+        previous = old_by_key.get(section["key"])
+        if previous is not None:
+            matched_keys.add(section["key"])
+            diff["unchanged" if previous["hash"] == section["hash"] else "modified"].append(section)
+        elif section["hash"] in old_hashes:
+            # Renamed heading, same content
+            diff["unchanged"].append(section)
+        else:
+            diff["added"].append(section)
+    new_hashes = {s["hash"] for s in new_sections}
+    diff["removed"] = [s for s in old_sections
+                       if s["key"] not in matched_keys and s["hash"] not in new_hashes]
+    return diff
+
+
+def _blocks(text: str) -> list:
+    """
+    (is_list_item, text) for each paragraph and list item
+
+    A paragraph's wrapped lines are joined, so reflowing it changes nothing.
+    Indented lines under a list item continue that item.
+    """
+    blocks = []
+    current = None
+    for line in text.splitlines():
+        if not line.strip():
+            current = None
+            continue
+        bullet = LIST_ITEM_PATTERN.match(line)
+        if bullet:
+            current = [True, line[bullet.end():].strip()]
+            blocks.append(current)
+        elif current is not None and (not current[0] or line[:1].isspace()):
+            current[1] += " " + line.strip()
+        else:
+            current = [False, line.strip()]
+            blocks.append(current)
+    return [(is_item, block) for is_item, block in blocks]
+
+
+def _sentence_set(text: str) -> set:
+    """
+    Normalized sentences of each paragraph and list item
+
+    A list item is prefixed with the sentence that introduces its list, so
+    "- data brokers" under "We share data with:" reads as a sharing sentence.
+    """
+    sentences = set()
+    lead_in = ""
+    for is_item, block in _blocks(text):
+        found = [m.group() for m in SENTENCE_PATTERN.finditer(block) if m.group().strip()]
+        if is_item:
+            sentences.update(_normalize(f"{lead_in} {sentence}") for sentence in found)
+        elif found:
+            sentences.update(_normalize(sentence) for sentence in found)
+            lead_in = found[-1]
+    return sentences
+
+
+def changed_topics(old_text: str, new_text: str) -> set:
+    """
+    Digest categories ("collection", "sharing", "rights", ...) of the sentences
+    added or removed between two versions
+
+    Works per sentence rather than per section, so one added sentence or
+    list item in a long section is caught while reflowed or reordered text
+    is not.
+    """
+    old_sentences, new_sentences = _sentence_set(old_text), _sentence_set(new_text)
+    edited = (new_sentences - old_sentences) | (old_sentences - new_sentences)
+    return {topic for topic, pattern in CATEGORY_PATTERNS.items()
+            if any(pattern.search(sentence) for sentence in edited)}
+
+
+def affected_fields(diff: dict) -> set:
+    """PrivacyAnalysis fields that the changed sections could alter"""
+    changed = diff["added"] + diff["modified"] + diff["removed"]
+    if not changed:
+        return set()
+    fields = set(ALWAYS_REFRESHED)
+    for field, topics in FIELD_TOPICS.items():
+        if any(CATEGORY_PATTERNS[topic].search(s["text"]) for s in changed for topic in topics):
+            fields.add(field)
+    return fields
+
+
+def is_similar_version(old_text: str, new_text: str) -> bool:
+    """Whether two texts are close enough to be versions of one policy"""
+    return similarity(simhash(old_text), simhash(new_text)) >= MIN_VERSION_SIMILARITY
+
+
+def _opening(text: str) -> list:
+    # The header (preamble) and the first section, where policies name their company
+    sections = split_sections(text)
+    count = 2 if sections[0]["heading"] == PREAMBLE_HEADING else 1
+    return [(s["key"], s["hash"]) for s in sections[:count]]
+
+
+def opening_changed(old_text: str, new_text: str) -> bool:
+    """Whether the header or first section differs, ignoring whitespace and renumbering"""
+    return _opening(old_text) != _opening(new_text)
+
+
+def extract_company_name(text: str) -> str:
+    """The company named in the policy's opening, or "" if the model finds none"""
+    agent = create_company_name_agent(llm_gateway.get_llm("fast"))
+    name = agent.invoke({"policy_opening": text[:COMPANY_NAME_CONTEXT_CHARS]})
+    return name.strip().strip('"').strip()
+
+
+def _format_sections(sections: list) -> str:
+    return "\n\n---\n\n".join(f"[{s['heading']}]\n{s['text'].strip()}" for s in sections) or "(none)"
+
+
+def reanalyze_policy(previous_analysis: dict, old_text: str, new_text: str):
+    """
+    Updates a previous version's analysis for a revised policy text
+
+    Returns:
+        (analysis dict, changes dict), or None when too much of the policy
+        changed for an incremental update to be worthwhile
+    """
+    diff = diff_sections(old_text, new_text)
+    changed = diff["added"] + diff["modified"]
+    changed_chars = sum(len(s["text"]) for s in changed)
+    if new_text and changed_chars > MAX_CHANGED_FRACTION * len(new_text):
+        metrics.increment("policy_versioning.full_reanalysis")
+        return None
+
+    fields = affected_fields(diff)
+    analysis = PrivacyAnalysis(**previous_analysis).model_dump()
+    if fields:
+        with span("policy_versioning.update", **{"sections.changed": len(changed),
+                                                   "sections.removed": len(diff["removed"])}):
+            update_agent = create_update_agent(llm_gateway.get_llm("quality"))
+            updated = update_agent.invoke({
+                "previous_analysis": json.dumps(analysis, indent=2),
+                "changed_sections": _format_sections(changed),
+                "removed_sections": ", ".join(s["heading"] for s in diff["removed"]) or "(none)",
+            })
+        updated = PrivacyAnalysis(**{**analysis, **updated}).model_dump()
+        for field in fields:
+            analysis[field] = updated[field]
+    # Re-read whenever the opening that names the company changed: a policy
+    # sharing another's template must not take its company
+    if opening_changed(old_text, new_text):
+        analysis["company_name"] = extract_company_name(new_text) or previous_analysis.get("company_name", "")
+        if analysis["company_name"] != previous_analysis.get("company_name"):
+            fields.add("company_name")
+    metrics.increment("policy_versioning.incremental_reanalysis")
+
+    changes = {
+        "sections_added": [s["heading"] for s in diff["added"]],
+        "sections_removed": [s["heading"] for s in diff["removed"]],
+        "sections_modified": [s["heading"] for s in diff["modified"]],
+        "sections_unchanged": len(diff["unchanged"]),
+        "changed_chars": changed_chars,
+        "fields_changed": sorted(f for f in fields if analysis[f] != previous_analysis.get(f)),
+        "previous_analysis": {f: previous_analysis.get(f) for f in sorted(fields)},
+    }
+    return analysis, changes
@@ -3,47 +3,63 @@ Specialized Privacy-Centric AI Agents
 Each agent handles a specific privacy-related task
 """
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain_groq import ChatGroq
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
-from langchain_community.vectorstores.pgvector import PGVector
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 
 # Import legal knowledge base
 from backend.core.legal_knowledge_base import get_legal_retriever, format_legal_context
+from backend.core import llm_gateway
+from backend.core.vector_store import POLICY_COLLECTION
+from backend.core.hybrid_retrieval import get_hybrid_retriever
+from backend.core.json_repair import RepairingJsonOutputParser
+from backend.core.policy_digest import render_digest
+
+# Agents with "digest" fields get the stored policy's digest instead of its full text
+POLICY_DIGEST_ENABLED = os.getenv(
+    "POLICY_DIGEST_ENABLED", "true").lower() not in ("0", "false", "no")
+# A digest with fewer extracted sentences, or covering less of the policy, is not used
+POLICY_DIGEST_MIN_ITEMS = int(os.getenv("POLICY_DIGEST_MIN_ITEMS", 4))
+POLICY_DIGEST_MIN_COVERAGE = float(os.getenv("POLICY_DIGEST_MIN_COVERAGE", 0.03))
 
 
 def get_llm(model_type="fast"):
     """Get appropriate LLM based on task complexity"""
-    if model_type == "fast":
-        return ChatGroq(model="llama-3.1-8b-instant", temperature=0)
-    else:  # quality
-        return ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
+    return llm_gateway.get_llm("fast" if model_type == "fast" else "quality")
+
+
+# RAG agents retrieve policy sections with the policy text itself by default.
+# With RAG_TOPIC_QUERIES_ENABLED they use a fixed topic query per agent
+# instead (the embedder only sees the first few hundred tokens of the text),
+# and runs on a stored policy no longer need its full text loaded.
+RAG_TOPIC_QUERIES_ENABLED = os.getenv("RAG_TOPIC_QUERIES_ENABLED", "false").lower() == "true"
+RETRIEVAL_QUERIES = {
+    "gdpr_compliance": "legal basis for processing, data subject rights, data retention, breach notification, "
+                       "data protection officer contact, international transfers, consent and cookies",
+    "data_minimization": "personal information we collect, purposes of collection, optional data, "
+                         "how users can limit or opt out of data collection",
+    "tracker_detector": "third parties, cookies and tracking technologies, analytics, advertising partners, "
+                        "sharing or selling personal data",
+    "breach_risk": "security measures, encryption, access controls, data breach notification, incident response",
+    "kids_privacy": "children under 13, minors, age verification, parental consent, children's personal information",
+}
+
+
+def retrieval_query(agent_type: str, inputs: dict) -> str:
+    """What a RAG agent retrieves policy sections with"""
+    return RETRIEVAL_QUERIES[agent_type] if RAG_TOPIC_QUERIES_ENABLED else inputs["policy_text"]
+
+
+def get_parser(schema, model_type: str):
+    """JSON parser for an agent; fast-model output is not coerced so the cascade can escalate it"""
+    return RepairingJsonOutputParser(pydantic_object=schema, coerce=model_type != "fast")
 
 
 def get_retriever(policy_id: int, k: int = 5):
-    """Get a retriever configured for a specific policy with RAG"""
-    embeddings = FastEmbedEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    connection_string = PGVector.connection_string_from_db_params(
-        driver="psycopg2",
-        host=os.getenv("DB_HOST"),
-        port=int(os.getenv("DB_PORT", 5432)),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD")
-    )
-    vectorstore = PGVector(
-        connection_string=connection_string,
-        embedding_function=embeddings,
-        collection_name="policy_vectors",
-        pre_delete_collection=False
-    )
-    return vectorstore.as_retriever(
-        search_kwargs={'filter': {'policy_id': policy_id}, 'k': k}
-    )
+    """Get a hybrid (vector + full-text) retriever for a specific policy"""
+    return get_hybrid_retriever(POLICY_COLLECTION, k=k, filter={'policy_id': policy_id})
 
 
 # ===== 1. GDPR Compliance Checker Agent =====
@@ -60,14 +76,14 @@ class GDPRCompliance(BaseModel):
     compliance_score: int = Field(description="Compliance score from 1-10")
 
 
-def create_gdpr_compliance_agent(policy_id: int = None):
+def create_gdpr_compliance_agent(policy_id: int = None, model_type: str = "quality"):
     """Analyzes privacy policies for GDPR compliance using RAG and legal knowledge base"""
-    llm = get_llm("quality")
-    parser = JsonOutputParser(pydantic_object=GDPRCompliance)
+    llm = get_llm(model_type)
+    parser = get_parser(GDPRCompliance, model_type)
 
     if policy_id:
         # Use RAG for policy text + legal knowledge base for GDPR requirements
-        policy_retriever = get_retriever(policy_id, k=8)
+        policy_retriever = get_retriever(policy_id, k=6)
         legal_retriever = get_legal_retriever(regulation_filter="GDPR", k=6)
 
         prompt = ChatPromptTemplate.from_template(
@@ -102,21 +118,19 @@ Cite specific GDPR articles when identifying missing or present elements.
         )
 
         def get_contexts(x):
-            policy_query = x["policy_text"]
             # Get relevant GDPR legal requirements
             legal_docs = legal_retriever.invoke(
                 "GDPR compliance requirements data subject rights consent processing")
             # Get relevant policy sections
-            policy_docs = policy_retriever.invoke(policy_query)
+            policy_docs = policy_retriever.invoke(retrieval_query("gdpr_compliance", x))
 
             return {
-                "policy_text": policy_query,
                 "legal_context": format_legal_context(legal_docs),
                 "policy_context": "\n\n---\n\n".join([f"Section {i+1}:\n{doc.page_content}" for i, doc in enumerate(policy_docs)])
             }
 
         return (
-            RunnablePassthrough.assign(**get_contexts)
+            RunnableLambda(get_contexts)
             | prompt.partial(format_instructions=parser.get_format_instructions())
             | llm
             | parser
@@ -214,10 +228,10 @@ class DataMinimizationReport(BaseModel):
         description="Recommendations for users to minimize data sharing")
 
 
-def create_data_minimization_agent(policy_id: int = None):
+def create_data_minimization_agent(policy_id: int = None, model_type: str = "quality"):
     """Advises on minimizing data collection and sharing using RAG"""
-    llm = get_llm("quality")
-    parser = JsonOutputParser(pydantic_object=DataMinimizationReport)
+    llm = get_llm(model_type)
+    parser = get_parser(DataMinimizationReport, model_type)
 
     if policy_id:
         # Use RAG for better context retrieval
@@ -245,7 +259,7 @@ Based on the retrieved sections, provide a comprehensive data minimization asses
 
         return (
             RunnablePassthrough.assign(
-                context=lambda x: retriever.invoke(x["policy_text"]))
+                context=lambda x: retriever.invoke(retrieval_query("data_minimization", x)))
             | prompt.partial(format_instructions=parser.get_format_instructions())
             | llm
             | parser
@@ -290,14 +304,14 @@ class TrackerAnalysis(BaseModel):
         description="Options users have to limit tracking")
 
 
-def create_tracker_detector_agent(policy_id: int = None):
+def create_tracker_detector_agent(policy_id: int = None, model_type: str = "quality"):
     """Identifies third-party trackers and data sharing using RAG"""
-    llm = get_llm("quality")
-    parser = JsonOutputParser(pydantic_object=TrackerAnalysis)
+    llm = get_llm(model_type)
+    parser = get_parser(TrackerAnalysis, model_type)
 
     if policy_id:
         # Use RAG for better context retrieval
-        retriever = get_retriever(policy_id, k=6)
+        retriever = get_retriever(policy_id, k=5)
 
         prompt = ChatPromptTemplate.from_template(
             """You are a privacy tracker detection expert. Analyze these privacy policy sections to identify:
@@ -320,7 +334,7 @@ Based on the retrieved sections, provide a comprehensive tracker analysis.
 
         return (
             RunnablePassthrough.assign(
-                context=lambda x: retriever.invoke(x["policy_text"]))
+                context=lambda x: retriever.invoke(retrieval_query("tracker_detector", x)))
             | prompt.partial(format_instructions=parser.get_format_instructions())
             | llm
             | parser
@@ -391,10 +405,10 @@ class DataBreachRisk(BaseModel):
         description="Advice for users to protect themselves")
 
 
-def create_breach_risk_agent(policy_id: int = None):
+def create_breach_risk_agent(policy_id: int = None, model_type: str = "quality"):
     """Assesses data breach risks and security measures using RAG"""
-    llm = get_llm("quality")
-    parser = JsonOutputParser(pydantic_object=DataBreachRisk)
+    llm = get_llm(model_type)
+    parser = get_parser(DataBreachRisk, model_type)
 
     if policy_id:
         # Use RAG for better context retrieval
@@ -421,7 +435,7 @@ Based on the retrieved sections, provide a comprehensive breach risk assessment.
 
         return (
             RunnablePassthrough.assign(
-                context=lambda x: retriever.invoke(x["policy_text"]))
+                context=lambda x: retriever.invoke(retrieval_query("breach_risk", x)))
             | prompt.partial(format_instructions=parser.get_format_instructions())
             | llm
             | parser
@@ -494,10 +508,10 @@ class ChildPrivacyAssessment(BaseModel):
         description="Recommendations for parents")
 
 
-def create_kids_privacy_agent(policy_id: int = None):
+def create_kids_privacy_agent(policy_id: int = None, model_type: str = "quality"):
     """Specializes in children's privacy protection (COPPA compliance) using RAG and legal knowledge base"""
-    llm = get_llm("quality")
-    parser = JsonOutputParser(pydantic_object=ChildPrivacyAssessment)
+    llm = get_llm(model_type)
+    parser = get_parser(ChildPrivacyAssessment, model_type)
 
     if policy_id:
         # Use RAG for policy text + legal knowledge base for COPPA requirements
@@ -536,21 +550,19 @@ Reference specific COPPA requirements when identifying compliance issues or gaps
         )
 
         def get_contexts(x):
-            policy_query = x["policy_text"]
             # Get relevant COPPA legal requirements
             legal_docs = legal_retriever.invoke(
                 "COPPA children privacy parental consent age verification personal information")
             # Get relevant policy sections
-            policy_docs = policy_retriever.invoke(policy_query)
+            policy_docs = policy_retriever.invoke(retrieval_query("kids_privacy", x))
 
             return {
-                "policy_text": policy_query,
                 "legal_context": format_legal_context(legal_docs),
                 "policy_context": "\n\n---\n\n".join([f"Section {i+1}:\n{doc.page_content}" for i, doc in enumerate(policy_docs)])
             }
 
         return (
-            RunnablePassthrough.assign(**get_contexts)
+            RunnableLambda(get_contexts)
             | prompt.partial(format_instructions=parser.get_format_instructions())
             | llm
             | parser
@@ -604,53 +616,143 @@ Reference specific COPPA requirements when identifying compliance issues or gaps
 
 
 # ===== Agent Registry =====
+# Bump an agent's "prompt_version" in the registry whenever its prompt or
+# output schema changes; stored results from older versions are then ignored.
 PRIVACY_AGENTS = {
     "gdpr_compliance": {
         "name": "GDPR Compliance Checker",
         "description": "Analyzes policies for GDPR compliance and provides recommendations",
         "creator": create_gdpr_compliance_agent,
-        "icon": "shield-check"
+        "prompt_version": 1,
+        "rag": True,
+        "icon": "shield-check",
+        "schema": GDPRCompliance
     },
     "privacy_rights": {
         "name": "Privacy Rights Assistant",
         "description": "Helps you understand and exercise your data rights",
         "creator": create_privacy_rights_agent,
+        "prompt_version": 1,
+        "digest": ["sections", "rights", "contacts", "retention"],
         "icon": "user-check"
     },
     "data_minimization": {
         "name": "Data Minimization Advisor",
         "description": "Identifies excessive data collection and how to minimize sharing",
         "creator": create_data_minimization_agent,
-        "icon": "minimize"
+        "prompt_version": 1,
+        "rag": True,
+        "icon": "minimize",
+        "schema": DataMinimizationReport
     },
     "tracker_detector": {
         "name": "Third-Party Tracker Detector",
         "description": "Reveals all third-party trackers and data sharing",
         "creator": create_tracker_detector_agent,
-        "icon": "eye"
+        "prompt_version": 1,
+        "rag": True,
+        "icon": "eye",
+        "schema": TrackerAnalysis
     },
     "policy_simplifier": {
         "name": "Policy Simplifier",
         "description": "Translates complex legal text into plain language",
         "creator": create_policy_simplifier_agent,
+        "prompt_version": 1,
+        "digest": ["sections", "collection", "sharing", "retention", "rights", "contacts"],
         "icon": "file-text"
     },
     "breach_risk": {
         "name": "Data Breach Risk Assessor",
         "description": "Evaluates security measures and breach risks",
         "creator": create_breach_risk_agent,
-        "icon": "alert-triangle"
+        "prompt_version": 1,
+        "rag": True,
+        "icon": "alert-triangle",
+        "schema": DataBreachRisk
     },
     "privacy_functionality": {
         "name": "Privacy vs. Functionality Advisor",
         "description": "Helps balance privacy with app features",
         "creator": create_privacy_functionality_agent,
+        "prompt_version": 1,
+        "digest": ["sections", "collection", "sharing", "rights"],
         "icon": "scale"
     },
     "kids_privacy": {
         "name": "Kids' Privacy Guardian",
         "description": "Assesses COPPA compliance and children's data protection",
         "creator": create_kids_privacy_agent,
-        "icon": "baby"
+        "prompt_version": 1,
+        "rag": True,
+        "icon": "baby",
+        "schema": ChildPrivacyAssessment
     }
 }
+
+
+def build_privacy_agent(agent_type: str, policy_id: int = None, model_type: str = None):
+    """Instantiate a registered agent, using RAG when it supports a policy_id"""
+    agent = PRIVACY_AGENTS[agent_type]
+    if not agent.get("rag"):
+        return agent["creator"]()
+    kwargs = {}
+    if policy_id:
+        kwargs['policy_id'] = policy_id
+    if model_type:
+        kwargs['model_type'] = model_type
+    return agent["creator"](**kwargs)
+
+
+def agent_input_source(agent_type: str, policy_id: int = None) -> str:
+    """
+    What an agent run on a stored policy needs loaded
+
+    Returns:
+        "retrieval" (RAG agents on topic queries: nothing, sections are retrieved), "digest"
+        (agents opted in to the policy digest) or "text" (the full policy)
+    """
+    agent = PRIVACY_AGENTS[agent_type]
+    if policy_id and agent.get("rag") and RAG_TOPIC_QUERIES_ENABLED:
+        return "retrieval"
+    if policy_id and agent.get("digest") and POLICY_DIGEST_ENABLED:
+        return "digest"
+    return "text"
+
+
+def render_agent_digest(agent_type: str, digest: dict):
+    """
+    The digest fields an agent opted in to, or None to use the full policy text
+
+    Falls back when the opted-in fields hold fewer than POLICY_DIGEST_MIN_ITEMS
+    sentences, when those cover less than POLICY_DIGEST_MIN_COVERAGE of the
+    policy, or when the rendering is no shorter than the policy. Section
+    headings alone don't count: they carry no policy content.
+    """
+    fields = PRIVACY_AGENTS[agent_type]["digest"]
+    source_chars = digest.get("source_chars", 0)
+    items = [item for field in fields if field != "sections" for item in digest.get(field) or []]
+    covered = sum(item["end"] - item["start"] for item in items)
+    if len(items) < POLICY_DIGEST_MIN_ITEMS or covered < POLICY_DIGEST_MIN_COVERAGE * source_chars:
+        return None
+    rendered = render_digest(digest, fields)
+    return rendered if len(rendered) < source_chars else None
+
+
+def build_agent_inputs(agent_type: str, policy_text: str, params: dict = None):
+    """Prepare the invoke() payload an agent expects"""
+    params = params or {}
+    if agent_type == "privacy_rights":
+        return {
+            "policy_text": policy_text,
+            "jurisdiction": params.get("jurisdiction", "General/International"),
+            "question": params.get("question", "What are my privacy rights?")
+        }
+    if agent_type in ["policy_simplifier", "privacy_functionality"]:
+        return {
+            "policy_text": policy_text,
+            "question": params.get("question", ""),
+            "concern": params.get("concern", "")
+        }
+    # For agents that just need policy_text
+    return {"policy_text": policy_text}
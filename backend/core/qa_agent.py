@@ -1,40 +1,29 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableBranch, RunnableLambda, RunnablePassthrough
-from langchain_groq import ChatGroq
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
-from langchain_community.vectorstores.pgvector import PGVector
-from tavily import TavilyClient
-import os
+
+from backend.core.llm_gateway import get_llm
+from backend.core.vector_store import POLICY_COLLECTION
+from backend.core.hybrid_retrieval import get_hybrid_retriever
+from backend.core.web_search import get_web_search
 
 
 def create_qna_agent(policy_id: int):
     """Creates the main Q&A agent with improved RAG, routing and formatting."""
 
     # --- Setup ---
-    fast_llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
-    quality_llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
-    # Use FastEmbed (local embeddings) instead of Google API to avoid quota limits
-    embeddings = FastEmbedEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    connection_string = PGVector.connection_string_from_db_params(
-        driver="psycopg2", host=os.getenv("DB_HOST"), port=int(os.getenv("DB_PORT", 5432)),
-        database=os.getenv("DB_NAME"), user=os.getenv("DB_USER"), password=os.getenv("DB_PASSWORD")
-    )
-    vectorstore = PGVector(
-        connection_string=connection_string, embedding_function=embeddings,
-        collection_name="policy_vectors", pre_delete_collection=False
-    )
-    # Increase k for better coverage and use MMR for diversity
-    retriever = vectorstore.as_retriever(
+    fast_llm = get_llm("fast")
+    quality_llm = get_llm("quality")
+    # MMR vector hits fused with full-text hits, so exact terms are found too
+    retriever = get_hybrid_retriever(
+        POLICY_COLLECTION,
+        k=6,
+        filter={'policy_id': policy_id},
         search_type="mmr",  # Maximum Marginal Relevance for diverse results
-        search_kwargs={
-            'filter': {'policy_id': policy_id},
-            'k': 8,  # Retrieve more documents
-            'fetch_k': 20,  # Consider more candidates before MMR
-            'lambda_mult': 0.5  # Balance between relevance and diversity
-        }
+        fetch_k=20,  # Consider more candidates before fusion
+        lambda_mult=0.5  # Balance between relevance and diversity
     )
-    tavily_search = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+    web_search = get_web_search()
 
     # --- Classifier Chain ---
     classifier_prompt = ChatPromptTemplate.from_messages([
@@ -68,9 +57,10 @@ def create_qna_agent(policy_id: int):
         | policy_rag_prompt | quality_llm | StrOutputParser()
     )
 
+    # Cached and time-bounded; an empty result still lets the LLM answer
     general_search_chain = (
-        RunnablePassthrough.assign(search_results=lambda x: tavily_search.search(
-            query=x["question"], max_results=3)["results"])
+        RunnablePassthrough.assign(search_results=lambda x: web_search.search(
+            x["question"], max_results=3) or "No web results available.")
         | ChatPromptTemplate.from_template("Synthesize the web search results into a coherent answer.\n\nSearch Results:\n{search_results}\n\nQuestion:\n{question}")
         | quality_llm | StrOutputParser()
     )
@@ -0,0 +1,90 @@
+"""
+Cross-Encoder Reranking
+Optional rerank stage for the retrievers: a small local ONNX cross-encoder
+(FastEmbed) scores every candidate against the query in one batched CPU
+pass and the top n are kept. Calls over the latency budget, calls made
+before the model has loaded and calls while every scoring worker is busy
+keep the retriever's original order.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from backend.utils import metrics
+from backend.utils.tracing import span
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+RERANK_TIMEOUT_MS = float(os.getenv("RERANK_TIMEOUT_MS", 300))
+# Candidates scored per call; the retrievers fetch this many before reranking
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+RERANK_THREADS = int(os.getenv("RERANK_THREADS", 0)) or None
+RERANK_MAX_IN_FLIGHT = int(os.getenv("RERANK_MAX_IN_FLIGHT", 2))
+
+_encoder = None
+_load_state = None  # None, "loading", "ready" or "failed"
+_load_lock = threading.Lock()
+# Scoring runs here so a slow call can be abandoned at the budget
+_executor = ThreadPoolExecutor(max_workers=RERANK_MAX_IN_FLIGHT, thread_name_prefix="reranker")
+# Held until a scoring job finishes, including abandoned ones, so timed-out
+# work can't queue up behind the workers and eat later calls' budgets
+_slots = threading.BoundedSemaphore(RERANK_MAX_IN_FLIGHT)
+
+
+def _load_encoder():
+    global _encoder, _load_state
+    try:
+        from fastembed.rerank.cross_encoder import TextCrossEncoder
+        started = time.perf_counter()
+        _encoder = TextCrossEncoder(model_name=RERANK_MODEL, threads=RERANK_THREADS)
+        _load_state = "ready"
+        print(f"Reranker {RERANK_MODEL} loaded in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        _load_state = "failed"
+        print(f"Reranker unavailable, keeping retrieval order: {e}")
+
+
+def get_encoder():
+    """The loaded cross-encoder, or None while it loads (loading starts on first use)"""
+    global _load_state
+    with _load_lock:
+        if _load_state is None:
+            _load_state = "loading"
+            threading.Thread(target=_load_encoder, name="reranker-load", daemon=True).start()
+    return _encoder if _load_state == "ready" else None
+
+
+def rerank(query: str, documents: list, top_n: int, timeout_ms: float = RERANK_TIMEOUT_MS) -> list:
+    """The top_n documents by cross-encoder score, or the first top_n if scoring is unavailable or slow"""
+    if len(documents) <= 1:
+        return documents[:top_n]
+    encoder = get_encoder()
+    if encoder is None:
+        metrics.increment("rerank.fallbacks")
+        return documents[:top_n]
+
+    if not _slots.acquire(blocking=False):
+        metrics.increment("rerank.saturated")
+        return documents[:top_n]
+
+    texts = [doc.page_content for doc in documents]
+    with span("rerank", **{"rerank.model": RERANK_MODEL, "rerank.candidates": len(texts)}) as rerank_span:
+        started = time.perf_counter()
+        future = _executor.submit(lambda: list(encoder.rerank(query, texts, batch_size=len(texts))))
+        future.add_done_callback(lambda _: _slots.release())
+        try:
+            scores = future.result(timeout=timeout_ms / 1000)
+        except FutureTimeout:
+            future.cancel()
+            rerank_span.set_attribute("rerank.timed_out", True)
+            metrics.increment("rerank.timeouts")
+            return documents[:top_n]
+        except Exception as e:
+            print(f"Rerank failed, keeping retrieval order: {e}")
+            metrics.increment("rerank.fallbacks")
+            return documents[:top_n]
+        metrics.observe("rerank", time.perf_counter() - started)
+    metrics.increment("rerank.calls")
+    ranked = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+    return [documents[i] for i in ranked[:top_n]]
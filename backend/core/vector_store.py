@@ -0,0 +1,50 @@
+"""
+Vector Store Factory
+Single place that builds the pgvector stores used for policy chunks and the
+legal knowledge base
+"""
+import os
+
+from langchain_community.vectorstores.pgvector import PGVector
+
+from backend.core.embeddings import get_embeddings
+
+POLICY_COLLECTION = "policy_vectors"
+LEGAL_COLLECTION = "legal_knowledge_base"
+
+# Optional replacement used by offline benchmarks: factory(collection_name, embeddings)
+_vector_store_factory = None
+
+
+def get_connection_string() -> str:
+    return PGVector.connection_string_from_db_params(
+        driver="psycopg2",
+        host=os.getenv("DB_HOST"),
+        port=int(os.getenv("DB_PORT", 5432)),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD")
+    )
+
+
+def get_vector_store(collection_name: str = POLICY_COLLECTION):
+    """Get the vector store for a collection, backed by pgvector by default"""
+    if _vector_store_factory is not None:
+        return _vector_store_factory(collection_name, get_embeddings())
+    return PGVector(
+        connection_string=get_connection_string(),
+        embedding_function=get_embeddings(),
+        collection_name=collection_name,
+        pre_delete_collection=False
+    )
+
+
+def uses_pgvector() -> bool:
+    """True when stores are the pgvector tables, so their rows can be read with SQL"""
+    return _vector_store_factory is None
+
+
+def set_vector_store_factory(factory):
+    """Replace the pgvector backend (pass None to restore it)"""
+    global _vector_store_factory
+    _vector_store_factory = factory
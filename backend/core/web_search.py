@@ -0,0 +1,179 @@
+"""
+Web Search Layer
+Provider abstraction for the Q&A agent's general-question branch, with a TTL
+result cache, a per-call timeout and a cap on in-flight provider calls. Tavily
+is created lazily on the first search, so a missing TAVILY_API_KEY only
+affects general questions. WEB_SEARCH_PROVIDER=fixture serves results from
+a local JSON file for tests and offline deployments.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+
+from backend.utils import metrics
+from backend.utils.tracing import span, SPAN_KIND_CLIENT
+
+WEB_SEARCH_PROVIDER = os.getenv("WEB_SEARCH_PROVIDER", "tavily")
+WEB_SEARCH_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_TIMEOUT_SECONDS", 8))
+WEB_SEARCH_MAX_CONCURRENCY = int(os.getenv("WEB_SEARCH_MAX_CONCURRENCY", 4))
+WEB_SEARCH_CACHE_TTL_SECONDS = float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", 3600))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", 1024))
+WEB_SEARCH_FIXTURE_PATH = os.getenv("WEB_SEARCH_FIXTURE_PATH")
+
+
+class WebSearchUnavailable(Exception):
+    """The provider can't be used (e.g. no API key configured)"""
+
+
+class TavilySearchProvider:
+    """Tavily search; the client is built on first use"""
+
+    name = "tavily"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                api_key = os.getenv("TAVILY_API_KEY")
+                if not api_key:
+                    raise WebSearchUnavailable("TAVILY_API_KEY is not set")
+                from tavily import TavilyClient
+                self._client = TavilyClient(api_key=api_key)
+            return self._client
+
+    def search(self, query: str, max_results: int) -> list:
+        return self._get_client().search(query=query, max_results=max_results)["results"]
+
+
+class FixtureSearchProvider:
+    """
+    Results from a JSON file: {"results": {query: [result, ...]}, "default": [...]}
+
+    Queries match case- and whitespace-insensitively; anything else gets "default".
+    """
+
+    name = "fixture"
+
+    def __init__(self, path=WEB_SEARCH_FIXTURE_PATH):
+        fixture = json.loads(Path(path).read_text(encoding="utf-8")) if path else {}
+        self.results = {self._normalize(query): results
+                        for query, results in fixture.get("results", {}).items()}
+        self.default = fixture.get("default", [])
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def search(self, query: str, max_results: int) -> list:
+        return self.results.get(self._normalize(query), self.default)[:max_results]
+
+
+class WebSearch:
+    """Cached, time-bounded and concurrency-limited searches through a provider"""
+
+    def __init__(self, provider, timeout: float = WEB_SEARCH_TIMEOUT_SECONDS,
+                 max_concurrency: int = WEB_SEARCH_MAX_CONCURRENCY,
+                 ttl: float = WEB_SEARCH_CACHE_TTL_SECONDS, max_entries: int = WEB_SEARCH_CACHE_MAX_ENTRIES):
+        self.provider = provider
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="web-search")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return entry[1]
+            if entry:
+                del self._cache[key]
+        return None
+
+    def search(self, query: str, max_results: int = 3) -> list:
+        """Search results ([{"title", "url", "content", ...}]); [] when the search fails or times out"""
+        key = (" ".join(query.lower().split()), max_results)
+        results = self._cached(key)
+        if results is not None:
+            metrics.increment("web_search.cache_hits")
+            return results
+        metrics.increment("web_search.cache_misses")
+
+        # Waiting for a free slot counts against the same timeout. A slot is
+        # held until the provider call finishes, including calls abandoned
+        # after a timeout, so stuck calls can't queue up behind the workers
+        deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=self.timeout):
+            metrics.increment("web_search.timeouts")
+            return []
+        future = None
+        try:
+            with span("web_search", SPAN_KIND_CLIENT, **{"web_search.provider": self.provider.name}):
+                future = self._executor.submit(self.provider.search, query, max_results)
+                future.add_done_callback(lambda _: self._slots.release())
+                results = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            metrics.increment("web_search.timeouts")
+            return []
+        except Exception as e:
+            if future is None:
+                self._slots.release()
+            print(f"Web search failed ({self.provider.name}): {e}")
+            metrics.increment("web_search.errors")
+            return []
+
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return results
+
+    def stats(self) -> dict:
+        hits = metrics.get_counter("web_search.cache_hits")
+        misses = metrics.get_counter("web_search.cache_misses")
+        with self._lock:
+            entries = len(self._cache)
+        return {"provider": self.provider.name, "entries": entries, "hits": hits, "misses": misses,
+                "hit_ratio": metrics.ratio(hits, hits + misses),
+                "timeouts": metrics.get_counter("web_search.timeouts"),
+                "errors": metrics.get_counter("web_search.errors")}
+
+
+_web_search = None
+_web_search_lock = threading.Lock()
+# Optional replacement provider, e.g. a FixtureSearchProvider in benchmarks
+_provider_override = None
+
+
+def _create_provider():
+    if WEB_SEARCH_PROVIDER == "fixture":
+        return FixtureSearchProvider()
+    return TavilySearchProvider()
+
+
+def get_web_search() -> WebSearch:
+    global _web_search
+    with _web_search_lock:
+        if _web_search is None:
+            _web_search = WebSearch(_provider_override or _create_provider())
+        return _web_search
+
+
+def set_search_provider(provider=None):
+    """Replace the search provider (pass None to restore the configured one); clears the cache"""
+    global _web_search, _provider_override
+    with _web_search_lock:
+        _provider_override = provider
+        _web_search = None
@@ -1,27 +1,85 @@
 import os
+import json
+import base64
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
-from langchain_community.vectorstores.pgvector import PGVector
+import psycopg2.extensions
+from psycopg2.extras import Json
+from psycopg2.pool import ThreadedConnectionPool
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import date
 
 from backend.core.pydantic_models import PrivacyAnalysis
+from backend.core.policy_digest import build_digest, DIGEST_VERSION
+from backend.core.embeddings import EMBEDDING_DIMENSIONS
+from backend.core import vector_store as vector_stores
+from backend.utils.tracing import span, SPAN_KIND_CLIENT
+from backend.utils.user_cache import user_cache
+from backend.utils import metrics
+from backend.utils.policy_text_store import (
+    content_hash, compress_text, decompress_text, policy_text_cache
+)
 
 # --- Database Connection ---
 
 
-def get_db_connection():
+class TracedCursor(psycopg2.extensions.cursor):
+    """Cursor that records a tracing span for every query."""
+
+    def execute(self, query, vars=None):
+        statement = query if isinstance(query, str) else str(query)
+        operation = statement.strip().split(None, 1)[0].lower() if statement.strip() else "query"
+        with span(f"db.{operation}", SPAN_KIND_CLIENT, **{"db.statement": " ".join(statement.split())[:200]}):
+            return super().execute(query, vars)
+
+
+def _connection_params() -> dict:
     db_password = os.getenv("DB_PASSWORD")
     if not db_password:
         raise ValueError(
             "Database password not found in environment. Check your .env file.")
-    return psycopg2.connect(
+    return dict(
         dbname=os.getenv("DB_NAME"), user=os.getenv("DB_USER"),
-        password=db_password, host=os.getenv("DB_HOST"), port=os.getenv("DB_PORT")
+        password=db_password, host=os.getenv("DB_HOST"), port=os.getenv("DB_PORT"),
+        cursor_factory=TracedCursor
     )
 
+
+def get_db_connection():
+    return psycopg2.connect(**_connection_params())
+
+
+# Connections kept open for per-retrieval queries, per process
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", 10))
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises when exhausted; callers wait here instead
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_CONNECTIONS)
+
+
+@contextmanager
+def pooled_connection():
+    """A pooled connection for hot read paths; rolled back and returned afterwards"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(0, DB_POOL_MAX_CONNECTIONS, **_connection_params())
+    with _pool_slots:
+        conn = _pool.getconn()
+        broken = False
+        try:
+            yield conn
+        finally:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            _pool.putconn(conn, close=broken or bool(conn.closed))
+
 # --- User Management Functions ---
 
 
@@ -76,29 +134,188 @@ def get_user_by_id(user_id):
         conn.close()
 
 
-def check_and_update_message_count(user_id):
+def update_user_role(user_id, role):
     conn = get_db_connection()
     cur = conn.cursor()
     try:
         cur.execute(
-            "SELECT role, daily_message_count, last_message_date FROM users WHERE user_id = %s", (user_id,))
-        user = cur.fetchone()
-        if not user:
-            return False, "User not found."
-        role, count, last_date = user
-        if role == 'admin':
-            return True, "Admin has unlimited messages."
-        today = date.today()
-        if last_date != today:
-            count = 0
-            cur.execute(
-                "UPDATE users SET daily_message_count = 0, last_message_date = %s WHERE user_id = %s", (today, user_id))
-        if count >= 20:
-            return False, "You have reached your daily message limit of 20."
-        cur.execute(
-            "UPDATE users SET daily_message_count = daily_message_count + 1 WHERE user_id = %s", (user_id,))
+            "UPDATE users SET role = %s WHERE user_id = %s", (role, user_id))
+        conn.commit()
+        return cur.rowcount > 0
+    finally:
+        cur.close()
+        conn.close()
+        user_cache.invalidate(user_id)
+
+
+def delete_user(user_id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+        conn.commit()
+        return cur.rowcount > 0
+    finally:
+        cur.close()
+        conn.close()
+        user_cache.invalidate(user_id)
+
+
+def lease_message_quota(user_id, requested: int, daily_limit: int, today: date) -> int:
+    """
+    Atomically reserve up to `requested` messages of a user's daily quota
+
+    Resets the counter on the first lease of a new day. At most half of what
+    is left is granted, so workers leasing for the same user near the limit
+    cannot strand its last messages in one idle worker. Returns the number of
+    messages granted, which is 0 once the daily limit has been reached.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            WITH current_usage AS (
+                SELECT user_id,
+                       CASE WHEN last_message_date = %(today)s THEN daily_message_count ELSE 0 END AS used
+                FROM users WHERE user_id = %(user_id)s
+                FOR UPDATE
+            ), lease AS (
+                SELECT user_id, used,
+                       LEAST(%(requested)s, GREATEST((%(limit)s - used) / 2, 1)) AS granted
+                FROM current_usage
+            )
+            UPDATE users u
+            SET daily_message_count = l.used + l.granted,
+                last_message_date = %(today)s
+            FROM lease l
+            WHERE u.user_id = l.user_id AND l.used < %(limit)s
+            RETURNING l.granted
+        """, {"user_id": user_id, "requested": requested, "limit": daily_limit, "today": today})
+        row = cur.fetchone()
+        conn.commit()
+        return row[0] if row else 0
+    finally:
+        cur.close()
+        conn.close()
+
+
+def return_message_quota(user_id, count: int, today: date):
+    """Gives back leased messages that will not be used (no-op after the day has rolled over)"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            UPDATE users SET daily_message_count = GREATEST(daily_message_count - %s, 0)
+            WHERE user_id = %s AND last_message_date = %s
+        """, (count, user_id, today))
         conn.commit()
-        return True, "Message count updated."
+    finally:
+        cur.close()
+        conn.close()
+
+# --- Policy Text Storage ---
+
+
+def _store_policy_text(cur, policy_text: str) -> str:
+    """Stores the text compressed (once per distinct content) and returns its hash"""
+    text_hash = content_hash(policy_text)
+    # Held until commit, so a concurrent delete_chat can't drop the row before
+    # the caller's privacy_policies insert references it
+    cur.execute("SELECT 1 FROM policy_texts WHERE content_hash = %s FOR KEY SHARE", (text_hash,))
+    if not cur.fetchone():
+        codec, compressed = compress_text(policy_text)
+        cur.execute("""
+            INSERT INTO policy_texts (content_hash, codec, compressed_text, original_length)
+            VALUES (%s, %s, %s, %s) ON CONFLICT (content_hash) DO NOTHING
+        """, (text_hash, codec, psycopg2.Binary(compressed), len(policy_text)))
+        _store_policy_digest(cur, text_hash, policy_text)
+    policy_text_cache.set(text_hash, policy_text)
+    return text_hash
+
+
+def _store_policy_digest(cur, text_hash: str, policy_text: str) -> dict:
+    digest = build_digest(policy_text)
+    cur.execute("""
+        INSERT INTO policy_digests (content_hash, version, digest) VALUES (%s, %s, %s)
+        ON CONFLICT (content_hash) DO UPDATE SET version = EXCLUDED.version, digest = EXCLUDED.digest
+    """, (text_hash, DIGEST_VERSION, Json(digest)))
+    return digest
+
+
+def _load_policy_text(cur, where: str, params: tuple):
+    """
+    Loads one policy's text, or None when no privacy_policies row matches
+
+    Only the content hash is read first; the compressed text is fetched and
+    decompressed on a cache miss.
+    """
+    cur.execute(f"SELECT content_hash, policy_text FROM privacy_policies WHERE {where}", params)
+    row = cur.fetchone()
+    if not row:
+        return None
+    text_hash, legacy_text = row
+    if text_hash is None:
+        return legacy_text or ""
+    policy_text = policy_text_cache.get(text_hash)
+    if policy_text is None:
+        cur.execute("SELECT codec, compressed_text FROM policy_texts WHERE content_hash = %s", (text_hash,))
+        stored = cur.fetchone()
+        if not stored:
+            return ""
+        policy_text = decompress_text(*stored)
+        policy_text_cache.set(text_hash, policy_text)
+    return policy_text
+
+
+def get_policy_digest(policy_id: int):
+    """
+    Returns the stored policy's digest, building it if it is missing or outdated
+
+    None for legacy rows whose text has not been moved to policy_texts yet.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT p.content_hash, d.version, d.digest
+            FROM privacy_policies p
+            LEFT JOIN policy_digests d ON d.content_hash = p.content_hash
+            WHERE p.policy_id = %s
+        """, (policy_id,))
+        row = cur.fetchone()
+        if not row or row[0] is None:
+            return None
+        text_hash, version, digest = row
+        if version != DIGEST_VERSION:
+            digest = _store_policy_digest(cur, text_hash, _load_policy_text(cur, "policy_id = %s", (policy_id,)))
+            conn.commit()
+        return digest
+    finally:
+        cur.close()
+        conn.close()
+
+
+def migrate_policy_texts(batch_size: int = 100) -> int:
+    """Compresses legacy privacy_policies.policy_text values into policy_texts; returns rows moved"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    moved = 0
+    try:
+        while True:
+            cur.execute("""
+                SELECT policy_id, policy_text FROM privacy_policies
+                WHERE content_hash IS NULL AND policy_text IS NOT NULL
+                LIMIT %s FOR UPDATE SKIP LOCKED
+            """, (batch_size,))
+            rows = cur.fetchall()
+            if not rows:
+                return moved
+            for policy_id, policy_text in rows:
+                text_hash = _store_policy_text(cur, policy_text)
+                cur.execute("UPDATE privacy_policies SET content_hash = %s, policy_text = NULL WHERE policy_id = %s",
+                            (text_hash, policy_id))
+            conn.commit()
+            moved += len(rows)
     finally:
         cur.close()
         conn.close()
@@ -106,7 +323,80 @@ def check_and_update_message_count(user_id):
 # --- Analysis and Chat Functions ---
 
 
-def save_analysis_results(policy_text: str, analysis_data: dict, user_id: int):
+def find_previous_version(user_id: int, policy_text: str, previous_policy_id: int = None):
+    """
+    Finds the user's latest stored version of the same company's policy
+
+    Without an explicit previous_policy_id, the company is recognised by its
+    name appearing near the start of the new text. That is only a candidate:
+    the caller has to confirm it is really the same policy.
+
+    Returns:
+        {"policy_id", "policy_text", "analysis"} or None
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        if previous_policy_id:
+            cur.execute("SELECT policy_id FROM privacy_policies WHERE policy_id = %s AND user_id = %s",
+                        (previous_policy_id, user_id))
+        else:
+            cur.execute("""
+                SELECT p.policy_id
+                FROM privacy_policies p
+                JOIN companies c ON c.company_id = p.company_id
+                WHERE p.user_id = %s AND length(c.company_name) >= 3
+                  AND strpos(lower(%s), lower(c.company_name)) > 0
+                ORDER BY length(c.company_name) DESC, p.created_at DESC
+                LIMIT 1
+            """, (user_id, policy_text[:3000]))
+        row = cur.fetchone()
+        if not row:
+            return None
+        policy_id = row[0]
+        cur.execute("""
+            SELECT c.company_name, a.pii_collected, a.data_sharing_practices, a.retention_summary,
+                   a.risk_score, a.final_summary
+            FROM privacy_policies p
+            JOIN companies c ON c.company_id = p.company_id
+            JOIN analysis_results a ON a.policy_id = p.policy_id
+            WHERE p.policy_id = %s
+        """, (policy_id,))
+        analysis = cur.fetchone()
+        if not analysis:
+            return None
+        return {
+            "policy_id": policy_id,
+            "policy_text": _load_policy_text(cur, "policy_id = %s", (policy_id,)) or "",
+            "analysis": {
+                "company_name": analysis[0], "pii_collected": analysis[1] or [],
+                "data_sharing_practices": analysis[2] or "", "retention_summary": analysis[3] or "",
+                "risk_score": analysis[4], "final_summary": analysis[5] or "",
+            },
+        }
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_policy_changes(policy_id: int, user_id: int):
+    """The link to the previous version and what changed, or None if the policy is not the user's"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT previous_policy_id, change_summary FROM privacy_policies WHERE policy_id = %s AND user_id = %s",
+                    (policy_id, user_id))
+        row = cur.fetchone()
+        if not row:
+            return None
+        return {"policy_id": policy_id, "previous_policy_id": row[0], "changes": row[1]}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def save_analysis_results(policy_text: str, analysis_data: dict, user_id: int,
+                          previous_policy_id: int = None, change_summary: dict = None):
     try:
         validated_analysis = PrivacyAnalysis(**analysis_data)
     except Exception as e:
@@ -124,9 +414,12 @@ def save_analysis_results(policy_text: str, analysis_data: dict, user_id: int):
             cur.execute("INSERT INTO companies (company_name) VALUES (%s) RETURNING company_id",
                         (validated_analysis.company_name,))
             company_id = cur.fetchone()[0]
+        text_hash = _store_policy_text(cur, policy_text)
         cur.execute(
-            "INSERT INTO privacy_policies (company_id, user_id, policy_text, display_title) VALUES (%s, %s, %s, %s) RETURNING policy_id",
-            (company_id, user_id, policy_text, validated_analysis.company_name)
+            """INSERT INTO privacy_policies (company_id, user_id, content_hash, display_title, previous_policy_id, change_summary)
+            VALUES (%s, %s, %s, %s, %s, %s) RETURNING policy_id""",
+            (company_id, user_id, text_hash, validated_analysis.company_name, previous_policy_id,
+             Json(change_summary) if change_summary is not None else None)
         )
         policy_id = cur.fetchone()[0]
         cur.execute("""
@@ -137,7 +430,7 @@ def save_analysis_results(policy_text: str, analysis_data: dict, user_id: int):
                      validated_analysis.retention_summary, validated_analysis.risk_score, validated_analysis.final_summary)
                     )
         conn.commit()
-        ingest_and_embed_policy(policy_id, policy_text)
+        ingest_and_embed_policy(policy_id, policy_text, previous_policy_id, user_id=user_id)
         return policy_id
     finally:
         cur.close()
@@ -157,56 +450,292 @@ def get_all_chats(user_id: int):
         conn.close()
 
 
-def get_chat_history(policy_id: int, user_id: int):
-    """Fetches the full history of a specific chat, including the analysis."""
+def encode_cursor(*values) -> str:
+    """Opaque page cursor holding a keyset position"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """The values of an encode_cursor cursor; ValueError if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def get_chat_summaries(user_id: int, limit: int = 50, cursor: str = None):
+    """
+    Fetches one page of a user's chats for the sidebar, most recently active first
+
+    Title, risk score, last activity and message count come from one query on
+    the (user_id, last_activity_at, policy_id) index; the counters are kept
+    up to date by save_chat_message.
+
+    Args:
+        cursor: next_cursor of the previous page. It carries the last chat's
+            (last_activity_at, policy_id), so new messages in that chat or its
+            deletion don't shift the following pages
+
+    Returns:
+        {"chats": [...], "next_cursor": str or None}
+    """
+    after_activity, after_policy_id = None, None
+    if cursor:
+        try:
+            after_activity, after_policy_id = decode_cursor(cursor)
+            after_policy_id = int(after_policy_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
     conn = get_db_connection()
     cur = conn.cursor()
     try:
-        cur.execute(
-            "SELECT user_id FROM privacy_policies WHERE policy_id = %s", (policy_id,))
-        result = cur.fetchone()
-        if not result or result[0] != user_id:
-            return None
         cur.execute("""
-            SELECT a.pii_collected, a.data_sharing_practices, a.retention_summary, a.risk_score, a.final_summary, p.display_title
-            FROM analysis_results a
-            JOIN privacy_policies p ON a.policy_id = p.policy_id
-            WHERE a.policy_id = %s
+            SELECT p.policy_id, p.display_title, a.risk_score, p.last_activity_at, p.message_count
+            FROM privacy_policies p
+            LEFT JOIN analysis_results a ON a.policy_id = p.policy_id
+            WHERE p.user_id = %s
+              AND (%s::int IS NULL OR (p.last_activity_at, p.policy_id) < (%s::timestamptz, %s::int))
+            ORDER BY p.last_activity_at DESC, p.policy_id DESC
+            LIMIT %s;
+        """, (user_id, after_policy_id, after_activity, after_policy_id, limit + 1))
+        rows = cur.fetchall()
+        chats = [{
+            "policy_id": row[0],
+            "title": row[1],
+            "risk_score": row[2],
+            "last_activity_at": row[3].isoformat() if row[3] else None,
+            "message_count": row[4],
+        } for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(chats[-1]["last_activity_at"], chats[-1]["policy_id"])
+        return {"chats": chats, "next_cursor": next_cursor}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_chat_history(policy_id: int, user_id: int, before: int = None, after: int = None, limit: int = None):
+    """
+    Fetches a chat's analysis and its messages, optionally one keyset page at a time
+
+    Args:
+        before: Only messages older than this message_id (newest first page when no cursor)
+        after: Only messages newer than this message_id
+        limit: Page size; None returns the full history
+
+    Raises:
+        ValueError: If a cursor is not a message of this chat
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT p.user_id, p.display_title, a.pii_collected, a.data_sharing_practices,
+                   a.retention_summary, a.risk_score, a.final_summary
+            FROM privacy_policies p
+            JOIN analysis_results a ON a.policy_id = p.policy_id
+            WHERE p.policy_id = %s
         """, (policy_id,))
         analysis_data = cur.fetchone()
-        if not analysis_data:
+        if not analysis_data or analysis_data[0] != user_id:
             return None
-        cur.execute(
-            "SELECT is_user_message, message_text FROM chat_messages WHERE policy_id = %s ORDER BY created_at ASC", (policy_id,))
+
+        # Keyset pagination on (created_at, message_id), served by idx_chat_messages_policy_created
+        conditions, params = ["policy_id = %s"], [policy_id]
+        for name, cursor, operator in (("before", before, "<"), ("after", after, ">")):
+            if cursor is None:
+                continue
+            cur.execute("SELECT created_at FROM chat_messages WHERE message_id = %s AND policy_id = %s",
+                        (cursor, policy_id))
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"'{name}' is not a message of this chat")
+            conditions.append(f"(created_at, message_id) {operator} (%s, %s)")
+            params.extend([row[0], cursor])
+        # Without an 'after' cursor a limited page is the newest messages
+        newest_first = limit is not None and after is None
+        query = "SELECT message_id, is_user_message, message_text, created_at FROM chat_messages WHERE " + \
+            " AND ".join(conditions) + \
+            (" ORDER BY created_at DESC, message_id DESC" if newest_first else " ORDER BY created_at ASC, message_id ASC")
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+        cur.execute(query, params)
         messages = cur.fetchall()
 
+        has_more = limit is not None and len(messages) > limit
+        if has_more:
+            messages = messages[:limit]
+        if newest_first:
+            messages.reverse()
+
         # --- FIX: Ensure company_name is included in the nested analysis object ---
-        return {
+        history = {
             "policy_id": policy_id,
-            "title": analysis_data[5],
+            "title": analysis_data[1],
             "analysis": {
-                "company_name": analysis_data[5],  # This was the missing piece
-                "pii_collected": analysis_data[0],
-                "data_sharing_practices": analysis_data[1],
-                "retention_summary": analysis_data[2],
-                "risk_score": analysis_data[3],
-                "final_summary": analysis_data[4],
+                "company_name": analysis_data[1],  # This was the missing piece
+                "pii_collected": analysis_data[2],
+                "data_sharing_practices": analysis_data[3],
+                "retention_summary": analysis_data[4],
+                "risk_score": analysis_data[5],
+                "final_summary": analysis_data[6],
             },
-            "history": [{"is_user": row[0], "text": row[1]} for row in messages]
+            "history": [{"message_id": row[0], "is_user": row[1], "text": row[2],
+                         "created_at": row[3].isoformat() if row[3] else None} for row in messages]
         }
+        if limit is not None:
+            history["page"] = {
+                "limit": limit,
+                "has_more_before": has_more if newest_first else None,
+                "has_more_after": has_more if not newest_first else None,
+                "before_cursor": messages[0][0] if messages else before,
+                "after_cursor": messages[-1][0] if messages else after,
+            }
+        return history
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_policy_content_hash(policy_id: int):
+    """Content hash of a stored policy's text (computed for legacy rows), or None"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT content_hash, policy_text FROM privacy_policies WHERE policy_id = %s", (policy_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        return row[0] or content_hash(row[1] or "")
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_agent_result(text_hash: str, agent_type: str, params_hash: str, model: str, prompt_version: int):
+    """A stored agent result for exactly this input, or None"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT result FROM agent_results
+            WHERE content_hash = %s AND agent_type = %s AND params_hash = %s AND model = %s AND prompt_version = %s
+        """, (text_hash, agent_type, params_hash, model, prompt_version))
+        row = cur.fetchone()
+        return row[0] if row else None
+    finally:
+        cur.close()
+        conn.close()
+
+
+def save_agent_result(text_hash: str, agent_type: str, params_hash: str, model: str,
+                      prompt_version: int, result):
+    """Stores an agent result, dropping this text's results from older prompt versions"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO agent_results (content_hash, agent_type, params_hash, model, prompt_version, result)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (content_hash, agent_type, params_hash, model, prompt_version)
+            DO UPDATE SET result = EXCLUDED.result, created_at = CURRENT_TIMESTAMP
+        """, (text_hash, agent_type, params_hash, model, prompt_version, Json(result)))
+        cur.execute("DELETE FROM agent_results WHERE content_hash = %s AND agent_type = %s AND prompt_version < %s",
+                    (text_hash, agent_type, prompt_version))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_comparison_policies(policy_ids: list, user_id: int):
+    """Stored analyses of the user's policies among policy_ids, in one query"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        # policy_text is only still set on legacy rows, whose hash is computed
+        # as get_policy_content_hash does
+        cur.execute("""
+            SELECT p.policy_id, p.display_title, p.content_hash, a.pii_collected,
+                   a.data_sharing_practices, a.retention_summary, a.risk_score,
+                   CASE WHEN p.content_hash IS NULL THEN p.policy_text END
+            FROM privacy_policies p
+            JOIN analysis_results a ON a.policy_id = p.policy_id
+            WHERE p.policy_id = ANY(%s) AND p.user_id = %s
+        """, (list(policy_ids), user_id))
+        return [{
+            "policy_id": row[0], "title": row[1], "content_hash": row[2] or content_hash(row[7] or ""),
+            "pii_collected": row[3] or [], "data_sharing_practices": row[4], "retention_summary": row[5],
+            "risk_score": row[6],
+        } for row in cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_latest_agent_results(content_hashes: list, agent_keys: dict) -> dict:
+    """
+    Most recent stored result per (content_hash, agent_type) for one run configuration
+
+    Args:
+        agent_keys: {agent_type: (params_hash, model, prompt_version)}; results
+            from other params, models or prompt versions are skipped
+    """
+    if not content_hashes or not agent_keys:
+        return {}
+    params_hashes, models, prompt_versions = zip(*agent_keys.values())
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT DISTINCT ON (r.content_hash, r.agent_type) r.content_hash, r.agent_type, r.result
+            FROM agent_results r
+            JOIN unnest(%s::text[], %s::text[], %s::text[], %s::int[])
+                 AS v(agent_type, params_hash, model, prompt_version)
+              ON v.agent_type = r.agent_type AND v.params_hash = r.params_hash
+             AND v.model = r.model AND v.prompt_version = r.prompt_version
+            WHERE r.content_hash = ANY(%s)
+            ORDER BY r.content_hash, r.agent_type, r.created_at DESC
+        """, (list(agent_keys), list(params_hashes), list(models), list(prompt_versions),
+              list(content_hashes)))
+        return {(row[0], row[1]): row[2] for row in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_owned_policy_text(policy_id: int, user_id: int):
+    """Returns the policy text if the policy belongs to the user, otherwise None"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        return _load_policy_text(cur, "policy_id = %s AND user_id = %s", (policy_id, user_id))
     finally:
         cur.close()
         conn.close()
 
-# --- Other functions (save_chat_message, rename_chat, delete_chat, vector store) are unchanged ---
+# --- Chat Management ---
 
 
 def save_chat_message(policy_id: int, user_id: int, is_user: bool, text: str):
     conn = get_db_connection()
     cur = conn.cursor()
     try:
-        cur.execute("INSERT INTO chat_messages (policy_id, user_id, is_user_message, message_text) VALUES (%s, %s, %s, %s);",
+        cur.execute("INSERT INTO chat_messages (policy_id, user_id, is_user_message, message_text) VALUES (%s, %s, %s, %s) RETURNING created_at;",
                     (policy_id, user_id, is_user, text))
+        created_at = cur.fetchone()[0]
+        # Keep the sidebar summary columns in step with the message table
+        cur.execute("""
+            UPDATE privacy_policies
+            SET message_count = message_count + 1,
+                last_activity_at = GREATEST(last_activity_at, %s)
+            WHERE policy_id = %s;
+        """, (created_at, policy_id))
         conn.commit()
     finally:
         cur.close()
@@ -231,9 +760,19 @@ def delete_chat(policy_id: int, user_id: int):
     cur = conn.cursor()
     try:
         cur.execute(
-            "DELETE FROM privacy_policies WHERE policy_id = %s AND user_id = %s", (policy_id, user_id))
+            "DELETE FROM privacy_policies WHERE policy_id = %s AND user_id = %s RETURNING content_hash", (policy_id, user_id))
+        deleted = cur.fetchone()
+        if deleted and deleted[0]:
+            # Texts are shared between identical policies; drop it with its last reference.
+            # The row lock waits out any _store_policy_text about to reference it, and
+            # the check below then runs on a fresh snapshot that sees its insert.
+            cur.execute("SELECT 1 FROM policy_texts WHERE content_hash = %s FOR UPDATE", (deleted[0],))
+            cur.execute("""
+                DELETE FROM policy_texts t WHERE t.content_hash = %s
+                AND NOT EXISTS (SELECT 1 FROM privacy_policies p WHERE p.content_hash = t.content_hash)
+            """, (deleted[0],))
         conn.commit()
-        return cur.rowcount > 0
+        return deleted is not None
     finally:
         cur.close()
         conn.close()
@@ -244,30 +783,530 @@ def get_policy_text(policy_id: int) -> str:
     conn = get_db_connection()
     cur = conn.cursor()
     try:
-        cur.execute(
-            "SELECT policy_text FROM privacy_policies WHERE policy_id = %s", (policy_id,))
-        result = cur.fetchone()
-        return result[0] if result else ""
+        return _load_policy_text(cur, "policy_id = %s", (policy_id,)) or ""
     finally:
         cur.close()
         conn.close()
 
 
 def get_vector_store():
-    connection_string = PGVector.connection_string_from_db_params(
-        driver="psycopg2", host=os.environ.get("DB_HOST"), port=int(os.environ.get("DB_PORT")),
-        database=os.environ.get("DB_NAME"), user=os.environ.get("DB_USER"), password=os.environ.get("DB_PASSWORD"),
-    )
-    # Use FastEmbed (local embeddings) instead of Google API to avoid quota limits
-    embeddings = FastEmbedEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    return PGVector(collection_name="policy_vectors", connection_string=connection_string, embedding_function=embeddings)
+    return vector_stores.get_vector_store("policy_vectors")
+
+
+def _stored_chunk_embeddings(policy_id: int, chunks: list) -> dict:
+    """chunk text -> embedding already stored for another version's identical chunks"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT e.document, e.embedding::text
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+            WHERE c.name = %s AND e.cmetadata->>'policy_id' = %s AND e.document = ANY(%s)
+        """, (vector_stores.POLICY_COLLECTION, str(policy_id), list(set(chunks))))
+        return {document: json.loads(embedding) for document, embedding in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+
 
+def ingest_and_embed_policy(policy_id: int, policy_text: str, previous_policy_id: int = None, user_id: int = None):
+    """
+    Chunks and embeds a policy, copying the embeddings of chunks unchanged since previous_policy_id
 
-def ingest_and_embed_policy(policy_id: int, policy_text: str):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000, chunk_overlap=100)
-    docs = text_splitter.split_text(policy_text)
-    documents = [Document(page_content=chunk, metadata={
-                          "policy_id": policy_id}) for chunk in docs]
+    Chunks carry the owner's user_id in their metadata so policy search can
+    filter on it before ranking.
+    """
+    with span("chunking", **{"policy.id": policy_id, "policy.chars": len(policy_text)}) as chunk_span:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000, chunk_overlap=100)
+        docs = text_splitter.split_text(policy_text)
+        chunk_span.set_attribute("chunks", len(docs))
+    reused = {}
+    if previous_policy_id and vector_stores.uses_pgvector():
+        reused = _stored_chunk_embeddings(previous_policy_id, docs)
     vector_store = get_vector_store()
-    vector_store.add_documents(documents)
+    reused_chunks = [chunk for chunk in docs if chunk in reused]
+    metadata = {"policy_id": policy_id} if user_id is None else {"policy_id": policy_id, "user_id": user_id}
+    if reused_chunks:
+        with span("vector_store.copy", SPAN_KIND_CLIENT, **{"chunks": len(reused_chunks)}):
+            vector_store.add_embeddings(
+                texts=reused_chunks,
+                embeddings=[reused[chunk] for chunk in reused_chunks],
+                metadatas=[dict(metadata) for _ in reused_chunks])
+        metrics.increment("policy_versioning.chunks_reused", len(reused_chunks))
+    documents = [Document(page_content=chunk, metadata=dict(metadata))
+                 for chunk in docs if chunk not in reused]
+    if documents:
+        with span("vector_store.write", SPAN_KIND_CLIENT, **{"chunks": len(documents)}):
+            vector_store.add_documents(documents)
+
+# --- Policy Search ---
+
+SEARCH_EF_SEARCH = int(os.getenv("SEARCH_EF_SEARCH", 100))
+# What the ANN index stores: 'vector' (float32), 'halfvec' (float16, half the
+# size) or 'binary' (1 bit per dimension, rescored with the full vectors)
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "vector")
+BINARY_RESCORE_FACTOR = int(os.getenv("BINARY_RESCORE_FACTOR", 4))
+# Owners with at most this many chunks are ranked exactly instead of through HNSW
+SEARCH_EXACT_SCAN_MAX_CHUNKS = int(os.getenv("SEARCH_EXACT_SCAN_MAX_CHUNKS", 20000))
+_iterative_scan_supported = None
+
+_D = EMBEDDING_DIMENSIONS
+# (index name, indexed expression and opclass, distance to the query for ORDER BY)
+ANN_INDEXES = {
+    "vector": ("idx_langchain_pg_embedding_hnsw",
+               f"(embedding::vector({_D})) vector_cosine_ops",
+               f"e.embedding::vector({_D}) <=> %(query)s::vector({_D})"),
+    "halfvec": ("idx_langchain_pg_embedding_hnsw_half",
+                f"(embedding::halfvec({_D})) halfvec_cosine_ops",
+                f"e.embedding::halfvec({_D}) <=> %(query)s::halfvec({_D})"),
+    "binary": ("idx_langchain_pg_embedding_hnsw_bit",
+               f"(binary_quantize(embedding::vector({_D}))::bit({_D})) bit_hamming_ops",
+               f"binary_quantize(e.embedding::vector({_D}))::bit({_D}) <~> binary_quantize(%(query)s::vector({_D}))"),
+}
+
+
+# Full-text expression indexed for the lexical half of hybrid retrieval; an
+# expression index is built CONCURRENTLY instead of rewriting the table
+DOCUMENT_TSV = "to_tsvector('english', coalesce({column}, ''))"
+FTS_INDEX = "idx_langchain_pg_embedding_fts"
+
+
+def ensure_policy_search_indexes() -> bool:
+    """
+    Creates the ANN, full-text and metadata indexes on the langchain pgvector table
+
+    Run by init_search_indexes.py, not at app start: the builds can take a
+    while on a large table. Every index is built CONCURRENTLY, so writes
+    continue meanwhile. The embedding column is untyped, so the HNSW index is
+    built on a cast to the model's dimension (as halfvec or binary per
+    VECTOR_INDEX_TYPE) and search_policy_chunks orders by the same
+    expression. The policy_id index serves the per-policy retrievers' filter
+    and the user_id index policy search's owner filter.
+
+    Returns:
+        False if the langchain tables don't exist yet
+    """
+    conn = get_db_connection()
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT to_regclass('langchain_pg_embedding')")
+        if cur.fetchone()[0] is None:
+            return False
+        cur.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_langchain_pg_embedding_policy_id
+            ON langchain_pg_embedding ((cmetadata->>'policy_id'))
+        """)
+        cur.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_langchain_pg_embedding_user_id
+            ON langchain_pg_embedding ((cmetadata->>'user_id'))
+        """)
+        cur.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS {FTS_INDEX}
+            ON langchain_pg_embedding USING gin (({DOCUMENT_TSV.format(column="document")}))
+        """)
+        # Superseded stored tsvector column; dropping it only touches the catalog
+        cur.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_langchain_pg_embedding_tsv")
+        cur.execute("ALTER TABLE langchain_pg_embedding DROP COLUMN IF EXISTS document_tsv")
+        index_name, expression, _ = ANN_INDEXES[VECTOR_INDEX_TYPE]
+        cur.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name}
+            ON langchain_pg_embedding USING hnsw ({expression})
+            WITH (m = 16, ef_construction = 64)
+        """)
+        # Indexes of other VECTOR_INDEX_TYPEs would only slow down writes
+        for other_name, _, _ in ANN_INDEXES.values():
+            if other_name != index_name:
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {other_name}")
+        return True
+    finally:
+        cur.close()
+        conn.close()
+
+
+def backfill_chunk_owners() -> int:
+    """
+    Adds the owner's user_id to the metadata of policy chunks stored without it
+
+    Updates one policy at a time so no long-running lock is held.
+
+    Returns:
+        Number of chunks updated
+    """
+    conn = get_db_connection()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'langchain_pg_embedding' AND column_name = 'cmetadata'
+        """)
+        row = cur.fetchone()
+        if row is None:
+            return 0
+        # Older langchain versions store json, newer ones jsonb
+        metadata_type = "jsonb" if row[0] == "jsonb" else "json"
+        cur.execute("""
+            SELECT DISTINCT p.policy_id, p.user_id
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+            JOIN privacy_policies p ON p.policy_id::text = e.cmetadata->>'policy_id'
+            WHERE c.name = %s AND e.cmetadata->>'user_id' IS NULL
+        """, (vector_stores.POLICY_COLLECTION,))
+        updated = 0
+        for policy_id, user_id in cur.fetchall():
+            cur.execute(f"""
+                UPDATE langchain_pg_embedding
+                SET cmetadata = (cmetadata::jsonb || jsonb_build_object('user_id', %s::int))::{metadata_type}
+                WHERE cmetadata->>'policy_id' = %s AND cmetadata->>'user_id' IS NULL
+            """, (user_id, str(policy_id)))
+            updated += cur.rowcount
+        return updated
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _supports_iterative_scan(cur) -> bool:
+    """pgvector 0.8+ keeps scanning the HNSW graph until filtered rows fill the limit"""
+    global _iterative_scan_supported
+    if _iterative_scan_supported is None:
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cur.fetchone()
+        version = tuple(int(part) for part in row[0].split(".")[:2]) if row else (0, 0)
+        _iterative_scan_supported = version >= (0, 8)
+    return _iterative_scan_supported
+
+
+def search_policy_chunks(query_embedding: list, owner_ids: list, limit: int):
+    """
+    Nearest policy chunks among the policies owned by owner_ids
+
+    Returns [{"policy_id", "title", "text", "score"}] by descending cosine
+    similarity. The owner filter uses the user_id in each chunk's metadata.
+    Owners with at most SEARCH_EXACT_SCAN_MAX_CHUNKS chunks (a typical
+    scope=mine search) have them read through the user_id index and ranked
+    exactly. Larger owner sets, such as the public corpus, go through the
+    HNSW index with the filter applied during the scan. On pgvector 0.8+ the
+    scan continues until enough rows pass the filter. With a halfvec or
+    binary index the candidates come from the compact index and are
+    rescored with the stored full-precision vectors.
+    """
+    owners = [str(owner_id) for owner_id in owner_ids]
+    vector = "[" + ",".join(str(float(v)) for v in query_embedding) + "]"
+    params = {"query": vector, "collection": vector_stores.POLICY_COLLECTION, "owners": owners, "limit": limit}
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT count(*) FROM (
+                SELECT 1 FROM langchain_pg_embedding e
+                JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                WHERE c.name = %(collection)s AND e.cmetadata->>'user_id' = ANY(%(owners)s)
+                LIMIT %(max_chunks)s
+            ) owned
+        """, {**params, "max_chunks": SEARCH_EXACT_SCAN_MAX_CHUNKS + 1})
+        if cur.fetchone()[0] <= SEARCH_EXACT_SCAN_MAX_CHUNKS:
+            metrics.increment("search.exact_scans")
+            # MATERIALIZED keeps the planner from ranking through the HNSW index
+            cur.execute(f"""
+                WITH owned AS MATERIALIZED (
+                    SELECT e.document, e.embedding, e.cmetadata->>'policy_id' AS policy_id
+                    FROM langchain_pg_embedding e
+                    JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                    WHERE c.name = %(collection)s AND e.cmetadata->>'user_id' = ANY(%(owners)s)
+                )
+                SELECT p.policy_id, p.display_title, hits.document, hits.distance FROM (
+                    SELECT policy_id, document,
+                           embedding::vector({_D}) <=> %(query)s::vector({_D}) AS distance
+                    FROM owned
+                    ORDER BY distance
+                    LIMIT %(limit)s
+                ) hits
+                JOIN privacy_policies p ON p.policy_id::text = hits.policy_id
+                ORDER BY hits.distance
+            """, params)
+        else:
+            metrics.increment("search.ann_scans")
+            _, _, index_distance = ANN_INDEXES[VECTOR_INDEX_TYPE]
+            candidates = limit * BINARY_RESCORE_FACTOR if VECTOR_INDEX_TYPE == "binary" else limit
+            cur.execute("SELECT set_config('hnsw.ef_search', %s, true)",
+                        (str(max(SEARCH_EF_SEARCH, candidates)),))
+            if _supports_iterative_scan(cur):
+                cur.execute("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+            cur.execute(f"""
+                SELECT p.policy_id, p.display_title, hits.document, hits.distance FROM (
+                    SELECT e.cmetadata->>'policy_id' AS policy_id, e.document,
+                           e.embedding::vector({_D}) <=> %(query)s::vector({_D}) AS distance
+                    FROM langchain_pg_embedding e
+                    JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                    WHERE c.name = %(collection)s AND e.cmetadata->>'user_id' = ANY(%(owners)s)
+                    ORDER BY {index_distance}
+                    LIMIT %(candidates)s
+                ) hits
+                JOIN privacy_policies p ON p.policy_id::text = hits.policy_id
+                ORDER BY hits.distance
+                LIMIT %(limit)s
+            """, {**params, "candidates": candidates})
+        rows = cur.fetchall()
+        conn.commit()
+        return [{"policy_id": policy_id, "title": title, "text": document, "score": 1 - distance}
+                for policy_id, title, document, distance in rows]
+    finally:
+        cur.close()
+        conn.close()
+
+
+# A missing full-text index is looked up again after this long
+FTS_INDEX_RECHECK_SECONDS = 60
+_fts_index_checked_at = None
+_fts_index_ready = False
+
+
+def _fts_index_available(cur) -> bool:
+    """Whether init_search_indexes.py has built the full-text index (cached per process)"""
+    global _fts_index_checked_at, _fts_index_ready
+    if _fts_index_ready or (_fts_index_checked_at is not None
+                            and time.monotonic() - _fts_index_checked_at < FTS_INDEX_RECHECK_SECONDS):
+        return _fts_index_ready
+    cur.execute("SELECT to_regclass(%s)", (FTS_INDEX,))
+    _fts_index_ready = cur.fetchone()[0] is not None
+    if not _fts_index_ready and _fts_index_checked_at is None:
+        print(f"Full-text index {FTS_INDEX} is missing; run init_search_indexes.py to enable lexical retrieval")
+    _fts_index_checked_at = time.monotonic()
+    return _fts_index_ready
+
+
+def lexical_search_chunks(collection_name: str, query: str, filter: dict = None, k: int = 20):
+    """
+    Full-text ranked chunks of a collection, as (document, metadata) pairs
+
+    Any query term may match (the tsquery is OR-ed), so long topic queries
+    still find chunks; ts_rank_cd with length normalization favours chunks
+    where more of the terms occur close together. Returns nothing until the
+    full-text index exists, rather than scanning the table.
+    """
+    conditions, params = [], [query, collection_name]
+    for key, value in (filter or {}).items():
+        conditions.append("e.cmetadata->>%s = %s")
+        params += [key, str(value)]
+    document_tsv = DOCUMENT_TSV.format(column="e.document")
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            if not _fts_index_available(cur):
+                return []
+            cur.execute(f"""
+                WITH q AS (
+                    SELECT NULLIF(replace(plainto_tsquery('english', %s)::text, '&', '|'), '')::tsquery AS query
+                )
+                SELECT e.document, e.cmetadata, ts_rank_cd({document_tsv}, q.query, 1) AS rank
+                FROM langchain_pg_embedding e
+                JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                CROSS JOIN q
+                WHERE c.name = %s AND {document_tsv} @@ q.query {"".join(" AND " + c for c in conditions)}
+                ORDER BY rank DESC
+                LIMIT %s
+            """, (*params, k))
+            return [(document, metadata if isinstance(metadata, dict) else json.loads(metadata or "{}"))
+                    for document, metadata, _ in cur.fetchall()]
+        finally:
+            cur.close()
+
+# --- Policy Monitor ---
+
+TRACKED_COLUMNS = ("tracked_id", "user_id", "url", "check_interval_seconds", "next_check_at",
+                   "last_checked_at", "last_changed_at", "content_hash", "analyzed_simhash",
+                   "policy_id", "last_status", "consecutive_failures", "last_error")
+
+
+def _tracked_row(row) -> dict:
+    tracked = dict(zip(TRACKED_COLUMNS, row))
+    for key in ("next_check_at", "last_checked_at", "last_changed_at"):
+        if tracked[key] is not None:
+            tracked[key] = tracked[key].isoformat()
+    return tracked
+
+
+def add_tracked_policy(user_id: int, url: str, check_interval_seconds: int):
+    """Tracks a URL for the user (updating the interval if already tracked); returns the row"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            INSERT INTO tracked_policies (user_id, url, check_interval_seconds) VALUES (%s, %s, %s)
+            ON CONFLICT (user_id, url) DO UPDATE SET check_interval_seconds = EXCLUDED.check_interval_seconds
+            RETURNING {", ".join(TRACKED_COLUMNS)}
+        """, (user_id, url, check_interval_seconds))
+        row = cur.fetchone()
+        conn.commit()
+        return _tracked_row(row)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def count_tracked_policies(user_id: int) -> int:
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM tracked_policies WHERE user_id = %s", (user_id,))
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_tracked_policies(user_id: int):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {', '.join(TRACKED_COLUMNS)} FROM tracked_policies WHERE user_id = %s ORDER BY url",
+                    (user_id,))
+        rows = [_tracked_row(row) for row in cur.fetchall()]
+        for row in rows:
+            row.pop("analyzed_simhash")
+        return rows
+    finally:
+        cur.close()
+        conn.close()
+
+
+def delete_tracked_policy(tracked_id: int, user_id: int):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM tracked_policies WHERE tracked_id = %s AND user_id = %s", (tracked_id, user_id))
+        conn.commit()
+        return cur.rowcount > 0
+    finally:
+        cur.close()
+        conn.close()
+
+
+def claim_due_tracked_policies(limit: int, lease_seconds: int):
+    """
+    Claims up to `limit` URLs that are due for a check
+
+    Claimed rows are pushed lease_seconds into the future, so other monitor
+    processes skip them and a crashed check is retried after the lease.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            UPDATE tracked_policies SET next_check_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            WHERE tracked_id IN (
+                SELECT tracked_id FROM tracked_policies
+                WHERE next_check_at <= CURRENT_TIMESTAMP
+                ORDER BY next_check_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {", ".join(TRACKED_COLUMNS)}
+        """, (lease_seconds, limit))
+        rows = cur.fetchall()
+        conn.commit()
+        return [dict(zip(TRACKED_COLUMNS, row)) for row in rows]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def record_tracked_check(tracked_id: int, status: str, content_hash: str = None,
+                         analyzed_simhash: int = None, policy_id: int = None,
+                         error: str = None, retry_seconds: int = None):
+    """
+    Stores a check's outcome and schedules the next one
+
+    None for content_hash / analyzed_simhash / policy_id keeps the stored value.
+    Failures are retried after retry_seconds instead of the regular interval.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            UPDATE tracked_policies SET
+                last_checked_at = CURRENT_TIMESTAMP,
+                last_status = %(status)s,
+                last_changed_at = CASE WHEN %(changed)s THEN CURRENT_TIMESTAMP ELSE last_changed_at END,
+                content_hash = COALESCE(%(content_hash)s, content_hash),
+                analyzed_simhash = COALESCE(%(simhash)s, analyzed_simhash),
+                policy_id = COALESCE(%(policy_id)s, policy_id),
+                consecutive_failures = CASE WHEN %(error)s IS NULL THEN 0 ELSE consecutive_failures + 1 END,
+                last_error = %(error)s,
+                next_check_at = CURRENT_TIMESTAMP + make_interval(
+                    secs => COALESCE(%(retry)s, check_interval_seconds))
+            WHERE tracked_id = %(tracked_id)s
+        """, {"tracked_id": tracked_id, "status": status, "changed": status in ("changed", "reanalyzed"),
+              "content_hash": content_hash, "simhash": analyzed_simhash, "policy_id": policy_id,
+              "error": error, "retry": retry_seconds})
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+# --- Legal Knowledge Base ---
+
+
+def get_legal_manifest() -> dict:
+    """source_file -> {"file_hash", "chunk_ids"} for the ingested legal documents"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT source_file, file_hash, chunk_ids FROM legal_kb_manifest")
+        return {source_file: {"file_hash": file_hash, "chunk_ids": list(chunk_ids)}
+                for source_file, file_hash, chunk_ids in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def save_legal_manifest(source_file: str, file_hash: str, chunk_ids: list):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO legal_kb_manifest (source_file, file_hash, chunk_ids) VALUES (%s, %s, %s)
+            ON CONFLICT (source_file) DO UPDATE SET
+                file_hash = EXCLUDED.file_hash, chunk_ids = EXCLUDED.chunk_ids, ingested_at = CURRENT_TIMESTAMP
+        """, (source_file, file_hash, chunk_ids))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def delete_legal_manifest(source_file: str):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM legal_kb_manifest WHERE source_file = %s", (source_file,))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def delete_legal_chunks(source_file: str) -> int:
+    """Deletes every legal KB chunk of a source file; returns the number deleted"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT to_regclass('langchain_pg_embedding')")
+        if cur.fetchone()[0] is None:
+            return 0
+        cur.execute("""
+            DELETE FROM langchain_pg_embedding e
+            USING langchain_pg_collection c
+            WHERE c.uuid = e.collection_id AND c.name = %s AND e.cmetadata->>'source_file' = %s
+        """, (vector_stores.LEGAL_COLLECTION, source_file))
+        deleted = cur.rowcount
+        conn.commit()
+        return deleted
+    finally:
+        cur.close()
+        conn.close()
@@ -0,0 +1,46 @@
+"""
+Text Fingerprints
+Exact content hashes and 64-bit SimHash near-duplicate fingerprints, used to
+tell whether a re-fetched policy changed enough to be worth re-analyzing
+"""
+import hashlib
+import re
+
+WORD_PATTERN = re.compile(r"\w+")
+SHINGLE_SIZE = 3
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace- and case-insensitive form, so reflowed pages hash the same"""
+    return " ".join(text.split()).lower()
+
+
+def content_fingerprint(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word shingles; similar texts differ in few bits"""
+    words = WORD_PATTERN.findall(text.lower())
+    shingles = [" ".join(words[i:i + SHINGLE_SIZE])
+                for i in range(max(1, len(words) - SHINGLE_SIZE + 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def similarity(a: int, b: int) -> float:
+    """1.0 for identical fingerprints, falling with the Hamming distance"""
+    return 1.0 - bin((a ^ b) & (2 ** 64 - 1)).count("1") / 64
+
+
+def to_signed64(value: int) -> int:
+    """Fits an unsigned fingerprint into a Postgres BIGINT"""
+    return value - 2 ** 64 if value >= 2 ** 63 else value
+
+
+def from_signed64(value: int) -> int:
+    return value + 2 ** 64 if value < 0 else value
@@ -0,0 +1,63 @@
+"""
+In-process metrics registry
+Thread-safe counters and per-stage latency reservoirs shared by the LLM,
+cache, agent and tracing layers
+"""
+import threading
+from collections import defaultdict, deque
+
+# Latency samples kept per stage for percentile estimates
+LATENCY_WINDOW = 2048
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+
+def increment(name: str, amount: int = 1):
+    """Increments a named counter, e.g. 'llm_cache.hits'."""
+    with _lock:
+        _counters[name] += amount
+
+
+def get_counter(name: str) -> int:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def get_counters(prefix: str = "") -> dict:
+    """Returns a snapshot of all counters whose name starts with `prefix`."""
+    with _lock:
+        return {name: value for name, value in sorted(_counters.items())
+                if name.startswith(prefix)}
+
+
+def ratio(numerator: int, denominator: int) -> float:
+    return round(numerator / denominator, 4) if denominator else 0.0
+
+
+def observe(stage: str, seconds: float):
+    """Records one latency sample for a stage, e.g. 'vector_search'."""
+    with _lock:
+        _latencies[stage].append(seconds)
+
+
+def _percentile(sorted_values, q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def get_latency_percentiles() -> dict:
+    """Returns count and p50/p95/p99 (milliseconds) for each stage."""
+    with _lock:
+        samples = {stage: sorted(values)
+                   for stage, values in _latencies.items() if values}
+    return {
+        stage: {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(values, 0.99) * 1000, 2),
+        }
+        for stage, values in sorted(samples.items())
+    }
@@ -1,6 +1,61 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
 from langchain_community.document_loaders import WebBaseLoader
 
-def get_text_from_url(url: str) -> str:
+from backend.utils import metrics
+from backend.utils.tracing import span, SPAN_KIND_CLIENT
+
+URL_CACHE_TTL_SECONDS = float(os.getenv("URL_CACHE_TTL_SECONDS", 900))
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", 256))
+
+# url -> (fetched at, text); concurrent fetches of one URL share a lock
+_url_cache = OrderedDict()
+_url_cache_lock = threading.Lock()
+_url_locks = {}
+
+
+def _cached_text(url: str, max_age: float):
+    with _url_cache_lock:
+        entry = _url_cache.get(url)
+        if entry and time.monotonic() - entry[0] <= max_age:
+            _url_cache.move_to_end(url)
+            return entry[1]
+    return None
+
+
+def get_text_from_url(url: str, max_age: float = None) -> str:
+    """
+    Fetches and extracts clean text content from a URL, reusing a fetch made
+    within the last max_age seconds (URL_CACHE_TTL_SECONDS by default)
+    """
+    max_age = URL_CACHE_TTL_SECONDS if max_age is None else max_age
+    text = _cached_text(url, max_age)
+    if text is not None:
+        metrics.increment("url_cache.hits")
+        return text
+    with _url_cache_lock:
+        url_lock = _url_locks.setdefault(url, threading.Lock())
+    with url_lock:
+        # Another request may have fetched it while we waited
+        text = _cached_text(url, max_age)
+        if text is not None:
+            metrics.increment("url_cache.hits")
+            return text
+        metrics.increment("url_cache.misses")
+        text = _fetch_text_from_url(url)
+        with _url_cache_lock:
+            _url_cache[url] = (time.monotonic(), text)
+            _url_cache.move_to_end(url)
+            while len(_url_cache) > URL_CACHE_MAX_ENTRIES:
+                evicted, _ = _url_cache.popitem(last=False)
+                _url_locks.pop(evicted, None)
+        return text
+
+
+def _fetch_text_from_url(url: str) -> str:
     """
     Fetches and extracts clean text content from a URL using LangChain's WebBaseLoader.
     """
@@ -12,7 +67,8 @@ def get_text_from_url(url: str) -> str:
             }
         )
 
-        documents = loader.load()
+        with span("url_fetch", SPAN_KIND_CLIENT, **{"http.url": url}):
+            documents = loader.load()
 
         if not documents or not documents[0].page_content:
             raise ValueError("The loader could not extract any meaningful content from the URL. The page might be empty or rendered with complex JavaScript.")
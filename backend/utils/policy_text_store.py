@@ -0,0 +1,91 @@
+"""
+Policy Text Storage
+Compression and caching for policy texts, which are stored once per distinct
+content in the policy_texts table, keyed by SHA-256. zstd is used when the
+zstandard package is installed, with zlib as the fallback; the codec is stored
+with each row so either can be read back.
+"""
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from backend.utils import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+POLICY_TEXT_CODEC = "zstd" if zstandard is not None else "zlib"
+POLICY_TEXT_CACHE_MAX_BYTES = int(os.getenv("POLICY_TEXT_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+ZSTD_LEVEL = int(os.getenv("POLICY_TEXT_ZSTD_LEVEL", 9))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress_text(text: str):
+    """Returns (codec, compressed bytes)"""
+    raw = text.encode("utf-8")
+    if POLICY_TEXT_CODEC == "zstd":
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    data = bytes(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Policy text is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown policy text codec: {codec}")
+
+
+class PolicyTextCache:
+    """LRU of content_hash -> decompressed text, bounded by total characters."""
+
+    def __init__(self, max_bytes: int = POLICY_TEXT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                metrics.increment("policy_text_cache.hits")
+                return text
+        metrics.increment("policy_text_cache.misses")
+        return None
+
+    def set(self, key, text: str):
+        if len(text) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = text
+            self._size += len(text)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        hits = metrics.get_counter("policy_text_cache.hits")
+        misses = metrics.get_counter("policy_text_cache.misses")
+        with self._lock:
+            entries, size = len(self._entries), self._size
+        return {"entries": entries, "chars": size, "codec": POLICY_TEXT_CODEC, "hits": hits,
+                "misses": misses, "hit_ratio": metrics.ratio(hits, hits + misses)}
+
+
+# Entries are keyed by content, so they never go stale and need no invalidation
+policy_text_cache = PolicyTextCache()
@@ -0,0 +1,191 @@
+"""
+Chat Rate Limiting
+Per-role daily quotas enforced from an in-process allowance that is leased
+from Postgres in small blocks with one atomic UPDATE ... RETURNING, plus an
+in-process sliding window against bursts. The common /api/chat request costs
+no database round trip. Leases a user stops drawing on are given back after
+LEASE_IDLE_SECONDS and at shutdown, so an idle worker does not hold part of
+the user's quota until the day rolls over.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from datetime import date
+
+# Daily message quota per role; None means unlimited
+ROLE_DAILY_QUOTAS = {
+    "user": int(os.getenv("USER_DAILY_MESSAGE_QUOTA", 20)),
+    "admin": None,
+}
+# (max messages, window seconds) per role; None disables the burst check
+ROLE_BURST_LIMITS = {
+    "user": (int(os.getenv("USER_BURST_MESSAGES", 10)), 60),
+    "admin": None,
+}
+DEFAULT_ROLE = "user"
+
+# Messages leased from the database at a time (fewer near the daily limit).
+# Larger leases mean fewer round trips; a worker killed without a clean
+# shutdown forfeits at most this many messages.
+LEASE_SIZE = int(os.getenv("RATE_LIMIT_LEASE_SIZE", 5))
+# Unused leased messages are returned once a user sends nothing to this worker
+# for this long
+LEASE_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_IDLE_SECONDS", 300))
+
+
+class SlidingWindow:
+    """Timestamps of recent events, trimmed to the last `window` seconds."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.events = deque()
+
+    def allow(self, now: float) -> bool:
+        while self.events and self.events[0] <= now - self.window:
+            self.events.popleft()
+        if len(self.events) >= self.limit:
+            return False
+        self.events.append(now)
+        return True
+
+
+class _UserAllowance:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.day = None
+        self.remaining = 0
+        self.exhausted = False
+        self.window = None
+        self.last_used = 0.0
+
+
+class MessageRateLimiter:
+    """
+    Enforces per-role chat quotas
+
+    Args:
+        lease_quota: callable(user_id, requested, daily_limit, today) -> number
+            of messages granted (0 once the daily limit is reached)
+        return_quota: optional callable(user_id, count, today) giving back
+            leased messages that are idle, discarded by forget() or still
+            unused at shutdown
+        idle_seconds: how long a lease may go unused before it is returned
+    """
+
+    def __init__(self, lease_quota, return_quota=None, idle_seconds=LEASE_IDLE_SECONDS):
+        self.lease_quota = lease_quota
+        self.return_quota = return_quota
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._users = {}
+        self._reaper = None
+        self._stop = threading.Event()
+
+    def _allowance(self, user_id) -> _UserAllowance:
+        with self._lock:
+            allowance = self._users.get(user_id)
+            if allowance is None:
+                allowance = self._users[user_id] = _UserAllowance()
+            return allowance
+
+    def check(self, user_id, role):
+        """
+        Consume one message for a user
+
+        Returns:
+            (allowed, message) - same contract as the old per-message DB check
+        """
+        role = role if role in ROLE_DAILY_QUOTAS else DEFAULT_ROLE
+        allowance = self._allowance(user_id)
+        with allowance.lock:
+            burst = ROLE_BURST_LIMITS.get(role)
+            if burst:
+                if allowance.window is None:
+                    allowance.window = SlidingWindow(*burst)
+                if not allowance.window.allow(time.monotonic()):
+                    return False, f"Too many messages. You can send {burst[0]} messages per minute."
+
+            quota = ROLE_DAILY_QUOTAS[role]
+            if quota is None:
+                return True, "Unlimited messages."
+
+            today = date.today()
+            if allowance.day != today:
+                allowance.day = today
+                allowance.remaining = 0
+                allowance.exhausted = False
+            if allowance.exhausted:
+                return False, f"You have reached your daily message limit of {quota}."
+            allowance.last_used = time.monotonic()
+            if allowance.remaining == 0:
+                allowance.remaining = self.lease_quota(
+                    user_id, LEASE_SIZE, quota, today)
+                if allowance.remaining == 0:
+                    allowance.exhausted = True
+                    return False, f"You have reached your daily message limit of {quota}."
+                self._start_reaper()
+            allowance.remaining -= 1
+            return True, "Message count updated."
+
+    def _give_back(self, user_id, allowance):
+        with allowance.lock:
+            unused, day = allowance.remaining, allowance.day
+            allowance.remaining = 0
+        if unused and day == date.today():
+            self.return_quota(user_id, unused, day)
+
+    def release_idle(self, now=None):
+        """Return the unused leases of users who sent nothing for idle_seconds"""
+        if self.return_quota is None:
+            return
+        cutoff = (time.monotonic() if now is None else now) - self.idle_seconds
+        with self._lock:
+            idle = [(user_id, allowance) for user_id, allowance in self._users.items()
+                    if allowance.remaining and allowance.last_used <= cutoff]
+        for user_id, allowance in idle:
+            self._give_back(user_id, allowance)
+
+    def release_all(self):
+        """Return every unused lease, e.g. at shutdown"""
+        self._stop.set()
+        if self.return_quota is None:
+            return
+        with self._lock:
+            allowances = list(self._users.items())
+        for user_id, allowance in allowances:
+            self._give_back(user_id, allowance)
+
+    def _start_reaper(self):
+        if self.return_quota is None or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, name="quota-lease-reaper", daemon=True)
+            self._reaper.start()
+        atexit.register(self.release_all)
+
+    def _reap(self):
+        while not self._stop.wait(self.idle_seconds / 2):
+            try:
+                self.release_idle()
+            except Exception as e:
+                # Those messages stay counted until the day rolls over
+                print(f"Returning idle message quota failed: {e}")
+
+    def forget(self, user_id):
+        """
+        Drop a user's cached state, e.g. after a role change or deletion
+
+        Unused leased messages are returned, so the next check leases under
+        the user's current role and limit. Other worker processes keep their
+        allowance (at most LEASE_SIZE messages) until it runs out or goes idle.
+        """
+        with self._lock:
+            allowance = self._users.pop(user_id, None)
+        if allowance is None or self.return_quota is None:
+            return
+        self._give_back(user_id, allowance)
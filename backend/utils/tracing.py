@@ -0,0 +1,254 @@
+"""
+Request-scoped tracing
+Lightweight spans with OpenTelemetry-compatible (OTLP/JSON) export to a
+local file or collector, plus per-stage latency samples for the admin
+metrics endpoint
+"""
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from backend.utils import metrics
+
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "privacy-lens-backend")
+# JSON lines file of OTLP ExportTraceServiceRequest payloads
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+# OTLP/HTTP collector base URL, e.g. http://localhost:4318
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_current_span = ContextVar("privacy_lens_current_span", default=None)
+
+
+class Span:
+    """A timed unit of work inside a trace."""
+
+    def __init__(self, name: str, parent=None, kind: int = SPAN_KIND_INTERNAL, attributes: dict = None):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.root = parent.root if parent else self
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.end_ns = None
+        # Only the root span collects finished spans for export
+        self.finished = [] if parent is None else None
+        self._lock = threading.Lock() if parent is None else None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self, error: BaseException = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        metrics.observe(self.name, time.perf_counter() - self._start)
+        root = self.root
+        with root._lock:
+            # Children that outlive the root (e.g. abandoned worker threads)
+            # are exported on their own; the root's batch is already queued
+            late = root is not self and root.end_ns is not None
+            if not late:
+                root.finished.append(self)
+        if late:
+            metrics.increment("tracing.late_spans")
+            _export([self])
+        elif root is self:
+            _export(self.finished)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+def _otlp_attribute(key, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+# --- Export ---
+
+_export_queue = queue.Queue(maxsize=1000)
+_export_thread = None
+_export_lock = threading.Lock()
+
+
+def _export_worker():
+    while True:
+        payload = _export_queue.get()
+        try:
+            if TRACE_EXPORT_FILE:
+                with open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload) + "\n")
+            if OTLP_ENDPOINT:
+                requests.post(f"{OTLP_ENDPOINT.rstrip('/')}/v1/traces",
+                              json=payload, timeout=5)
+        except Exception as e:
+            print(f"Trace export failed: {e}")
+
+
+def _export(spans):
+    """Queues a finished trace for export without blocking the request."""
+    global _export_thread
+    if not (TRACE_EXPORT_FILE or OTLP_ENDPOINT):
+        return
+    with _export_lock:
+        if _export_thread is None:
+            _export_thread = threading.Thread(
+                target=_export_worker, name="trace-exporter", daemon=True)
+            _export_thread.start()
+    payload = {"resourceSpans": [{
+        "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+        "scopeSpans": [{
+            "scope": {"name": "backend.utils.tracing"},
+            "spans": [span.to_otlp() for span in spans],
+        }],
+    }]}
+    try:
+        _export_queue.put_nowait(payload)
+    except queue.Full:
+        metrics.increment("tracing.dropped_traces")
+
+
+# --- Span API ---
+
+def get_current_span():
+    return _current_span.get()
+
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """
+    Starts a child of the current span (or a new trace) and makes it current
+
+    Returns:
+        (span, token) - pass both to end_span()
+    """
+    span = Span(name, parent=_current_span.get(),
+                kind=kind, attributes=attributes)
+    return span, _current_span.set(span)
+
+
+def end_span(span: Span, token=None, error: BaseException = None):
+    span.end(error)
+    if token is not None:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Token was created in a different context (e.g. a worker thread)
+            _current_span.set(span.parent)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Context manager that times a block as a span, e.g. with span("chunking"):"""
+    current, token = start_span(name, kind, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, token, error=e)
+        raise
+    end_span(current, token)
+
+
+# --- LangChain integration ---
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turns LangChain LLM and retriever runs into spans with token counts."""
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name, kind, **attributes):
+        with self._lock:
+            self._runs[run_id] = start_span(name, kind, **attributes)
+
+    def _end(self, run_id, error=None, **attributes):
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if not started:
+            return
+        current, token = started
+        for key, value in attributes.items():
+            current.set_attribute(key, value)
+        end_span(current, token, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        prompt_chars = sum(len(str(m.content)) for batch in messages for m in batch)
+        self._start(run_id, "llm", SPAN_KIND_CLIENT,
+                    **{"llm.model": model, "llm.prompt_chars": prompt_chars})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._start(run_id, "llm", SPAN_KIND_CLIENT,
+                    **{"llm.model": params.get("model") or "unknown"})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self._end(run_id, **{
+            "llm.prompt_tokens": usage.get("prompt_tokens", 0),
+            "llm.completion_tokens": usage.get("completion_tokens", 0),
+            "llm.total_tokens": usage.get("total_tokens", 0),
+            # Cached responses are replayed without provider usage data
+            "llm.cache_hit": not usage,
+        })
+        metrics.increment("llm.prompt_tokens", usage.get("prompt_tokens", 0))
+        metrics.increment("llm.completion_tokens", usage.get("completion_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "vector_search", SPAN_KIND_CLIENT,
+                    **{"retriever.query_chars": len(query)})
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, **{"retriever.documents": len(documents)})
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+# Registered as an inheritable configure hook so every LangChain run in the
+# process reports to the tracer without threading callbacks through chains.
+_langchain_handler = ContextVar(
+    "privacy_lens_tracing_handler", default=TracingCallbackHandler())
+register_configure_hook(_langchain_handler, True)
@@ -0,0 +1,62 @@
+"""
+Session User Cache
+Short-TTL, size-bounded in-process cache of the user fields Flask-Login needs,
+so authenticated requests skip the users lookup. Entries are invalidated on
+role changes and deletion in this process; the TTL bounds staleness across
+workers.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.utils import metrics
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+
+
+class UserCache:
+    """LRU of user_id -> user dict with per-entry expiry."""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        key = int(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                metrics.increment("user_cache.hits")
+                return dict(entry[1])
+            if entry:
+                del self._entries[key]
+        metrics.increment("user_cache.misses")
+        return None
+
+    def set(self, user_id, user: dict):
+        key = int(user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+    def stats(self) -> dict:
+        hits = metrics.get_counter("user_cache.hits")
+        misses = metrics.get_counter("user_cache.misses")
+        with self._lock:
+            size = len(self._entries)
+        return {"entries": size, "hits": hits, "misses": misses,
+                "hit_ratio": metrics.ratio(hits, hits + misses)}
+
+
+user_cache = UserCache()
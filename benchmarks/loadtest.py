@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Load Testing Harness
+Logs virtual users in through /api/login, keeps their Flask-Login cookies and
+replays a weighted mix of analyze, chat, agent and chat-history calls against
+a running backend at increasing concurrency. Reports per-endpoint tail
+latency, error rates (429s counted separately) and the saturation point, and
+writes a machine-readable report for regression gating
+
+Usage:
+    python -m benchmarks.serve_stubbed --port 5001 &
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:5001 \\
+        --stages 1,2,4,8,16 --stage-seconds 30 --output loadtest.json \\
+        --max-error-rate 0.02 --max-p95-ms 5000
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+ROOT_DIR = Path(__file__).parent.parent
+
+DEFAULT_MIX = "analyze=1,chat=6,agent=2,history=3,chats=2"
+AGENT_TYPES = ["gdpr_compliance", "data_minimization", "tracker_detector", "breach_risk",
+               "kids_privacy", "privacy_rights", "policy_simplifier", "privacy_functionality"]
+CHAT_QUESTIONS = [
+    "How long is my data retained?",
+    "Who do you share my location with?",
+    "Can I delete my account?",
+    "Do you sell my personal information?",
+]
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and status collection for one stage."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, latency_ms, status):
+        with self.lock:
+            self.samples[endpoint].append(latency_ms)
+            self.statuses[endpoint][status] += 1
+
+    def summary(self, wall_seconds):
+        endpoints = {}
+        total = errors = throttled = 0
+        with self.lock:
+            for endpoint, values in self.samples.items():
+                values = sorted(values)
+                statuses = dict(self.statuses[endpoint])
+                endpoint_errors = sum(n for s, n in statuses.items() if s == "exception" or s >= 400)
+                endpoint_throttled = statuses.get(429, 0)
+                endpoints[endpoint] = {
+                    "requests": len(values),
+                    "error_rate": round(endpoint_errors / len(values), 4),
+                    "rate_limited_429": endpoint_throttled,
+                    "p50_ms": round(percentile(values, 0.50), 2),
+                    "p95_ms": round(percentile(values, 0.95), 2),
+                    "p99_ms": round(percentile(values, 0.99), 2),
+                    "max_ms": round(values[-1], 2),
+                    "statuses": {str(s): n for s, n in statuses.items()},
+                }
+                total += len(values)
+                errors += endpoint_errors
+                throttled += endpoint_throttled
+        return {
+            "requests": total,
+            "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            # 429s from the daily message quota are expected; track them apart from failures
+            "non_quota_error_rate": round((errors - throttled) / total, 4) if total else 0.0,
+            "rate_limited_429": throttled,
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser:
+    """One logged-in browser session replaying the request mix."""
+
+    def __init__(self, base_url, credentials, mix, policy_text, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.username, self.password = credentials
+        self.mix_names = list(mix)
+        self.mix_weights = [mix[name] for name in self.mix_names]
+        self.policy_text = policy_text
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.policy_ids = []
+
+    def _call(self, recorder, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, "exception"
+        if recorder is not None:
+            recorder.record(endpoint, (time.perf_counter() - start) * 1000, status)
+        return response
+
+    def login(self):
+        self.session.post(f"{self.base_url}/api/signup", timeout=self.timeout,
+                          json={"username": self.username, "password": self.password})
+        response = self.session.post(f"{self.base_url}/api/login", timeout=self.timeout,
+                                     json={"username": self.username, "password": self.password})
+        response.raise_for_status()
+        chats = self.session.get(f"{self.base_url}/api/chats", timeout=self.timeout)
+        if chats.ok:
+            self.policy_ids = [c["policy_id"] for c in chats.json()]
+        if not self.policy_ids:
+            self.analyze(None)
+
+    def analyze(self, recorder):
+        response = self._call(recorder, "analyze", "POST", "/api/analyze",
+                              json={"source_type": "text", "data": self.policy_text})
+        if response is not None and response.ok:
+            self.policy_ids.append(response.json()["policy_id"])
+
+    def step(self, recorder):
+        action = random.choices(self.mix_names, weights=self.mix_weights)[0]
+        if action == "analyze" or not self.policy_ids:
+            return self.analyze(recorder)
+        policy_id = random.choice(self.policy_ids)
+        if action == "chat":
+            self._call(recorder, "chat", "POST", "/api/chat",
+                       json={"question": random.choice(CHAT_QUESTIONS), "policy_id": policy_id})
+        elif action == "agent":
+            agent_type = random.choice(AGENT_TYPES)
+            self._call(recorder, f"agent:{agent_type}", "POST", f"/api/agents/{agent_type}/analyze",
+                       json={"policy_id": policy_id})
+        elif action == "history":
+            self._call(recorder, "chat_history", "GET", f"/api/chats/{policy_id}")
+        elif action == "chats":
+            self._call(recorder, "chats", "GET", "/api/chats")
+
+
+def run_stage(users, concurrency, seconds, think_time):
+    recorder = Recorder()
+    deadline = time.monotonic() + seconds
+
+    def loop(user):
+        while time.monotonic() < deadline:
+            user.step(recorder)
+            if think_time:
+                time.sleep(random.uniform(0, think_time))
+
+    threads = [threading.Thread(target=loop, args=(users[i],), daemon=True) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.summary(time.perf_counter() - start)
+
+
+def find_saturation(stages, min_gain, max_error_rate):
+    """First concurrency level where throughput stops scaling or errors climb."""
+    previous = None
+    for stage in stages:
+        if stage["non_quota_error_rate"] > max_error_rate:
+            return {"concurrency": stage["concurrency"], "reason": "error rate"}
+        if previous and stage["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            return {"concurrency": previous["concurrency"], "reason": "throughput plateau"}
+        previous = stage
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a running PrivacyLens backend")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5001")
+    parser.add_argument("--stages", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--stage-seconds", type=float, default=30.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted request mix, e.g. chat=6,agent=2")
+    parser.add_argument("--users", type=int, default=None, help="Distinct accounts (defaults to max concurrency)")
+    parser.add_argument("--user-prefix", default="loadtest")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--policy-file", default=str(ROOT_DIR / "sample_policy.txt"))
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between calls (s)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--saturation-gain", type=float, default=0.1,
+                        help="Minimum throughput gain per stage before calling it saturated")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--max-error-rate", type=float, default=None,
+                        help="Gate: fail if any stage's non-429 error rate exceeds this")
+    parser.add_argument("--max-p95-ms", type=float, default=None,
+                        help="Gate: fail if any endpoint's p95 exceeds this at the lowest stage")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.stages.split(",")]
+    mix = parse_mix(args.mix)
+    policy_text = Path(args.policy_file).read_text(encoding="utf-8")
+    user_count = args.users or max(levels)
+
+    print(f"Logging in {user_count} virtual users ...")
+    users = []
+    for i in range(max(levels)):
+        credentials = (f"{args.user_prefix}-{i % user_count}", args.password)
+        user = VirtualUser(args.base_url, credentials, mix, policy_text, args.timeout)
+        user.login()
+        users.append(user)
+
+    stages = []
+    for concurrency in levels:
+        print(f"Stage: concurrency={concurrency} for {args.stage_seconds:.0f}s")
+        result = run_stage(users, concurrency, args.stage_seconds, args.think_time)
+        result["concurrency"] = concurrency
+        stages.append(result)
+        print(f"  {result['throughput_rps']} rps, error rate {result['error_rate']:.2%}, "
+              f"429s {result['rate_limited_429']}")
+
+    max_error_rate = args.max_error_rate if args.max_error_rate is not None else 0.05
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "mix": mix,
+        "stages": stages,
+        "saturation": find_saturation(stages, args.saturation_gain, max_error_rate),
+    }
+
+    failures = []
+    if args.max_error_rate is not None:
+        failures += [f"concurrency {s['concurrency']}: error rate {s['non_quota_error_rate']:.2%}"
+                     for s in stages if s["non_quota_error_rate"] > args.max_error_rate]
+    if args.max_p95_ms is not None and stages:
+        failures += [f"{name}: p95 {e['p95_ms']}ms"
+                     for name, e in stages[0]["endpoints"].items() if e["p95_ms"] > args.max_p95_ms]
+    report["gate"] = {"passed": not failures, "failures": failures}
+
+    print(f"\n{'endpoint':<36}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>9}{'429':>6}")
+    for name, endpoint in sorted(stages[-1]["endpoints"].items()):
+        print(f"{name:<36}{endpoint['p50_ms']:>10}{endpoint['p95_ms']:>10}{endpoint['p99_ms']:>10}"
+              f"{endpoint['error_rate']:>9.2%}{endpoint['rate_limited_429']:>6}")
+    print(f"\nSaturation: {report['saturation'] or 'not reached'}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.output}")
+
+    if failures:
+        print("Gate failed:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
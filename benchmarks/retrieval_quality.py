@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Retrieval Quality Benchmark
+Measures recall@k of embedding model configurations on a labelled set of
+policy and legal questions (fixtures/retrieval_questions.json), together
+with embedding throughput and the index size of each vector storage option
+(float32, halfvec and binary with full-precision rescoring), so the
+speed/quality tradeoff can be picked from data. Uses the real FastEmbed
+models; the first run downloads them.
+
+Usage:
+    python -m benchmarks.retrieval_quality
+    python -m benchmarks.retrieval_quality --models BAAI/bge-small-en-v1.5 \
+        Xenova/bge-small-en-v1.5:onnx/model_quantized.onnx --max-lengths 512 256 --output recall.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter  # noqa: E402
+
+from backend.core.embeddings import create_embeddings, EMBEDDING_MODEL_ID  # noqa: E402
+from backend.core.legal_knowledge_base import _legal_text_splitter  # noqa: E402
+
+FIXTURE = Path(__file__).parent / "fixtures" / "retrieval_questions.json"
+BINARY_RESCORE_FACTOR = 4
+
+
+def load_corpus(fixture: dict) -> list:
+    """Chunks exactly as ingestion does: policies at 1000/100, legal docs with the legal splitter"""
+    policy_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    chunks = []
+    for path in fixture["corpus"]["policies"]:
+        chunks += policy_splitter.split_text((ROOT_DIR / path).read_text(encoding="utf-8"))
+    for path in sorted((ROOT_DIR / fixture["corpus"]["legal_docs_dir"]).glob("*.txt")):
+        chunks += _legal_text_splitter().split_text(path.read_text(encoding="utf-8"))
+    return chunks
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True).clip(min=1e-12)
+
+
+def rank(storage: str, chunks: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """Top-k chunk indices as the given storage option would return them"""
+    if storage == "float32":
+        scores = chunks @ query
+    elif storage == "halfvec":
+        scores = chunks.astype(np.float16).astype(np.float32) @ query.astype(np.float16).astype(np.float32)
+    else:
+        # Hamming distance on sign bits picks candidates; full vectors rescore them
+        bits = chunks > 0
+        hamming = (bits != (query > 0)).sum(axis=1)
+        candidates = np.argsort(hamming, kind="stable")[:k * BINARY_RESCORE_FACTOR]
+        return candidates[np.argsort(-(chunks[candidates] @ query))][:k]
+    return np.argsort(-scores)[:k]
+
+
+def bytes_per_vector(storage: str, dimensions: int) -> float:
+    """Index payload per vector, as pgvector stores it (vector/halfvec/bit)"""
+    return {"float32": 4 * dimensions, "halfvec": 2 * dimensions, "binary": dimensions / 8}[storage] + 8
+
+
+def evaluate(model: str, onnx_file: str, max_length: int, chunks: list, questions: list, ks: list) -> dict:
+    embeddings = create_embeddings(model, onnx_file, max_length)
+    embeddings.embed_documents(chunks[:2])  # load the model outside the timing
+
+    started = time.perf_counter()
+    chunk_vectors = normalize(np.asarray(embeddings.embed_documents(chunks), dtype=np.float32))
+    embed_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    query_vectors = normalize(np.asarray(
+        [embeddings.embed_query(q["question"]) for q in questions], dtype=np.float32))
+    query_seconds = time.perf_counter() - started
+
+    relevant = [{i for i, chunk in enumerate(chunks) if q["answer"] in chunk} for q in questions]
+    answerable = [i for i, found in enumerate(relevant) if found]
+    dimensions = chunk_vectors.shape[1]
+    storage = {}
+    for option in ("float32", "halfvec", "binary"):
+        recall = {}
+        for k in ks:
+            hits = sum(1 for i in answerable
+                       if relevant[i] & set(rank(option, chunk_vectors, query_vectors[i], k).tolist()))
+            recall[f"recall@{k}"] = round(hits / len(answerable), 4) if answerable else 0.0
+        storage[option] = {**recall, "bytes_per_vector": bytes_per_vector(option, dimensions)}
+
+    return {
+        "model": model,
+        "onnx_file": onnx_file,
+        "max_length": max_length,
+        "dimensions": dimensions,
+        "chunks": len(chunks),
+        "questions": len(answerable),
+        "embed_chunks_per_second": round(len(chunks) / embed_seconds, 2),
+        "query_ms": round(query_seconds / len(questions) * 1000, 2),
+        "storage": storage,
+    }
+
+
+def parse_model(spec: str):
+    """'repo' or 'repo:onnx/file.onnx'"""
+    model, _, onnx_file = spec.partition(":")
+    return model, onnx_file or None
+
+
+def main():
+    default_model = EMBEDDING_MODEL_ID
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=[default_model],
+                        help="Model specs: a FastEmbed model name, or HF repo:onnx file for a custom/quantized export")
+    parser.add_argument("--max-lengths", nargs="+", type=int, default=[512])
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 3, 5])
+    parser.add_argument("--fixture", default=str(FIXTURE))
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    fixture = json.loads(Path(args.fixture).read_text(encoding="utf-8"))
+    chunks = load_corpus(fixture)
+    results = []
+    for spec in args.models:
+        model, onnx_file = parse_model(spec)
+        for max_length in args.max_lengths:
+            result = evaluate(model, onnx_file, max_length, chunks, fixture["questions"], args.k)
+            results.append(result)
+            print(f"\n{spec} (max_length={max_length}, {result['dimensions']} dims): "
+                  f"{result['embed_chunks_per_second']} chunks/s, {result['query_ms']} ms/query, "
+                  f"{result['questions']} answerable questions")
+            for option, stats in result["storage"].items():
+                recalls = "  ".join(f"{key}={value:.3f}" for key, value in stats.items() if key.startswith("recall"))
+                print(f"  {option:<8} {recalls}  {stats['bytes_per_vector']:.0f} B/vector")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"results": results}, indent=2), encoding="utf-8")
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Suite
+Drives /api/analyze, /api/chat, every PRIVACY_AGENTS entry and
+/api/compare-policies through the real Flask app with replayed LLM output,
+hashed embeddings and in-memory storage, then reports throughput and latency
+histograms that can be compared across commits
+
+Usage:
+    python -m benchmarks.run_benchmarks --concurrency 8 --iterations 40 --output bench.json
+    python -m benchmarks.run_benchmarks --baseline bench.json --max-regression 0.2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from benchmarks.standins import offline_backend  # noqa: E402
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+BENCH_USER = ("bench-user", "bench-password")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms, errors, wall_seconds):
+    values = sorted(latencies_ms)
+    labels = [f"<={upper}ms" if upper != float("inf") else "inf" for upper in HISTOGRAM_BUCKETS_MS]
+    histogram = dict.fromkeys(labels, 0)
+    for value in values:
+        for upper, label in zip(HISTOGRAM_BUCKETS_MS, labels):
+            if value <= upper:
+                histogram[label] += 1
+                break
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+        "histogram": histogram,
+    }
+
+
+def logged_in_client(app):
+    client = app.test_client()
+    response = client.post("/api/login", json={"username": BENCH_USER[0], "password": BENCH_USER[1]})
+    if response.status_code != 200:
+        raise RuntimeError(f"Benchmark login failed: {response.get_json()}")
+    return client
+
+
+def build_scenarios(policy_text, policy_id, agent_types):
+    """Returns {name: (method, path, payload)} for every benchmarked call."""
+    scenarios = {
+        "analyze": ("POST", "/api/analyze", {"source_type": "text", "data": policy_text}),
+        "chat": ("POST", "/api/chat", {"question": "How long is my data retained?", "policy_id": policy_id}),
+        "compare_policies": ("POST", "/api/compare-policies", {"policies": [policy_text, policy_text[: len(policy_text) // 2]]}),
+    }
+    for agent_type in agent_types:
+        scenarios[f"agent:{agent_type}"] = (
+            # force_refresh so every run measures the pipeline, not the result store
+            "POST", f"/api/agents/{agent_type}/analyze", {"policy_id": policy_id, "force_refresh": True})
+    return scenarios
+
+
+def run_scenario(app, request_spec, concurrency, iterations):
+    method, path, payload = request_spec
+    clients = [logged_in_client(app) for _ in range(concurrency)]
+
+    def call(i):
+        client = clients[i % concurrency]
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=payload)
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(iterations)))
+    wall = time.perf_counter() - start
+    errors = sum(1 for _, status in results if status >= 400)
+    return summarize([latency for latency, _ in results], errors, wall)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare_reports(report, baseline, max_regression):
+    """Prints p50/p95 deltas against a baseline; returns scenarios that regressed."""
+    regressions = []
+    print(f"\n{'scenario':<32}{'p50 base':>10}{'p50 now':>10}{'p95 base':>10}{'p95 now':>10}{'delta':>9}")
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        delta = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0.0
+        print(f"{name:<32}{previous['p50_ms']:>10}{current['p50_ms']:>10}{previous['p95_ms']:>10}{current['p95_ms']:>10}{delta:>+9.1%}")
+        if max_regression is not None and delta > max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline PrivacyLens benchmark suite")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--fast-latency-ms", type=float, default=150.0, help="Replay latency of the 8B model")
+    parser.add_argument("--quality-latency-ms", type=float, default=600.0, help="Replay latency of the 70B model")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--policy-file", default=str(ROOT_DIR / "sample_policy.txt"))
+    parser.add_argument("--scenarios", nargs="*", help="Only run scenarios whose name starts with one of these")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report from an earlier commit to compare against")
+    parser.add_argument("--max-regression", type=float, help="Fail if any p95 regresses by more than this fraction")
+    args = parser.parse_args()
+
+    policy_text = Path(args.policy_file).read_text(encoding="utf-8")
+
+    with offline_backend(args.fast_latency_ms, args.quality_latency_ms, args.jitter_ms) as database:
+        from backend.app import app
+        from backend.core.legal_knowledge_base import ingest_legal_documents
+        from backend.core.privacy_agents import PRIVACY_AGENTS
+        from backend.utils import metrics
+
+        ingest_legal_documents()
+        database.create_user(*BENCH_USER)
+        seed = logged_in_client(app).post("/api/analyze", json={"source_type": "text", "data": policy_text})
+        policy_id = seed.get_json()["policy_id"]
+
+        scenarios = build_scenarios(policy_text, policy_id, list(PRIVACY_AGENTS))
+        if args.scenarios:
+            scenarios = {name: spec for name, spec in scenarios.items()
+                         if any(name.startswith(prefix) for prefix in args.scenarios)}
+
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+            "scenarios": {},
+        }
+        for name, spec in scenarios.items():
+            print(f"Running {name} ...")
+            report["scenarios"][name] = run_scenario(app, spec, args.concurrency, args.iterations)
+        report["stages"] = metrics.get_latency_percentiles()
+
+    print(f"\n{'scenario':<32}{'rps':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}")
+    for name, result in report["scenarios"].items():
+        print(f"{name:<32}{result['throughput_rps']:>8}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}{result['errors']:>8}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare_reports(report, baseline, args.max_regression)
+        if regressions:
+            print(f"\nRegressed beyond {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
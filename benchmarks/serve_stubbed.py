@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Run backend/app.py with the LLM and embedding backends stubbed
+Uses the real database so load tests exercise sessions, quotas and SQL,
+while Groq and FastEmbed are replaced by the offline replay stand-ins
+
+Usage:
+    python -m benchmarks.serve_stubbed --port 5001 --quality-latency-ms 800
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from benchmarks.standins import offline_backend  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with stubbed LLM and embeddings")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--fast-latency-ms", type=float, default=150.0)
+    parser.add_argument("--quality-latency-ms", type=float, default=600.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    with offline_backend(args.fast_latency_ms, args.quality_latency_ms, args.jitter_ms, with_database=False):
+        from backend.app import app, create_default_admin
+        from backend.core.legal_knowledge_base import ingest_legal_documents
+
+        # Vector stores are in-memory here, so the legal KB is loaded per process
+        ingest_legal_documents()
+        create_default_admin()
+        app.run(host=args.host, port=args.port, threaded=True, debug=False)
+
+
+if __name__ == "__main__":
+    main()
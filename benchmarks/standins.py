@@ -0,0 +1,434 @@
+"""
+Offline Stand-ins for Benchmarks
+Replaces Groq, FastEmbed, pgvector and the Postgres-backed data layer with
+deterministic in-process implementations so the real request pipeline can
+be timed without API keys or a database
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore
+from werkzeug.security import generate_password_hash
+
+from backend.core import embeddings as embedding_service
+from backend.core import vector_store
+from backend.core import web_search
+from backend.core.llm_gateway import get_gateway
+from backend.core.policy_digest import build_digest
+from backend.utils.policy_text_store import content_hash
+from backend.core.pydantic_models import PrivacyAnalysis
+from backend.utils import rate_limit
+from backend.utils.rate_limit import MessageRateLimiter
+from backend.utils.user_cache import user_cache
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+# --- LLM ---
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that replays recorded outputs chosen by prompt markers."""
+
+    model_name: str = "replay"
+    recordings: list = []
+    default_response: str = ""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = next((r["response"] for r in self.recordings if r["match"] in prompt),
+                    self.default_response)
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(text) // 4,
+            "total_tokens": (len(prompt) + len(text)) // 4,
+        }
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text))],
+            llm_output={"token_usage": usage, "model_name": self.model_name},
+        )
+
+
+def load_recordings(path=FIXTURES_DIR / "recorded_outputs.json") -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- Embeddings ---
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings via feature hashing."""
+
+    def __init__(self, size: int = 384):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+# --- Vector store ---
+
+def _metadata_filter(filter):
+    """Translates pgvector-style {'key': value} filters into a predicate."""
+    if filter is None or callable(filter):
+        return filter
+    return lambda doc: all(doc.metadata.get(k) == v for k, v in filter.items())
+
+
+class FilterableInMemoryVectorStore(InMemoryVectorStore):
+    """Thread-safe InMemoryVectorStore that accepts metadata dict filters."""
+
+    def __init__(self, embedding):
+        super().__init__(embedding)
+        self._lock = threading.RLock()
+
+    def add_documents(self, documents, **kwargs):
+        with self._lock:
+            return super().add_documents(documents, **kwargs)
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        with self._lock:
+            return super().similarity_search(query, k=k, filter=_metadata_filter(filter), **kwargs)
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        with self._lock:
+            return super().max_marginal_relevance_search(
+                query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult,
+                filter=_metadata_filter(filter), **kwargs)
+
+
+# --- Data layer ---
+
+class InMemoryDatabase:
+    """Stand-in for the Postgres functions in backend.utils.db used by the API."""
+
+    def __init__(self, ingest_policy):
+        self._lock = threading.Lock()
+        self._ingest_policy = ingest_policy
+        self.users = {}
+        self.policies = {}
+        self.messages = {}
+        self.agent_results = {}
+        self._next_user_id = 1
+        self._next_policy_id = 1
+
+    def create_user(self, username, password, role='user'):
+        with self._lock:
+            user_id = self._next_user_id
+            self._next_user_id += 1
+            self.users[user_id] = {
+                "user_id": user_id, "username": username,
+                "password_hash": generate_password_hash(password), "role": role,
+                "daily_message_count": 0, "last_message_date": None,
+            }
+            return user_id
+
+    def get_user_by_username(self, username):
+        with self._lock:
+            return next((dict(u) for u in self.users.values() if u["username"] == username), None)
+
+    def get_user_by_id(self, user_id):
+        with self._lock:
+            user = self.users.get(int(user_id))
+            if not user:
+                return None
+            return {k: v for k, v in user.items() if k != "password_hash"}
+
+    def update_user_role(self, user_id, role):
+        with self._lock:
+            user = self.users.get(user_id)
+            if user:
+                user["role"] = role
+        user_cache.invalidate(user_id)
+        return user is not None
+
+    def delete_user(self, user_id):
+        with self._lock:
+            if self.users.pop(user_id, None) is None:
+                return False
+            for policy_id in [pid for pid, p in self.policies.items() if p["user_id"] == user_id]:
+                del self.policies[policy_id]
+                self.messages.pop(policy_id, None)
+        user_cache.invalidate(user_id)
+        return True
+
+    def lease_message_quota(self, user_id, requested, daily_limit, today):
+        # Quotas would throttle the benchmark itself; count but never refuse
+        with self._lock:
+            user = self.users.get(user_id)
+            if not user:
+                return 0
+            if user["last_message_date"] != today:
+                user["daily_message_count"] = 0
+                user["last_message_date"] = today
+            user["daily_message_count"] += requested
+            return requested
+
+    def return_message_quota(self, user_id, count, today):
+        with self._lock:
+            user = self.users.get(user_id)
+            if user and user["last_message_date"] == today:
+                user["daily_message_count"] = max(user["daily_message_count"] - count, 0)
+
+    def find_previous_version(self, user_id, policy_text, previous_policy_id=None):
+        head = policy_text[:3000].lower()
+        with self._lock:
+            candidates = [(len(p["title"]), pid) for pid, p in self.policies.items()
+                          if p["user_id"] == user_id and (
+                              pid == previous_policy_id if previous_policy_id
+                              else len(p["title"]) >= 3 and p["title"].lower() in head)]
+            if not candidates:
+                return None
+            policy_id = max(candidates)[1]
+            policy = self.policies[policy_id]
+            return {"policy_id": policy_id, "policy_text": policy["policy_text"],
+                    "analysis": dict(policy["analysis"])}
+
+    def get_policy_changes(self, policy_id, user_id):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            if not policy or policy["user_id"] != user_id:
+                return None
+            return {"policy_id": policy_id, "previous_policy_id": policy.get("previous_policy_id"),
+                    "changes": policy.get("change_summary")}
+
+    def save_analysis_results(self, policy_text, analysis_data, user_id,
+                              previous_policy_id=None, change_summary=None):
+        analysis = PrivacyAnalysis(**analysis_data)
+        with self._lock:
+            policy_id = self._next_policy_id
+            self._next_policy_id += 1
+            self.policies[policy_id] = {
+                "user_id": user_id, "policy_text": policy_text,
+                "title": analysis.company_name, "analysis": analysis.model_dump(),
+                "last_activity": time.time(),
+                "previous_policy_id": previous_policy_id, "change_summary": change_summary,
+            }
+            self.messages[policy_id] = []
+        self._ingest_policy(policy_id, policy_text, user_id=user_id)
+        return policy_id
+
+    def get_all_chats(self, user_id):
+        with self._lock:
+            return [{"policy_id": pid, "title": p["title"]}
+                    for pid, p in sorted(self.policies.items(), reverse=True)
+                    if p["user_id"] == user_id]
+
+    def get_chat_summaries(self, user_id, limit=50, cursor=None):
+        from backend.utils.db import encode_cursor, decode_cursor
+        with self._lock:
+            owned = sorted(((p["last_activity"], pid) for pid, p in self.policies.items()
+                            if p["user_id"] == user_id), reverse=True)
+            if cursor:
+                position = tuple(decode_cursor(cursor))
+                owned = [entry for entry in owned if entry < position]
+            chats = [{
+                "policy_id": pid, "title": self.policies[pid]["title"],
+                "risk_score": self.policies[pid]["analysis"].get("risk_score"),
+                "last_activity_at": None, "message_count": len(self.messages[pid]),
+            } for _, pid in owned[:limit]]
+            next_cursor = encode_cursor(*owned[limit - 1]) if len(owned) > limit else None
+            return {"chats": chats, "next_cursor": next_cursor}
+
+    def get_chat_history(self, policy_id, user_id, before=None, after=None, limit=None):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            if not policy or policy["user_id"] != user_id:
+                return None
+            for name, cursor in (("before", before), ("after", after)):
+                if cursor is not None and not 1 <= cursor <= len(self.messages[policy_id]):
+                    raise ValueError(f"'{name}' is not a message of this chat")
+            messages = [(message_id, is_user, text) for message_id, (is_user, text)
+                        in enumerate(self.messages[policy_id], start=1)
+                        if (before is None or message_id < before) and (after is None or message_id > after)]
+            if limit is not None:
+                messages = messages[:limit] if after is not None else messages[-limit:]
+            return {
+                "policy_id": policy_id, "title": policy["title"],
+                "analysis": dict(policy["analysis"]),
+                "history": [{"message_id": m[0], "is_user": m[1], "text": m[2]} for m in messages],
+            }
+
+    def save_chat_message(self, policy_id, user_id, is_user, text):
+        with self._lock:
+            self.messages.setdefault(policy_id, []).append((is_user, text))
+            if policy_id in self.policies:
+                self.policies[policy_id]["last_activity"] = time.time()
+
+    def rename_chat(self, policy_id, user_id, new_title):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            if not policy or policy["user_id"] != user_id:
+                return False
+            policy["title"] = new_title
+            return True
+
+    def delete_chat(self, policy_id, user_id):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            if not policy or policy["user_id"] != user_id:
+                return False
+            del self.policies[policy_id]
+            self.messages.pop(policy_id, None)
+            return True
+
+    def get_policy_text(self, policy_id):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            return policy["policy_text"] if policy else ""
+
+    def get_policy_digest(self, policy_id):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            if not policy:
+                return None
+            if "digest" not in policy:
+                policy["digest"] = build_digest(policy["policy_text"])
+            return policy["digest"]
+
+    def get_policy_content_hash(self, policy_id):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            return content_hash(policy["policy_text"]) if policy else None
+
+    def get_agent_result(self, *key):
+        with self._lock:
+            return self.agent_results.get(key)
+
+    def save_agent_result(self, *key_and_result):
+        with self._lock:
+            self.agent_results[key_and_result[:-1]] = key_and_result[-1]
+
+    def get_comparison_policies(self, policy_ids, user_id):
+        with self._lock:
+            return [{"policy_id": pid, "title": policy["title"],
+                     "content_hash": content_hash(policy["policy_text"]),
+                     **{field: policy["analysis"].get(field) for field in (
+                         "pii_collected", "data_sharing_practices", "retention_summary", "risk_score")}}
+                    for pid, policy in self.policies.items()
+                    if pid in policy_ids and policy["user_id"] == user_id]
+
+    def get_latest_agent_results(self, content_hashes, agent_keys):
+        with self._lock:
+            return {(key[0], key[1]): result for key, result in self.agent_results.items()
+                    if key[0] in content_hashes and agent_keys.get(key[1]) == key[2:]}
+
+    def search_policy_chunks(self, query_embedding, owner_ids, limit):
+        with self._lock:
+            titles = {pid: policy["title"] for pid, policy in self.policies.items()}
+        store = vector_store.get_vector_store()
+        with store._lock:
+            hits = store.similarity_search_with_score_by_vector(
+                query_embedding, k=limit, filter=lambda doc: doc.metadata.get("user_id") in owner_ids)
+        return [{"policy_id": doc.metadata["policy_id"], "title": titles[doc.metadata["policy_id"]],
+                 "text": doc.page_content, "score": score} for doc, score in hits]
+
+    def get_owned_policy_text(self, policy_id, user_id):
+        with self._lock:
+            policy = self.policies.get(policy_id)
+            return policy["policy_text"] if policy and policy["user_id"] == user_id else None
+
+    def app_patches(self) -> dict:
+        """Names bound in backend.app that should point at this stand-in."""
+        return {name: getattr(self, name) for name in (
+            "create_user", "get_user_by_username", "get_user_by_id", "update_user_role", "delete_user",
+            "save_analysis_results", "find_previous_version", "get_policy_changes",
+            "get_all_chats", "get_chat_summaries", "get_chat_history", "save_chat_message",
+            "rename_chat", "delete_chat", "get_policy_text", "get_owned_policy_text",
+            "get_policy_digest", "get_policy_content_hash", "get_agent_result", "save_agent_result",
+            "get_comparison_policies", "get_latest_agent_results", "search_policy_chunks",
+        )}
+
+
+# --- Installation ---
+
+@contextmanager
+def offline_backend(fast_latency_ms: float = 150.0, quality_latency_ms: float = 600.0,
+                    jitter_ms: float = 50.0, with_database: bool = True):
+    """
+    Installs every stand-in, yielding the in-memory database (or None)
+
+    LLM clients, embeddings, vector stores and web search are swapped through their
+    factory hooks; the database functions are patched where backend.app
+    imported them. Everything is restored on exit.
+    """
+    recordings = load_recordings()
+    latencies = {"llama-3.1-8b-instant": fast_latency_ms}
+    stores = {}
+    stores_lock = threading.Lock()
+
+    def client_factory(model_name):
+        return ReplayChatModel(
+            model_name=model_name,
+            recordings=recordings["recordings"],
+            default_response=recordings["default"],
+            latency_ms=latencies.get(model_name, quality_latency_ms),
+            jitter_ms=jitter_ms,
+        )
+
+    def vector_store_factory(collection_name, embeddings):
+        with stores_lock:
+            if collection_name not in stores:
+                stores[collection_name] = FilterableInMemoryVectorStore(embeddings)
+            return stores[collection_name]
+
+    gateway = get_gateway()
+    gateway.set_client_factory(client_factory)
+    embedding_service.set_embeddings(HashingEmbeddings())
+    vector_store.set_vector_store_factory(vector_store_factory)
+    web_search.set_search_provider(web_search.FixtureSearchProvider(FIXTURES_DIR / "web_search.json"))
+    try:
+        if not with_database:
+            yield None
+            return
+        import backend.app
+        from backend.utils.db import ingest_and_embed_policy
+        database = InMemoryDatabase(ingest_and_embed_policy)
+        limiter = MessageRateLimiter(database.lease_message_quota, database.return_message_quota)
+        # Burst limits would throttle the benchmark's own request loop
+        with mock.patch.dict(rate_limit.ROLE_BURST_LIMITS, {"user": None}), \
+                mock.patch.multiple(backend.app, message_limiter=limiter, **database.app_patches()):
+            yield database
+    finally:
+        gateway.set_client_factory(None)
+        embedding_service.set_embeddings(None)
+        vector_store.set_vector_store_factory(None)
+        web_search.set_search_provider(None)
@@ -20,14 +20,38 @@ CREATE TABLE IF NOT EXISTS companies (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Table for compressed policy texts, stored once per distinct content
+CREATE TABLE IF NOT EXISTS policy_texts (
+    content_hash CHAR(64) PRIMARY KEY, -- SHA-256 of the UTF-8 text
+    codec VARCHAR(16) NOT NULL, -- 'zstd' or 'zlib'
+    compressed_text BYTEA NOT NULL,
+    original_length INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+-- Already compressed; skip TOAST's own compression attempt
+ALTER TABLE policy_texts ALTER COLUMN compressed_text SET STORAGE EXTERNAL;
+
+-- Table for structured policy digests (backend/core/policy_digest.py), one per text
+CREATE TABLE IF NOT EXISTS policy_digests (
+    content_hash CHAR(64) PRIMARY KEY REFERENCES policy_texts (content_hash) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    digest JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Table for privacy policies
 CREATE TABLE IF NOT EXISTS privacy_policies (
     policy_id SERIAL PRIMARY KEY,
     company_id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
-    policy_text TEXT NOT NULL,
+    policy_text TEXT, -- legacy rows only; new rows reference policy_texts
+    content_hash CHAR(64) REFERENCES policy_texts (content_hash),
     display_title VARCHAR(255), 
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_activity_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    previous_policy_id INTEGER REFERENCES privacy_policies (policy_id) ON DELETE SET NULL,
+    change_summary JSONB,
     FOREIGN KEY (company_id) REFERENCES companies (company_id),
     FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
 );
@@ -64,3 +88,84 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     FOREIGN KEY (policy_id) REFERENCES privacy_policies (policy_id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
+
+-- Keyset pagination of a chat's messages by (created_at, message_id)
+CREATE INDEX IF NOT EXISTS idx_chat_messages_policy_created
+    ON chat_messages (policy_id, created_at, message_id);
+
+-- Sidebar summary columns, maintained by save_chat_message. For databases
+-- created before they existed, add and backfill them once.
+ALTER TABLE privacy_policies ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE privacy_policies ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+UPDATE privacy_policies p
+SET last_activity_at = COALESCE(s.last_message_at, p.created_at),
+    message_count = s.message_count
+FROM (
+    SELECT pp.policy_id, MAX(m.created_at) AS last_message_at, COUNT(m.message_id) AS message_count
+    FROM privacy_policies pp
+    LEFT JOIN chat_messages m ON m.policy_id = pp.policy_id
+    WHERE pp.last_activity_at IS NULL
+    GROUP BY pp.policy_id
+) s
+WHERE p.policy_id = s.policy_id;
+ALTER TABLE privacy_policies ALTER COLUMN last_activity_at SET DEFAULT CURRENT_TIMESTAMP;
+
+-- Move existing databases to policy_texts; migrate_policy_texts() in
+-- backend/utils/db.py compresses the legacy policy_text values
+ALTER TABLE privacy_policies ADD COLUMN IF NOT EXISTS content_hash CHAR(64) REFERENCES policy_texts (content_hash);
+ALTER TABLE privacy_policies ALTER COLUMN policy_text DROP NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_privacy_policies_content_hash ON privacy_policies (content_hash);
+
+-- Policy versions: link to the previous version of the same company's policy
+-- and the section-level "what changed" summary (backend/core/policy_versioning.py)
+ALTER TABLE privacy_policies ADD COLUMN IF NOT EXISTS previous_policy_id INTEGER
+    REFERENCES privacy_policies (policy_id) ON DELETE SET NULL;
+ALTER TABLE privacy_policies ADD COLUMN IF NOT EXISTS change_summary JSONB;
+
+-- Chat list ordered by creation and sidebar summary ordered by activity
+CREATE INDEX IF NOT EXISTS idx_privacy_policies_user_created
+    ON privacy_policies (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_privacy_policies_user_activity
+    ON privacy_policies (user_id, last_activity_at DESC, policy_id DESC)
+    INCLUDE (display_title, message_count);
+
+-- Table for policy URLs tracked by the change monitor (backend/core/policy_monitor.py)
+CREATE TABLE IF NOT EXISTS tracked_policies (
+    tracked_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    check_interval_seconds INTEGER NOT NULL DEFAULT 86400,
+    next_check_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_checked_at TIMESTAMP WITH TIME ZONE,
+    last_changed_at TIMESTAMP WITH TIME ZONE,
+    content_hash CHAR(64), -- last fetched content
+    analyzed_simhash BIGINT, -- fingerprint of the last analyzed version
+    policy_id INTEGER REFERENCES privacy_policies (policy_id) ON DELETE SET NULL,
+    last_status VARCHAR(20),
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_tracked_policies_due ON tracked_policies (next_check_at);
+
+-- Table for validated privacy agent outputs, reused across runs on the same text
+CREATE TABLE IF NOT EXISTS agent_results (
+    content_hash CHAR(64) NOT NULL, -- SHA-256 of the policy text
+    agent_type VARCHAR(64) NOT NULL,
+    params_hash CHAR(64) NOT NULL, -- agent params and input mode
+    model VARCHAR(128) NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    result JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, agent_type, params_hash, model, prompt_version)
+);
+
+-- Files ingested into the legal knowledge base (backend/core/legal_knowledge_base.py);
+-- chunk_ids are the vector store ids of the file's current chunks
+CREATE TABLE IF NOT EXISTS legal_kb_manifest (
+    source_file VARCHAR(255) PRIMARY KEY,
+    file_hash CHAR(64) NOT NULL, -- content, metadata and chunking version
+    chunk_ids TEXT[] NOT NULL,
+    ingested_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """
 Initialize the Legal Knowledge Base
-Run this script once to populate the legal reference documents
+Run this script to populate the legal reference documents, or to sync the
+knowledge base after files in backend/legal_docs changed. Unchanged files
+are skipped, so re-running it is cheap.
 """
-from backend.core.legal_knowledge_base import ingest_legal_documents, is_legal_kb_initialized, query_legal_knowledge
+from backend.core.legal_knowledge_base import ingest_legal_documents, query_legal_knowledge
 import sys
 import os
 
@@ -24,24 +26,17 @@ def main():
     print("="*60)
     print()
 
-    # Check if already initialized
-    print("Checking if legal knowledge base is already initialized...")
-    if is_legal_kb_initialized():
-        print("✓ Legal knowledge base already contains data")
-        response = input(
-            "\nDo you want to reingest documents? This will add duplicate data. (y/N): ")
-        if response.lower() != 'y':
-            print("\nSkipping ingestion. Exiting.")
-            return
-
-    print("\n" + "-"*60)
-    print("Starting ingestion of legal reference documents...")
+    print("-"*60)
+    print("Syncing legal reference documents...")
     print("-"*60 + "\n")
 
     try:
-        ingest_legal_documents()
+        stats = ingest_legal_documents()
         print("\n" + "="*60)
-        print("✓ SUCCESS: Legal knowledge base populated successfully!")
+        print("✓ SUCCESS: Legal knowledge base is up to date!")
+        print(f"Files: {stats.get('files_updated', 0)} updated, {stats.get('files_skipped', 0)} unchanged, "
+              f"{stats.get('files_removed', 0)} removed")
+        print(f"Chunks: {stats.get('chunks_added', 0)} added, {stats.get('chunks_deleted', 0)} deleted")
         print("="*60)
 
         # Run test queries
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Create the Search Indexes
+Builds the HNSW, full-text, policy_id and user_id indexes on the langchain
+pgvector table used by /api/search and hybrid retrieval, and tags chunks
+stored before policy search filtered on their owner. Run it after
+init_legal_kb.py (which creates the table), and again whenever
+VECTOR_INDEX_TYPE or EMBEDDING_DIMENSIONS changes. Indexes are built
+CONCURRENTLY, so the app can keep serving while this runs.
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Settings are read when backend.utils.db is imported
+load_dotenv()
+
+from backend.utils.db import (  # noqa: E402
+    ensure_policy_search_indexes, backfill_chunk_owners, VECTOR_INDEX_TYPE
+)
+
+
+def main():
+    print(f"Creating search indexes (VECTOR_INDEX_TYPE={VECTOR_INDEX_TYPE})...")
+    if not ensure_policy_search_indexes():
+        print("✗ langchain_pg_embedding does not exist yet; run init_legal_kb.py first")
+        sys.exit(1)
+    print("✓ Search indexes are up to date")
+    updated = backfill_chunk_owners()
+    if updated:
+        print(f"✓ Tagged {updated} policy chunks with their owner")
+
+
+if __name__ == "__main__":
+    main()
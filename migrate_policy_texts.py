@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Migrate Legacy Policy Texts
+Compresses policy texts still stored inline in privacy_policies.policy_text
+into the deduplicated policy_texts table. Run it once after upgrading; it
+works in small batches and skips rows other workers have locked, so the app
+can keep serving while it runs and it is safe to re-run.
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Settings are read when backend.utils.db is imported
+load_dotenv()
+
+from backend.utils.db import migrate_policy_texts  # noqa: E402
+
+
+def main():
+    print("Compressing legacy policy texts...")
+    migrated = migrate_policy_texts()
+    print(f"✓ Compressed {migrated} legacy policy texts into policy_texts")
+
+
+if __name__ == "__main__":
+    main()
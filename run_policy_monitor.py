@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Run the Policy Monitor
+Polls tracked policy URLs and re-analyzes those that changed, in the
+foreground. Run one or more of these next to the web workers (under a WSGI
+server the app never starts a monitor itself); due URLs are claimed with a
+lease, so several monitors never check the same URL at once.
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Settings are read when the backend modules are imported
+load_dotenv()
+
+from backend.app import policy_monitor  # noqa: E402
+
+
+def main():
+    print("Policy monitor running; press Ctrl+C to stop")
+    try:
+        policy_monitor.run()
+    except KeyboardInterrupt:
+        policy_monitor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Tests for the model cascade's accept/escalate decision
+"""
+import pytest
+
+from backend.core import cascade
+from backend.core.cascade import CascadeRejection, validate_agent_output
+from backend.core.privacy_agents import ChildPrivacyAssessment, DataBreachRisk, GDPRCompliance
+
+GDPR_RESULT = {"is_compliant": True, "missing_elements": [], "compliant_elements": ["Article 6 legal basis"],
+               "recommendations": ["Name a DPO"], "compliance_score": 8}
+
+
+def test_accepts_a_complete_consistent_result():
+    assert validate_agent_output(GDPRCompliance, GDPR_RESULT)["compliance_score"] == 8
+
+
+@pytest.mark.parametrize("result", [
+    ["not", "an", "object"],
+    {"is_compliant": True, "compliance_score": 8},
+    {**GDPR_RESULT, "compliance_score": 12},
+    {**GDPR_RESULT, "compliance_score": 3},
+    {**GDPR_RESULT, "is_compliant": False, "compliance_score": 9},
+    {**GDPR_RESULT, "compliant_elements": [], "recommendations": []},
+])
+def test_rejects_incomplete_or_inconsistent_gdpr_results(result):
+    with pytest.raises(CascadeRejection):
+        validate_agent_output(GDPRCompliance, result)
+
+
+def test_rejects_unknown_risk_level():
+    result = {"security_measures": ["encryption"], "breach_notification": "within 72 hours",
+              "data_at_risk": ["email"], "risk_level": "moderate-ish", "risk_factors": [],
+              "mitigation_advice": []}
+    with pytest.raises(CascadeRejection):
+        validate_agent_output(DataBreachRisk, result)
+
+
+def test_rejects_coppa_compliance_without_consent_mechanism():
+    result = {"coppa_compliant": True, "age_restrictions": "13+", "parental_consent": " ",
+              "child_data_collected": [], "safety_concerns": [], "recommendations": ["Review settings"]}
+    with pytest.raises(CascadeRejection):
+        validate_agent_output(ChildPrivacyAssessment, result)
+
+
+class FakeAgent:
+    def __init__(self, result, calls, model_type):
+        self.result = result
+        self.calls = calls
+        self.model_type = model_type
+
+    def invoke(self, inputs):
+        self.calls.append(self.model_type)
+        return self.result
+
+
+def run_with_fast_result(monkeypatch, fast_result):
+    calls = []
+    results = {"fast": fast_result, "quality": GDPR_RESULT}
+    monkeypatch.setattr(cascade, "CASCADE_ENABLED", True)
+    monkeypatch.setattr(cascade, "build_privacy_agent",
+                        lambda agent_type, policy_id, model_type=None:
+                        FakeAgent(results[model_type], calls, model_type))
+    return cascade.run_agent("gdpr_compliance", {}, policy_id=1), calls
+
+
+def test_run_agent_keeps_a_valid_fast_result(monkeypatch):
+    fast_result = {**GDPR_RESULT, "compliance_score": 7}
+    result, calls = run_with_fast_result(monkeypatch, fast_result)
+    assert calls == ["fast"]
+    assert result["compliance_score"] == 7
+
+
+def test_run_agent_escalates_a_fast_result_with_missing_fields(monkeypatch):
+    result, calls = run_with_fast_result(monkeypatch, {"is_compliant": True, "compliance_score": 7})
+    assert calls == ["fast", "quality"]
+    assert result == GDPR_RESULT
@@ -0,0 +1,59 @@
+"""
+Tests for structured output repair and schema coercion
+"""
+from typing import List
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel
+
+from backend.core.json_repair import RepairingJsonOutputParser, coerce_to_schema, repair_json_text
+
+
+class Report(BaseModel):
+    findings: List[str]
+    summary: str
+    score: int
+    compliant: bool
+
+
+def test_repair_json_text_fixes_fences_commas_and_literals():
+    text = '```json\n{"findings": ["a",], "compliant": True}\n```'
+    assert repair_json_text(text) == {"findings": ["a"], "compliant": True}
+
+
+def test_repair_json_text_closes_truncated_output():
+    assert repair_json_text('{"findings": ["a", "b"], "summary": "cut of') == {
+        "findings": ["a", "b"], "summary": "cut of"}
+
+
+def test_coerce_to_schema_fills_text_and_list_gaps():
+    coerced = coerce_to_schema({"score": "7/10", "compliant": False}, Report)
+    assert coerced == {"findings": [], "summary": "Not specified", "score": 7, "compliant": False}
+
+
+def test_coerce_to_schema_wraps_and_stringifies():
+    coerced = coerce_to_schema({"findings": "one", "summary": {"a": 1}, "score": 3, "compliant": True}, Report)
+    assert coerced["findings"] == ["one"]
+    assert coerced["summary"] == '{"a": 1}'
+
+
+def test_coerce_to_schema_leaves_missing_numbers_and_booleans():
+    coerced = coerce_to_schema({}, Report)
+    assert "score" not in coerced and "compliant" not in coerced
+
+
+def test_parser_coerces_by_default():
+    parser = RepairingJsonOutputParser(pydantic_object=Report)
+    assert parser.parse('{"score": 5, "compliant": true}')["summary"] == "Not specified"
+
+
+def test_parser_without_coercion_returns_the_parsed_object():
+    parser = RepairingJsonOutputParser(pydantic_object=Report, coerce=False)
+    assert parser.parse('{"score": 5, "compliant": true,}') == {"score": 5, "compliant": True}
+
+
+def test_parser_without_coercion_does_not_call_the_repair_model():
+    parser = RepairingJsonOutputParser(pydantic_object=Report, coerce=False)
+    with pytest.raises(OutputParserException):
+        parser.parse("no json here")
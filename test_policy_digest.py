@@ -0,0 +1,36 @@
+"""
+Tests for the policy digest and when agents fall back to the full text
+"""
+from pathlib import Path
+
+from backend.core.policy_digest import build_digest, render_digest
+from backend.core.privacy_agents import render_agent_digest
+
+SAMPLE_POLICY = (Path(__file__).parent / "sample_policy.txt").read_text(encoding="utf-8")
+
+
+def test_build_digest_is_deterministic():
+    assert build_digest(SAMPLE_POLICY) == build_digest(SAMPLE_POLICY)
+
+
+def test_digest_offsets_point_into_the_policy():
+    digest = build_digest(SAMPLE_POLICY)
+    for item in digest["collection"] + digest["sharing"]:
+        assert SAMPLE_POLICY[item["start"]:item["end"]].startswith(item["text"].rstrip("."))
+
+
+def test_sample_policy_digest_is_used():
+    rendered = render_agent_digest("privacy_rights", build_digest(SAMPLE_POLICY))
+    assert rendered and len(rendered) < len(SAMPLE_POLICY)
+
+
+def test_header_only_digest_falls_back_to_full_text():
+    digest = build_digest("Privacy Policy\n\nWe care about you.\n")
+    assert render_digest(digest, ["rights"]).count("\n") == 0
+    assert render_agent_digest("privacy_rights", digest) is None
+
+
+def test_sparse_digest_of_a_long_policy_falls_back_to_full_text():
+    filler = "This paragraph explains how the service works in general terms. " * 500
+    policy = f"We share your email address with advertising partners.\n{filler}\n"
+    assert render_agent_digest("policy_simplifier", build_digest(policy)) is None
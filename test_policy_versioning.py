@@ -0,0 +1,114 @@
+"""
+Tests for policy version diffs and change classification
+"""
+import os
+
+from backend.core import policy_versioning
+from backend.core.policy_versioning import (
+    changed_topics, diff_sections, is_similar_version, opening_changed, split_sections,
+)
+
+SHARING_LIST = "Intro text.\nWe share data with:\n- advertising partners\nEnd."
+
+
+def test_added_sentence_is_classified_by_topic():
+    old = "We care about privacy. We collect your email address."
+    new = old + " We sell your browsing history to data brokers."
+    assert changed_topics(old, new) == {"sharing"}
+
+
+def test_added_bullet_under_a_sharing_list_is_material():
+    new = SHARING_LIST.replace("- advertising partners\n", "- advertising partners\n- data brokers\n")
+    assert changed_topics(SHARING_LIST, new) == {"sharing"}
+
+
+def test_removed_bullet_under_a_collection_list_is_material():
+    old = "We collect:\n\n* your email address\n* your precise location\n"
+    new = "We collect:\n\n* your email address\n"
+    assert changed_topics(old, new) == {"collection"}
+
+
+def test_reflowed_text_is_cosmetic():
+    old = "We sell your data to\nadvertising partners. Contact us anytime."
+    new = "We sell your data to advertising partners.\n\nContact us anytime."
+    assert changed_topics(old, new) == set()
+
+
+def test_reflowed_list_item_is_cosmetic():
+    old = "We share data with:\n- advertising partners and\n  analytics providers\n"
+    new = "We share data with:\n- advertising partners and analytics providers\n"
+    assert changed_topics(old, new) == set()
+
+
+def _sample_policy():
+    with open(os.path.join(os.path.dirname(__file__), "sample_policy.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+def _add_broker_sharing(text):
+    return text.replace("- With Affiliates:", "- With Data Brokers: We sell your information to data brokers.\n\n"
+                                             "- With Affiliates:", 1)
+
+
+def test_lightly_edited_policy_is_a_similar_version():
+    policy = _sample_policy()
+    assert is_similar_version(policy, _add_broker_sharing(policy))
+
+
+def test_unrelated_policy_is_not_a_similar_version():
+    unrelated = ("Terms of Service. By using the app you agree to arbitration. "
+                 "Subscriptions renew monthly until cancelled. ") * 20
+    assert not is_similar_version(_sample_policy(), unrelated)
+
+
+def test_diff_sections_finds_the_modified_section():
+    policy = _sample_policy()
+    diff = diff_sections(policy, _add_broker_sharing(policy))
+    assert [s["heading"] for s in diff["modified"]] == ["3. How We Share Your Information"]
+    assert diff["added"] == [] and diff["removed"] == []
+    assert len(diff["unchanged"]) == len(split_sections(policy)) - 1
+
+
+def test_diff_sections_finds_added_and_removed_sections():
+    policy = _sample_policy()
+    new = policy.replace("4. Data Retention", "4. Children's Privacy\nWe do not knowingly collect data from children.\n\n"
+                                              "5. Data Retention", 1)
+    new = new[:new.index("6. Contact Us")]
+    diff = diff_sections(policy, new)
+    assert [s["heading"] for s in diff["added"]] == ["4. Children's Privacy"]
+    assert [s["heading"] for s in diff["removed"]] == ["6. Contact Us"]
+
+
+def test_renumbered_sections_are_unchanged():
+    policy = _sample_policy()
+    new = policy.replace("3. How We Share Your Information", "4. How we share your information", 1)
+    diff = diff_sections(policy, new)
+    assert diff["added"] == diff["removed"] == diff["modified"] == []
+
+
+def test_opening_changed_ignores_later_sections():
+    policy = _sample_policy()
+    assert not opening_changed(policy, _add_broker_sharing(policy))
+    assert opening_changed(policy, policy.replace("ConnectSphere", "OtherCo"))
+
+
+def test_reanalysis_keeps_the_company_name_when_the_opening_is_unchanged(monkeypatch):
+    previous = {"company_name": "ConnectSphere", "pii_collected": ["email"],
+                "data_sharing_practices": "Shared with affiliates.", "retention_summary": "One year.",
+                "risk_score": 4, "final_summary": "Moderate risk."}
+
+    class FakeUpdateAgent:
+        def invoke(self, inputs):
+            return {"data_sharing_practices": "Sold to data brokers.", "risk_score": 8}
+
+    def fail_extract(text):
+        raise AssertionError("company name re-extracted for an unchanged opening")
+
+    monkeypatch.setattr(policy_versioning.llm_gateway, "get_llm", lambda model_type: None)
+    monkeypatch.setattr(policy_versioning, "create_update_agent", lambda llm: FakeUpdateAgent())
+    monkeypatch.setattr(policy_versioning, "extract_company_name", fail_extract)
+    policy = _sample_policy()
+    analysis, changes = policy_versioning.reanalyze_policy(previous, policy, _add_broker_sharing(policy))
+    assert analysis["company_name"] == "ConnectSphere"
+    assert analysis["data_sharing_practices"] == "Sold to data brokers."
+    assert changes["fields_changed"] == ["data_sharing_practices", "risk_score"]
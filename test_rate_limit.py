@@ -0,0 +1,71 @@
+"""
+Tests for returning unused leased chat quota
+"""
+import time
+
+from backend.utils import rate_limit
+from backend.utils.rate_limit import MessageRateLimiter
+
+
+class FakeQuotaStore:
+    def __init__(self, daily_limit):
+        self.daily_limit = daily_limit
+        self.used = 0
+
+    def lease(self, user_id, requested, daily_limit, today):
+        granted = min(requested, self.daily_limit - self.used)
+        self.used += granted
+        return granted
+
+    def give_back(self, user_id, count, today):
+        self.used -= count
+
+
+def _limiter(store, idle_seconds=60):
+    limiter = MessageRateLimiter(store.lease, store.give_back, idle_seconds=idle_seconds)
+    # No background reaper in tests; release_idle is driven directly
+    limiter._start_reaper = lambda: None
+    return limiter
+
+
+def test_idle_lease_is_returned(monkeypatch):
+    monkeypatch.setitem(rate_limit.ROLE_BURST_LIMITS, "user", None)
+    store = FakeQuotaStore(daily_limit=20)
+    limiter = _limiter(store)
+    assert limiter.check(1, "user")[0]
+    assert store.used == rate_limit.LEASE_SIZE
+
+    limiter.release_idle(now=time.monotonic() + 61)
+    assert store.used == 1
+
+
+def test_active_lease_is_kept(monkeypatch):
+    monkeypatch.setitem(rate_limit.ROLE_BURST_LIMITS, "user", None)
+    store = FakeQuotaStore(daily_limit=20)
+    limiter = _limiter(store)
+    limiter.check(1, "user")
+    limiter.release_idle(now=time.monotonic() + 30)
+    assert store.used == rate_limit.LEASE_SIZE
+
+
+def test_returned_lease_can_be_used_by_another_worker(monkeypatch):
+    monkeypatch.setitem(rate_limit.ROLE_BURST_LIMITS, "user", None)
+    store = FakeQuotaStore(daily_limit=rate_limit.LEASE_SIZE)
+    idle_worker, busy_worker = _limiter(store), _limiter(store)
+    assert idle_worker.check(1, "user")[0]
+    assert not busy_worker.check(1, "user")[0]
+
+    idle_worker.release_idle(now=time.monotonic() + 61)
+    busy_worker.forget(1)
+    allowed = [busy_worker.check(1, "user")[0] for _ in range(rate_limit.LEASE_SIZE)]
+    assert allowed == [True] * (rate_limit.LEASE_SIZE - 1) + [False]
+
+
+def test_release_all_returns_every_unused_lease(monkeypatch):
+    monkeypatch.setitem(rate_limit.ROLE_BURST_LIMITS, "user", None)
+    store = FakeQuotaStore(daily_limit=20)
+    limiter = _limiter(store)
+    limiter.check(1, "user")
+    limiter.check(2, "user")
+    limiter.release_all()
+    assert store.used == 2